@@ -1,10 +1,19 @@
 import argparse
 
-from QtPyNetwork import __version__
-
+from QtPyNetwork import __version__, bench, replay
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description=__version__)
     parser.add_argument('-v', '--version', action='version', version='v{}'.format(__version__),
                         help='print version and exit')
+    commands = parser.add_subparsers(dest='command')
+    bench_parser = commands.add_parser('bench', help='run TCP server load test and print JSON result')
+    bench.add_arguments(bench_parser)
+    replay_parser = commands.add_parser('replay', help='replay captured traffic against server and print JSON result')
+    replay.add_arguments(replay_parser)
     args = parser.parse_args()
+
+    if args.command == 'bench':
+        bench.main(args)
+    elif args.command == 'replay':
+        replay.main(args)
@@ -3,6 +3,10 @@ from abc import ABC, abstractmethod
 
 import logging
 from struct import calcsize
+from time import monotonic
+
+from QtPyNetwork.options import HeartbeatOptions, SocketOptions, OverloadOptions, SharedMemoryOptions
+from QtPyNetwork.metrics import merge_stats, LagMonitor, Tracer
 
 HEADER = '!L'
 HEADER_SIZE = calcsize(HEADER)
@@ -12,13 +16,27 @@ class AbstractBalancer(QObject):
     disconnected = Signal(int)
     connected = Signal(int, str, int)
     message = Signal(int, bytes)
+    stream_message = Signal(int, int, bytes)
+    message_batch = Signal(list)
     client_error = Signal(int, Exception)
     closed = Signal()
+    rtt_measured = Signal(int, float)
+    drained = Signal(dict)
 
-    def __init__(self):
+    def __init__(self, heartbeat: HeartbeatOptions = None, socket_options: SocketOptions = None,
+                 overload: OverloadOptions = None, shared_memory: SharedMemoryOptions = None):
         super(AbstractBalancer, self).__init__()
         self.logger = logging.getLogger(self.__class__.__name__)
         self.__socket_id = 0
+        self.heartbeat = heartbeat
+        self.socket_options = socket_options if socket_options is not None else SocketOptions()
+        self.shared_memory = shared_memory
+        self.overload = None
+        self.tracer = None
+        self.__lag_monitor = None
+        self.__drain = None
+        if overload is not None:
+            AbstractBalancer.set_overload(self, overload)
 
     @abstractmethod
     @Slot(type, int)
@@ -35,6 +53,20 @@ class AbstractBalancer(QObject):
     def write_all(self, message: bytes):
         pass
 
+    @Slot(int, int, bytes)
+    def write_stream(self, client_id: int, stream_id: int, message: bytes):
+        """Write message to logical stream of client connection.
+
+        Args:
+            client_id (int): Client ID.
+            stream_id (int): Stream ID. Stream 0 is the plain message stream.
+            message (bytes): Message.
+        """
+        if stream_id == 0:
+            self.write(client_id, message)
+        else:
+            self.client_error.emit(client_id, NotImplementedError(f"{self.__class__.__name__} does not support streams"))
+
     @abstractmethod
     @Slot(int)
     def disconnect(self, client_id: int):
@@ -45,6 +77,19 @@ class AbstractBalancer(QObject):
     def close(self) -> None:
         pass
 
+    @abstractmethod
+    @Slot(float)
+    def drain(self, timeout: float = 5.0) -> None:
+        """Gracefully close balancer. Reading is stopped, queued data is flushed,
+        connections are closed and worker threads are stopped.
+        Emits drained and closed signals when done.
+
+        Args:
+            timeout (float): Seconds to wait for queued data to be written. Connections
+                which did not flush in time are aborted.
+        """
+        pass
+
     @abstractmethod
     @Slot()
     def is_running(self) -> bool:
@@ -55,6 +100,137 @@ class AbstractBalancer(QObject):
     def wait(self) -> None:
         pass
 
+    @Slot()
+    def stats(self, per_client: bool = False) -> dict:
+        """Traffic statistics of all connections, see metrics.ConnectionStats.snapshot().
+
+        Counters are read without locks, so values of workers running in other threads
+        may be a few frames behind. Queue depths are sampled by worker threads when stats()
+        is called and returned with the next call.
+
+        Args:
+            per_client (bool): Include counters of every open connection as clients (client ID -> counters).
+
+        Returns:
+            dict: Totals of all workers and their snapshots as workers. With overload options,
+                lag of the balancer's own thread is added as main, see LagMonitor.snapshot().
+        """
+        stats = merge_stats(self.worker_stats(per_client))
+        if self.__lag_monitor is not None:
+            stats["main"] = self.__lag_monitor.snapshot()
+        return stats
+
+    def worker_stats(self, per_client: bool = False) -> list:
+        """Statistics of every worker, each with worker key naming it. Used by stats()."""
+        return []
+
+    def threads(self) -> dict:
+        """Threads handling connections by worker name, the balancer's own thread is main.
+        Used by metrics.Profiler."""
+        return {"main": self.thread()}
+
+    def set_heartbeat(self, heartbeat: HeartbeatOptions) -> None:
+        """Set heartbeat options used for new connections.
+
+        Args:
+            heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        """
+        self.heartbeat = heartbeat
+
+    def set_socket_options(self, socket_options: SocketOptions) -> None:
+        """Set options applied to new connections.
+
+        Args:
+            socket_options (SocketOptions): Socket options.
+        """
+        self.socket_options = socket_options
+
+    def set_shared_memory(self, shared_memory: SharedMemoryOptions) -> None:
+        """Set shared memory transport settings used for new connections.
+
+        Args:
+            shared_memory (SharedMemoryOptions): Shared memory transport settings. None disables shared memory.
+        """
+        self.shared_memory = shared_memory
+
+    def set_overload(self, overload: OverloadOptions) -> None:
+        """Set event loop lag monitoring and overload policies of worker threads.
+        Lag of the balancer's own thread is monitored too.
+
+        Args:
+            overload (OverloadOptions): Lag thresholds and policies. None stops applying policies,
+                lag monitors keep running.
+        """
+        self.overload = overload
+        if overload is not None:
+            self.__lag_monitor = LagMonitor.instance(overload.probe_interval)
+
+    def set_tracer(self, tracer: Tracer) -> None:
+        """Set tracer of messages of new connections. Used by AbstractServer.set_tracer().
+
+        Args:
+            tracer (Tracer): Tracer. None stops tracing.
+        """
+        self.tracer = tracer
+
+    def start_drain(self, workers: list) -> None:
+        """Start collecting drain results from workers.
+
+        Args:
+            workers (list): IDs of workers which report via on_worker_drained.
+        """
+        started = monotonic()
+        self.__drain = {"started": started, "read_stopped": started, "pending": set(workers),
+                        "dropped": 0, "aborted": 0}
+        if not self.__drain["pending"]:
+            self.__finish_drain()
+
+    @Slot(int, float, int, int)
+    def on_worker_drained(self, worker_id: int, read_stopped: float, dropped: int, aborted: int) -> None:
+        """Called when worker finished draining its sockets.
+
+        Args:
+            worker_id (int): Worker ID passed to start_drain.
+            read_stopped (float): Monotonic time when worker stopped reading.
+            dropped (int): Number of bytes which were not written before deadline.
+            aborted (int): Number of aborted connections.
+        """
+        drain = self.__drain
+        if drain is None or worker_id not in drain["pending"]:
+            return
+        drain["pending"].discard(worker_id)
+        drain["read_stopped"] = max(drain["read_stopped"], read_stopped)
+        drain["dropped"] += dropped
+        drain["aborted"] += aborted
+        if not drain["pending"]:
+            self.__finish_drain()
+
+    @Slot()
+    def is_draining(self) -> bool:
+        return self.__drain is not None
+
+    def join_workers(self) -> None:
+        """Stop and wait for worker threads. Called after drain is finished."""
+        pass
+
+    def __finish_drain(self) -> None:
+        drain = self.__drain
+        self.__drain = None
+        flushed = monotonic()
+        self.join_workers()
+        joined = monotonic()
+        report = {
+            "read": drain["read_stopped"] - drain["started"],
+            "flush": flushed - drain["read_stopped"],
+            "join": joined - flushed,
+            "dropped_bytes": drain["dropped"],
+            "aborted": drain["aborted"],
+        }
+        self.logger.info(f"Drained in {joined - drain['started']:.3f} seconds, "
+                         f"dropped {drain['dropped']} bytes")
+        self.drained.emit(report)
+        self.closed.emit()
+
     @Slot()
     def get_next_socket_id(self) -> int:
         self.__socket_id += 1
@@ -1,67 +1,85 @@
-from qtpy.QtCore import Slot, Signal
+from qtpy.QtCore import Slot, Signal, QTimer
 from qtpy.QtNetwork import QAbstractSocket
 
-from struct import unpack, pack
+from time import monotonic
 
-from .AbstractBalancer import AbstractBalancer, HEADER, HEADER_SIZE
+from QtPyNetwork.common import DataBuffer, SocketDrainer, delete_later, close_descriptor
+from QtPyNetwork.exception import IdleTimeoutError
+from QtPyNetwork.metrics import ConnectionStats
+from QtPyNetwork.options import HeartbeatOptions, SocketOptions, OverloadOptions, SharedMemoryOptions
+from .AbstractBalancer import AbstractBalancer
+from .OverloadGuard import OverloadGuard
 
 
 class NoBalancer(AbstractBalancer):
-    def __init__(self):
-        super(NoBalancer, self).__init__()
-        self.data = {0: {
-            "size_left": 0,
-            "data": b"",
-        }}
-        self.sockets = []
+    def __init__(self, heartbeat: HeartbeatOptions = None, socket_options: SocketOptions = None,
+                 overload: OverloadOptions = None, shared_memory: SharedMemoryOptions = None):
+        super(NoBalancer, self).__init__(heartbeat, socket_options, overload, shared_memory)
+        self.sockets = {}
+        self.__drainer = None
+        self.__running = True
+        self.__stats = ConnectionStats()
+        self.__guard = None
+        self.set_overload(overload)
+
+    def set_overload(self, overload: OverloadOptions) -> None:
+        super(NoBalancer, self).set_overload(overload)
+        if self.__guard is not None:
+            self.__guard.close()
+            self.__guard = None
+        if overload is not None:
+            self.__guard = OverloadGuard(overload, lambda: [buffer for socket, buffer in self.sockets.values()])
 
     @Slot(type, int)
-    def balance(self, socket_type: type, socket_descriptor: int):
+    def balance(self, socket_type: type, socket_descriptor: int) -> int:
+        client_id = self.get_next_socket_id()
+        guard = self.__guard
+        if guard is not None and guard.reject():
+            close_descriptor(socket_descriptor)
+            # caller learns client ID when this returns
+            QTimer.singleShot(0, lambda: self.disconnected.emit(client_id))
+            return client_id
         socket: QAbstractSocket = socket_type()
         socket.setParent(None)
         if socket.setSocketDescriptor(socket_descriptor):
-            socket.readyRead.connect(self.__on_socket_ready_read)
+            self.socket_options.apply(socket)
             socket.disconnected.connect(self.__on_socket_disconnected)
             socket.error.connect(self.__on_socket_error)
-            socket.setObjectName(str(self.get_next_socket_id()))
-            self.sockets.append(socket)
+            socket.setObjectName(str(client_id))
+
+            buffer = DataBuffer(socket, self.heartbeat, self.shared_memory)
+            receive = self.__receiver(client_id, buffer)
+            if guard is not None and guard.shed_streams:
+                buffer.data.connect(lambda data: guard.shed_message(0) or receive(data))
+                buffer.stream_data.connect(lambda stream_id, data: guard.shed_message(stream_id)
+                                           or self.stream_message.emit(client_id, stream_id, data))
+            else:
+                buffer.data.connect(receive)
+                buffer.stream_data.connect(lambda stream_id, data: self.stream_message.emit(client_id, stream_id,
+                                                                                            data))
+            buffer.rtt_measured.connect(lambda rtt: self.rtt_measured.emit(client_id, rtt))
+            buffer.timeout.connect(lambda: self.client_error.emit(client_id, IdleTimeoutError("Connection timed out")))
+
+            self.sockets[client_id] = (socket, buffer)
+            self.__stats.add()
+            if guard is not None:
+                guard.add(buffer)
             self.logger.debug(f"New client - {socket.objectName()} - "
                               f"{socket.peerAddress().toString()} - {socket.peerPort()}")
-            self.connected.emit(int(socket.objectName()), socket.peerAddress().toString(), socket.peerPort())
-
-    @Slot()
-    def __on_socket_ready_read(self):
-        """Handle socket messages.
-
-        Note:
-            Emits message signal.
-        """
-        socket = self.sender()
-        client_id = int(socket.objectName())
-
-        while socket.bytesAvailable():
-            if client_id in self.data:
-                size_left = self.data.get(client_id).get("size_left")
-                data = socket.read(size_left)
-                size_left = size_left - len(data)
-                if size_left > 0:
-                    self.data[client_id]["size_left"] = size_left
-                    self.data[client_id]["data"] += data
-                else:
-                    data = self.data.get(client_id).get("data") + data
-                    del self.data[client_id]
-                    self.message.emit(client_id, data)
-
-            else:
-                header = socket.read(HEADER_SIZE)
-                data_size = unpack(HEADER, header)[0]
-                message = socket.read(data_size)
-
-                if len(message) < data_size:
-                    data_size = data_size - len(message)
-                    self.data[client_id] = {"data": message, "size_left": data_size}
-                else:
-                    self.message.emit(client_id, message)
+            self.connected.emit(client_id, socket.peerAddress().toString(), socket.peerPort())
+        else:
+            self.logger.error(f"Failed to adopt socket {socket_descriptor}: {socket.errorString()}")
+            socket.close()
+            close_descriptor(socket_descriptor)
+            # server counts the connection until it is reported closed
+            QTimer.singleShot(0, lambda: self.disconnected.emit(client_id))
+        return client_id
+
+    def __receiver(self, client_id: int, buffer: DataBuffer):
+        """Function passing messages of connection to server, traced if tracer is set."""
+        if self.tracer is not None:
+            return self.tracer.wrap_receive(self.message.emit, client_id, "main", buffer)
+        return lambda data: self.message.emit(client_id, data)
 
     @Slot()
     def __on_socket_disconnected(self):
@@ -72,12 +90,16 @@ class NoBalancer(AbstractBalancer):
         """
         socket = self.sender()
         client_id = int(socket.objectName())
-        if socket in self.sockets:
+        if client_id in self.sockets:
+            buffer = self.sockets[client_id][1]
+            self.__stats.remove(buffer.counters(), buffer.disconnect_reason())
             try:
                 socket.close()
-                self.sockets.remove(socket)
+                # socket is still emitting, delete it later
+                delete_later(socket)
             except RuntimeError:
                 pass
+            del self.sockets[client_id]
         self.disconnected.emit(client_id)
 
     @Slot()
@@ -100,13 +122,35 @@ class NoBalancer(AbstractBalancer):
             client_id (int): Client ID.
             data (bytes): Data to write.
         """
-        for socket in self.sockets:
-            if int(socket.objectName()) == client_id:
-                data = pack(HEADER, len(data)) + data
-                socket.write(data)
-                socket.flush()
+        socket_buffer = self.sockets.get(client_id)
+        if socket_buffer:
+            tracer = self.tracer
+            if tracer is None:
+                socket_buffer[1].write(data)
                 return
-        self.client_error.emit(client_id, Exception(f"Client {client_id} not found"))
+            # there is no thread hop, message is written right away
+            tracer.write(client_id, "main")
+            trace = tracer.write_received(client_id)
+            socket_buffer[1].write(data)
+            if trace is not None:
+                tracer.write_flushed(trace)
+        else:
+            self.client_error.emit(client_id, Exception(f"Client {client_id} not found"))
+
+    @Slot(int, int, bytes)
+    def write_stream(self, client_id: int, stream_id: int, data: bytes):
+        """Write data to logical stream.
+
+        Args:
+            client_id (int): Client ID.
+            stream_id (int): Stream ID.
+            data (bytes): Data to write.
+        """
+        socket_buffer = self.sockets.get(client_id)
+        if socket_buffer:
+            socket_buffer[1].write_stream(stream_id, data)
+        else:
+            self.client_error.emit(client_id, Exception(f"Client {client_id} not found"))
 
     @Slot(bytes)
     def write_all(self, message: bytes):
@@ -115,9 +159,18 @@ class NoBalancer(AbstractBalancer):
         Args:
             message (bytes): Data to write.
         """
-        for socket in self.sockets:
-            socket.write(message)
-            socket.flush()
+        for socket, buffer in self.sockets.values():
+            buffer.write(message)
+
+    def worker_stats(self, per_client: bool = False) -> list:
+        buffers = [buffer for socket, buffer in self.sockets.values()]
+        self.__stats.sample(buffers)
+        counters = {client_id: buffer.counters() for client_id, (socket, buffer) in self.sockets.items()}
+        stats = self.__stats.snapshot(counters, per_client)
+        if self.__guard is not None:
+            stats.update(self.__guard.snapshot())
+        stats["worker"] = "main"
+        return [stats]
 
     @Slot(int)
     def disconnect(self, client_id: int):
@@ -126,19 +179,46 @@ class NoBalancer(AbstractBalancer):
         Args:
             client_id (int): Client ID.
         """
-        for socket in self.sockets:
-            if int(socket.objectName()) == client_id:
-                socket.disconnectFromHost()
-                return
-        self.client_error.emit(client_id, Exception(f"Client {client_id} not found"))
+        socket_buffer = self.sockets.get(client_id)
+        if socket_buffer:
+            socket_buffer[0].disconnectFromHost()
+        else:
+            self.client_error.emit(client_id, Exception(f"Client {client_id} not found"))
 
     @Slot()
     def close(self):
         """Close all sockets."""
-        for socket in self.sockets:
+        for socket, buffer in list(self.sockets.values()):
             try:
                 socket.disconnectFromHost()
                 socket.close()
             except RuntimeError:
                 pass
         self.sockets.clear()
+        self.__running = False
+        self.closed.emit()
+
+    @Slot(float)
+    def drain(self, timeout: float = 5.0):
+        """Stop reading, flush queued data and close all sockets.
+
+        Args:
+            timeout (float): Seconds to wait for queued data to be written.
+        """
+        self.start_drain([0])
+        read_stopped = monotonic()
+        self.__drainer = SocketDrainer(self.sockets.values(), timeout)
+        self.__drainer.finished.connect(lambda dropped, aborted: self.on_worker_drained(0, read_stopped, dropped, aborted))
+        self.__drainer.start()
+
+    def join_workers(self) -> None:
+        self.__running = False
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.__running
+
+    @Slot(int)
+    def wait(self, timeout: int = 0) -> None:
+        """NoBalancer runs in the caller's thread, there is nothing to wait for."""
+        pass
@@ -0,0 +1,95 @@
+from qtpy.QtCore import QObject, Signal, Slot
+
+import logging
+
+from QtPyNetwork.metrics import LagMonitor
+from QtPyNetwork.options import OverloadOptions, OVERLOAD_REJECT, OVERLOAD_PAUSE_READING, OVERLOAD_SHED
+
+
+class OverloadGuard(QObject):
+    """Watches event loop lag of one balancer thread and applies overload policies to its connections.
+
+    Must be created in the thread it guards. overloaded, lag() and snapshot() may be read from any thread.
+
+    Args:
+        options (OverloadOptions): Lag thresholds and policies.
+        buffers (callable): Returns DataBuffer of every connection of the thread.
+    """
+
+    overload_changed = Signal(bool)
+
+    def __init__(self, options: OverloadOptions, buffers):
+        super(OverloadGuard, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__options = options
+        self.__buffers = buffers
+        self.__monitor = LagMonitor.instance(options.probe_interval)
+        self.__monitor.probed.connect(self.__on_probed)
+        self.overloaded = False
+        self.rejects = OVERLOAD_REJECT in options.policies
+        self.pauses_reading = OVERLOAD_PAUSE_READING in options.policies
+        # empty unless shedding is enabled, so callers can skip checking messages
+        self.shed_streams = options.shed_streams if OVERLOAD_SHED in options.policies else frozenset()
+        self.rejected = 0
+        self.shed = 0
+
+    @Slot(float)
+    def __on_probed(self, lag: float):
+        options = self.__options
+        if not options.max_lag:
+            return
+        lag = self.__monitor.lag()
+        if not self.overloaded and lag > options.max_lag:
+            self.__set_overloaded(True)
+        elif self.overloaded and lag < options.recover_lag:
+            self.__set_overloaded(False)
+
+    def __set_overloaded(self, overloaded: bool):
+        self.overloaded = overloaded
+        self.logger.warning(f"Event loop lag {self.__monitor.lag() * 1000:.1f} ms, "
+                            f"{'overloaded' if overloaded else 'recovered'}")
+        if self.pauses_reading:
+            for buffer in list(self.__buffers()):
+                if overloaded:
+                    buffer.pause_reading()
+                else:
+                    buffer.resume_reading()
+        self.overload_changed.emit(overloaded)
+
+    def close(self) -> None:
+        """Stop watching lag and resume connections paused by the guard."""
+        self.__monitor.probed.disconnect(self.__on_probed)
+        if self.overloaded:
+            self.__set_overloaded(False)
+
+    def lag(self) -> float:
+        """Smoothed event loop lag in seconds."""
+        return self.__monitor.lag()
+
+    def reject(self) -> bool:
+        """Check if new connection should be rejected, counts it if so."""
+        if self.rejects and self.overloaded:
+            self.rejected += 1
+            return True
+        return False
+
+    def add(self, buffer) -> None:
+        """Apply policies to new connection."""
+        if self.pauses_reading and self.overloaded:
+            buffer.pause_reading()
+
+    def shed_message(self, stream_id: int) -> bool:
+        """Check if incoming message should be dropped, counts it if so."""
+        if self.overloaded and stream_id in self.shed_streams:
+            self.shed += 1
+            return True
+        return False
+
+    def snapshot(self) -> dict:
+        """Lag statistics of LagMonitor.snapshot() with overloaded flag and numbers of rejected
+        connections and shed messages."""
+        stats = self.__monitor.snapshot()
+        stats["overloaded"] = self.overloaded
+        stats["rejected"] = self.rejected
+        stats["shed"] = self.shed
+        return stats
@@ -2,8 +2,12 @@ from qtpy.QtCore import Slot, Signal, QObject, QThread
 from qtpy.QtNetwork import QAbstractSocket
 
 import logging
+from time import monotonic
 
-from QtPyNetwork.common import DataBuffer
+from QtPyNetwork.common import DataBuffer, SocketDrainer, close_descriptor
+from QtPyNetwork.exception import IdleTimeoutError
+from QtPyNetwork.metrics import ConnectionStats
+from QtPyNetwork.options import HeartbeatOptions, SocketOptions, OverloadOptions, SharedMemoryOptions
 from .AbstractBalancer import AbstractBalancer
 
 
@@ -11,13 +15,20 @@ class _Worker(QObject):
     disconnected = Signal(int)
     connected = Signal(int, str, int)
     ready_read = Signal(int, bytes)
+    stream_ready_read = Signal(int, int, bytes)
+    rtt_measured = Signal(int, float)
     error = Signal(int, Exception)
     closed = Signal()
+    drained = Signal(int, float, int, int)
 
     close_signal = Signal()
+    drain_signal = Signal(float)
     write_signal = Signal(bytes)
+    write_stream_signal = Signal(int, bytes)
+    sample_signal = Signal()
 
-    def __init__(self, client_id, socket_type: type, socket_descriptor: int):
+    def __init__(self, client_id, socket_type: type, socket_descriptor: int, heartbeat: HeartbeatOptions = None,
+                 socket_options: SocketOptions = None, shared_memory: SharedMemoryOptions = None):
         super(_Worker, self).__init__()
         self.logger = logging.getLogger(f"ThreadBalancerWorker-{client_id}")
         self.socket: QAbstractSocket = None
@@ -25,29 +36,51 @@ class _Worker(QObject):
         self.client_id = client_id
         self.socket_type = socket_type
         self.socket_descriptor = socket_descriptor
+        self.heartbeat = heartbeat
+        self.socket_options = socket_options
+        self.shared_memory = shared_memory
+        self.drainer = None
+        self.stats = ConnectionStats()
+        self.connection_open = False
 
         self.size_left = 0
         self.data = b""
 
         self.close_signal.connect(self.__on_close_signal)
+        self.drain_signal.connect(self.__on_drain_signal)
         self.write_signal.connect(self.__on_write_signal)
+        self.write_stream_signal.connect(self.__on_write_stream_signal)
+        self.sample_signal.connect(self.__on_sample_signal)
 
     @Slot()
     def start(self):
         socket: QAbstractSocket = self.socket_type()
         socket.setParent(None)
         if socket.setSocketDescriptor(self.socket_descriptor):
-            # socket.readyRead.connect(self.__on_socket_ready_read)
+            if self.socket_options is not None:
+                self.socket_options.apply(socket)
             socket.disconnected.connect(self.__on_socket_disconnected)
             socket.error.connect(self.__on_socket_error)
             socket.setObjectName(str(self.client_id))
             self.socket = socket
-            self.buffer = DataBuffer(self.socket)
+            self.buffer = DataBuffer(self.socket, self.heartbeat, self.shared_memory)
             self.buffer.data.connect(lambda data: self.ready_read.emit(self.client_id, data))
+            self.buffer.stream_data.connect(lambda stream_id, data: self.stream_ready_read.emit(self.client_id,
+                                                                                                stream_id, data))
+            self.buffer.rtt_measured.connect(lambda rtt: self.rtt_measured.emit(self.client_id, rtt))
+            self.buffer.timeout.connect(lambda: self.error.emit(self.client_id, IdleTimeoutError("Connection timed out")))
+            self.stats.add()
+            self.connection_open = True
 
             self.logger.debug(f"New client - {socket.objectName()} - "
                               f"{socket.peerAddress().toString()} - {socket.peerPort()}")
             self.connected.emit(int(socket.objectName()), socket.peerAddress().toString(), socket.peerPort())
+        else:
+            self.logger.error(f"Failed to adopt socket {self.socket_descriptor}: {socket.errorString()}")
+            socket.close()
+            close_descriptor(self.socket_descriptor)
+            # server counts the connection until it is reported closed, balancer stops this worker
+            self.disconnected.emit(self.client_id)
 
     @Slot()
     def __on_socket_disconnected(self):
@@ -59,6 +92,9 @@ class _Worker(QObject):
         Note:
             Emits disconnected signal.
         """
+        if self.connection_open:
+            self.connection_open = False
+            self.stats.remove(self.buffer.counters(), self.buffer.disconnect_reason())
         try:
             self.socket.close()
         except RuntimeError:
@@ -80,16 +116,35 @@ class _Worker(QObject):
 
     @Slot()
     def __on_close_signal(self):
-        """Close socket.
+        """Close socket and stop worker thread.
 
         Note:
             Emits closed signal.
         """
         try:
-            self.socket.close()
+            if self.socket:
+                self.socket.close()
         except RuntimeError:
             pass
         self.closed.emit()
+        self.thread().quit()
+
+    @Slot(float)
+    def __on_drain_signal(self, timeout: float):
+        """Stop reading, flush queued data and close socket.
+
+        Args:
+            timeout (float): Seconds to wait for queued data to be written.
+
+        Note:
+            Emits drained signal.
+        """
+        read_stopped = monotonic()
+        sockets = [(self.socket, self.buffer)] if self.socket else []
+        self.drainer = SocketDrainer(sockets, timeout)
+        self.drainer.finished.connect(lambda dropped, aborted: self.drained.emit(self.client_id, read_stopped,
+                                                                                 dropped, aborted))
+        self.drainer.start()
 
     @Slot(bytes)
     def __on_write_signal(self, data: bytes):
@@ -108,26 +163,66 @@ class _Worker(QObject):
         # self.socket.write(data)
         # self.socket.flush()
 
+    @Slot()
+    def __on_sample_signal(self):
+        if self.buffer is not None:
+            self.stats.sample([self.buffer])
+
+    def snapshot(self, per_client: bool) -> dict:
+        """Statistics of the worker. Called from balancer thread."""
+        buffer = self.buffer
+        counters = {self.client_id: buffer.counters()} if self.connection_open and buffer is not None else {}
+        stats = self.stats.snapshot(counters, per_client)
+        stats["worker"] = self.objectName()
+        return stats
 
-class ThreadBalancer(AbstractBalancer):
+    @Slot(int, bytes)
+    def __on_write_stream_signal(self, stream_id: int, data: bytes):
+        """Write data to logical stream.
 
-    def __init__(self):
-        super(ThreadBalancer, self).__init__()
+        Args:
+            stream_id (int): Stream ID.
+            data (bytes): Data to write.
+        """
+        if self.buffer is not None:
+            self.buffer.write_stream(stream_id, data)
+
+
+class ThreadBalancer(AbstractBalancer):
+    """Handles every connection in its own thread.
+
+    Args:
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        socket_options (SocketOptions): Options applied to client sockets.
+        overload (OverloadOptions): Only lag of the balancer's thread is monitored, every connection
+            has a thread of its own, so overload policies are not applied.
+        shared_memory (SharedMemoryOptions): Shared memory transport settings. None disables shared memory.
+    """
+
+    def __init__(self, heartbeat: HeartbeatOptions = None, socket_options: SocketOptions = None,
+                 overload: OverloadOptions = None, shared_memory: SharedMemoryOptions = None):
+        super(ThreadBalancer, self).__init__(heartbeat, socket_options, overload, shared_memory)
         self.workers = []
+        # statistics of workers which were already stopped
+        self.__finished_stats = ConnectionStats()
 
     @Slot(type, int)
     def balance(self, socket_type: type, socket_descriptor: int) -> int:
         client_id = self.get_next_socket_id()
 
-        worker = _Worker(client_id, socket_type, socket_descriptor)
+        worker = _Worker(client_id, socket_type, socket_descriptor, self.heartbeat, self.socket_options,
+                         self.shared_memory)
         worker.setObjectName(str(client_id))
         # worker.connected.connect(self.__on_worker_socket_connected)
         # worker.ready_read.connect(self.__on_worker_socket_readyRead)
         # worker.disconnected.connect()
         worker.connected.connect(self.connected.emit)
-        worker.disconnected.connect(self.disconnected.emit)
+        worker.disconnected.connect(self.__on_worker_disconnected)
         worker.ready_read.connect(self.message.emit)
+        worker.stream_ready_read.connect(self.stream_message.emit)
+        worker.rtt_measured.connect(self.rtt_measured.emit)
         worker.error.connect(self.client_error.emit)
+        worker.drained.connect(self.on_worker_drained)
 
         thread = QThread()
         worker.moveToThread(thread)
@@ -144,9 +239,17 @@ class ThreadBalancer(AbstractBalancer):
         else:
             self.client_error.emit(client_id, Exception("Client not found"))
 
+    @Slot(int, int, bytes)
+    def write_stream(self, client_id: int, stream_id: int, message: bytes):
+        worker = self.__get_worker_by_client_id(client_id)
+        if worker:
+            worker.write_stream_signal.emit(stream_id, message)
+        else:
+            self.client_error.emit(client_id, Exception("Client not found"))
+
     @Slot(bytes)
     def write_all(self, message: bytes):
-        for worker in self.workers:
+        for worker, thread in self.workers:
             worker.write_signal.emit(message)
 
     @Slot(int)
@@ -157,10 +260,80 @@ class ThreadBalancer(AbstractBalancer):
 
     @Slot()
     def close(self):
-        for worker in self.workers:
+        for worker, thread in self.workers:
             worker.close_signal.emit()
         self.closed.emit()
 
+    @Slot(float)
+    def drain(self, timeout: float = 5.0):
+        """Stop reading, flush queued data, close all sockets and stop worker threads.
+
+        Args:
+            timeout (float): Seconds to wait for queued data to be written.
+        """
+        self.start_drain([worker.client_id for worker, thread in self.workers])
+        for worker, thread in self.workers:
+            worker.drain_signal.emit(timeout)
+
+    def join_workers(self) -> None:
+        for worker, thread in self.workers:
+            thread.quit()
+        for worker, thread in self.workers:
+            thread.wait()
+            self.__finished_stats.merge(worker.stats)
+        self.workers.clear()
+
+    def threads(self) -> dict:
+        """Every connection has its own thread named by its client ID."""
+        threads = super().threads()
+        threads.update({worker.objectName(): thread for worker, thread in list(self.workers)})
+        return threads
+
+    def worker_stats(self, per_client: bool = False) -> list:
+        """Every worker handles one connection and is named by its client ID.
+        Statistics of stopped workers are reported by worker named finished."""
+        workers = list(self.workers)
+        for worker, thread in workers:
+            worker.sample_signal.emit()
+        finished = self.__finished_stats.snapshot({}, per_client)
+        finished["worker"] = "finished"
+        return [worker.snapshot(per_client) for worker, thread in workers] + [finished]
+
+    @Slot()
+    def is_running(self) -> bool:
+        return any(thread.isRunning() for worker, thread in self.workers)
+
+    @Slot(int)
+    def wait(self, timeout: int = 0) -> None:
+        """Wait for worker threads to finish.
+
+        Args:
+            timeout (int): Milliseconds to wait for each thread. Zero waits until threads finish.
+        """
+        for worker, thread in list(self.workers):
+            if timeout > 0:
+                thread.wait(timeout)
+            else:
+                thread.wait()
+
+    @Slot(int)
+    def __on_worker_disconnected(self, client_id: int):
+        """Stop thread of disconnected client so dead workers do not pile up.
+
+        Note:
+            Emits disconnected signal.
+        """
+        if not self.is_draining():
+            # while draining, threads are stopped by join_workers after every worker reported
+            for worker, thread in self.workers:
+                if worker.objectName() == str(client_id):
+                    self.workers.remove((worker, thread))
+                    thread.quit()
+                    thread.wait()
+                    self.__finished_stats.merge(worker.stats)
+                    break
+        self.disconnected.emit(client_id)
+
     @Slot(int)
     def __get_worker_by_client_id(self, client_id: int):
         for worker, thread in self.workers:
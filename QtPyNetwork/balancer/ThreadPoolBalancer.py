@@ -2,30 +2,56 @@ from qtpy.QtCore import Slot, Signal, QObject, QThread
 from qtpy.QtNetwork import QAbstractSocket
 
 import logging
+from time import monotonic
 
-from QtPyNetwork.common import DataBuffer
+from QtPyNetwork.common import DataBuffer, SocketDrainer, delete_later, close_descriptor
+from QtPyNetwork.exception import IdleTimeoutError
+from QtPyNetwork.metrics import ConnectionStats
+from QtPyNetwork.options import HeartbeatOptions, SocketOptions, OverloadOptions, SharedMemoryOptions
 from .AbstractBalancer import AbstractBalancer
+from .OverloadGuard import OverloadGuard
 
 
 class _Worker(QObject):
     disconnected = Signal(int)
     connected = Signal(int, str, int)
     ready_read = Signal(int, bytes)
+    stream_ready_read = Signal(int, int, bytes)
+    rtt_measured = Signal(int, float)
     error = Signal(int, Exception)
     closed = Signal()
+    drained = Signal(int, float, int, int)
 
     close_signal = Signal()
+    drain_signal = Signal(float)
     connection_signal = Signal(type, int, int)
     disconnect_signal = Signal(int)
     write_signal = Signal(int, bytes)
+    write_stream_signal = Signal(int, int, bytes)
+    write_all_signal = Signal(bytes)
+    sample_signal = Signal()
+    overload_signal = Signal(object)
 
     def __init__(self):
         super(_Worker, self).__init__()
         self.logger = None
+        self.heartbeat = None
+        self.socket_options = None
+        self.shared_memory = None
+        self.drainer = None
+        # created in worker thread, read by balancer when placing connections
+        self.guard = None
+        self.tracer = None
 
         self.sockets = {}
+        self.stats = ConnectionStats()
         self.close_signal.connect(self.__on_close_signal)
+        self.drain_signal.connect(self.__on_drain_signal)
         self.write_signal.connect(self.__on_write_signal)
+        self.write_stream_signal.connect(self.__on_write_stream_signal)
+        self.write_all_signal.connect(self.__on_write_all_signal)
+        self.sample_signal.connect(self.__on_sample_signal)
+        self.overload_signal.connect(self.__on_overload_signal)
         self.connection_signal.connect(self.__on_connection_signal)
         self.disconnect_signal.connect(self.__on_disconnect_signal)
 
@@ -35,20 +61,52 @@ class _Worker(QObject):
 
     @Slot(type, int, int)
     def __on_connection_signal(self, socket_type: type, client_id: int, socket_descriptor: int):
+        guard = self.guard
+        if guard is not None and guard.reject():
+            close_descriptor(socket_descriptor)
+            self.disconnected.emit(client_id)
+            return
         socket: QAbstractSocket = socket_type()
         socket.setParent(None)
         if socket.setSocketDescriptor(socket_descriptor):
+            if self.socket_options is not None:
+                self.socket_options.apply(socket)
             socket.disconnected.connect(self.__on_socket_disconnected)
             socket.error.connect(self.__on_socket_error)
             socket.setObjectName(str(client_id))
 
-            buffer = DataBuffer(socket)
-            buffer.data.connect(lambda data: self.ready_read.emit(client_id, data))
+            buffer = DataBuffer(socket, self.heartbeat, self.shared_memory)
+            receive = self.__receiver(client_id, buffer)
+            if guard is not None and guard.shed_streams:
+                buffer.data.connect(lambda data: guard.shed_message(0) or receive(data))
+                buffer.stream_data.connect(lambda stream_id, data: guard.shed_message(stream_id)
+                                           or self.stream_ready_read.emit(client_id, stream_id, data))
+            else:
+                buffer.data.connect(receive)
+                buffer.stream_data.connect(lambda stream_id, data: self.stream_ready_read.emit(client_id, stream_id,
+                                                                                               data))
+            buffer.rtt_measured.connect(lambda rtt: self.rtt_measured.emit(client_id, rtt))
+            buffer.timeout.connect(lambda: self.error.emit(client_id, IdleTimeoutError("Connection timed out")))
 
             self.sockets[client_id] = (socket, buffer)
+            self.stats.add()
+            if guard is not None:
+                guard.add(buffer)
             self.logger.debug(f"New client - {socket.objectName()} - "
                               f"{socket.peerAddress().toString()} - {socket.peerPort()}")
             self.connected.emit(int(socket.objectName()), socket.peerAddress().toString(), socket.peerPort())
+        else:
+            self.logger.error(f"Failed to adopt socket {socket_descriptor}: {socket.errorString()}")
+            socket.close()
+            close_descriptor(socket_descriptor)
+            # server counts the connection until it is reported closed
+            self.disconnected.emit(client_id)
+
+    def __receiver(self, client_id: int, buffer: DataBuffer):
+        """Function passing messages of connection to balancer, traced if tracer is set."""
+        if self.tracer is not None:
+            return self.tracer.wrap_receive(self.ready_read.emit, client_id, self.objectName(), buffer)
+        return lambda data: self.ready_read.emit(client_id, data)
 
     @Slot()
     def __on_socket_disconnected(self):
@@ -59,11 +117,17 @@ class _Worker(QObject):
         """
         socket = self.sender()
         client_id = int(socket.objectName())
+        socket_buffer = self.sockets.get(client_id)
+        if socket_buffer is not None:
+            self.stats.remove(socket_buffer[1].counters(), socket_buffer[1].disconnect_reason())
         try:
             if socket:
                 socket.close()
+                # socket is still emitting, delete it later
+                delete_later(socket)
         except RuntimeError:
             pass
+        self.sockets.pop(client_id, None)
         self.disconnected.emit(client_id)
 
     @Slot()
@@ -79,17 +143,35 @@ class _Worker(QObject):
 
     @Slot()
     def __on_close_signal(self):
-        """Close socket.
+        """Close sockets and stop worker thread.
 
         Note:
             Emits closed signal.
         """
-        for client_id, socket_buffer in self.sockets.items():
+        for client_id, socket_buffer in list(self.sockets.items()):
             try:
                 socket_buffer[0].close()
             except RuntimeError:
                 pass
         self.closed.emit()
+        self.thread().quit()
+
+    @Slot(float)
+    def __on_drain_signal(self, timeout: float):
+        """Stop reading, flush queued data and close sockets.
+
+        Args:
+            timeout (float): Seconds to wait for queued data to be written.
+
+        Note:
+            Emits drained signal.
+        """
+        read_stopped = monotonic()
+        worker_id = int(self.objectName())
+        self.drainer = SocketDrainer(self.sockets.values(), timeout)
+        self.drainer.finished.connect(lambda dropped, aborted: self.drained.emit(worker_id, read_stopped,
+                                                                                 dropped, aborted))
+        self.drainer.start()
 
     @Slot(int, bytes)
     def __on_write_signal(self, client_id: int, data: bytes):
@@ -101,31 +183,105 @@ class _Worker(QObject):
         Note:
             Emits written signal.
         """
+        tracer = self.tracer
+        if tracer is not None:
+            self.__write_traced(tracer, client_id, data)
+            return
         socket_buffer = self.sockets.get(client_id)
         if socket_buffer:
             socket_buffer[1].write(data)
 
+    def __write_traced(self, tracer, client_id: int, data: bytes):
+        trace = tracer.write_received(client_id)
+        socket_buffer = self.sockets.get(client_id)
+        if socket_buffer:
+            socket_buffer[1].write(data)
+        if trace is not None:
+            tracer.write_flushed(trace)
+
+    @Slot(int, int, bytes)
+    def __on_write_stream_signal(self, client_id: int, stream_id: int, data: bytes):
+        """Write data to logical stream.
+
+        Args:
+            client_id (int): Client ID.
+            stream_id (int): Stream ID.
+            data (bytes): Data to write.
+        """
+        socket_buffer = self.sockets.get(client_id)
+        if socket_buffer:
+            socket_buffer[1].write_stream(stream_id, data)
+
+    @Slot(bytes)
+    def __on_write_all_signal(self, data: bytes):
+        """Write data to every socket of the worker."""
+        for socket, buffer in list(self.sockets.values()):
+            buffer.write(data)
+
+    @Slot(object)
+    def __on_overload_signal(self, overload: OverloadOptions):
+        if self.guard is not None:
+            self.guard.close()
+            delete_later(self.guard)
+        self.guard = None
+        if overload is not None:
+            self.guard = OverloadGuard(overload, lambda: [buffer for socket, buffer in self.sockets.values()])
+
+    @Slot()
+    def __on_sample_signal(self):
+        self.stats.sample(buffer for socket, buffer in list(self.sockets.values()))
+
+    def snapshot(self, per_client: bool) -> dict:
+        """Statistics of the worker. Called from balancer thread."""
+        counters = {client_id: buffer.counters() for client_id, (socket, buffer) in self.sockets.copy().items()}
+        stats = self.stats.snapshot(counters, per_client)
+        guard = self.guard
+        if guard is not None:
+            stats.update(guard.snapshot())
+        stats["worker"] = self.objectName()
+        return stats
+
     @Slot(int)
     def __on_disconnect_signal(self, client_id: int):
-        for connected_client_id, socket_buffer in self.sockets.items():
-            if connected_client_id == client_id:
-                try:
-                    socket_buffer[0].close()
-                except RuntimeError:
-                    pass
+        socket_buffer = self.sockets.get(client_id)
+        if socket_buffer:
+            try:
+                # closing emits disconnected, which removes socket from self.sockets
+                socket_buffer[0].close()
+            except RuntimeError:
+                pass
 
 
 class ThreadPoolBalancer(AbstractBalancer):
-
-    def __init__(self, threads=QThread.idealThreadCount()):
-        super().__init__()
+    """Handles connections on a fixed pool of worker threads.
+
+    New connection is placed on the worker with the fewest connections. With overload options,
+    workers which are overloaded are skipped while any other worker is not, see OverloadOptions.
+
+    Args:
+        threads (int): Number of worker threads.
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        socket_options (SocketOptions): Options applied to client sockets.
+        overload (OverloadOptions): Event loop lag monitoring and overload policies of worker threads.
+        shared_memory (SharedMemoryOptions): Shared memory transport settings. None disables shared memory.
+    """
+
+    def __init__(self, threads=QThread.idealThreadCount(), heartbeat: HeartbeatOptions = None,
+                 socket_options: SocketOptions = None, overload: OverloadOptions = None,
+                 shared_memory: SharedMemoryOptions = None):
+        super().__init__(heartbeat, socket_options, overload, shared_memory)
         self.__workers = []
         self.__start_worker(threads)
 
     @Slot(type, int)
     def balance(self, socket_type: type, socket_descriptor: int) -> int:
         client_id = self.get_next_socket_id()
-        sockets_per_worker = [len(worker.sockets) for worker, thread in self.__workers]
+        if self.overload is None:
+            sockets_per_worker = [len(worker.sockets) for worker, thread in self.__workers]
+        else:
+            # overloaded workers sort after all others
+            sockets_per_worker = [(worker.guard is not None and worker.guard.overloaded, len(worker.sockets))
+                                  for worker, thread in self.__workers]
         worker = self.__workers[sockets_per_worker.index(min(sockets_per_worker))][0]
         worker.connection_signal.emit(socket_type, client_id, socket_descriptor)
         return client_id
@@ -135,29 +291,82 @@ class ThreadPoolBalancer(AbstractBalancer):
         for i in range(thread_count):
             worker = _Worker()
             worker.setObjectName(str(i))
+            worker.heartbeat = self.heartbeat
+            worker.socket_options = self.socket_options
+            worker.shared_memory = self.shared_memory
             worker.connected.connect(self.connected.emit)
             worker.disconnected.connect(self.disconnected.emit)
             worker.ready_read.connect(self.message.emit)
+            worker.stream_ready_read.connect(self.stream_message.emit)
+            worker.rtt_measured.connect(self.rtt_measured.emit)
             worker.error.connect(self.client_error.emit)
+            worker.drained.connect(self.on_worker_drained)
 
             thread = QThread()
             worker.moveToThread(thread)
             thread.started.connect(worker.start)
             self.__workers.append((worker, thread))
             thread.start()
+            if self.overload is not None:
+                worker.overload_signal.emit(self.overload)
+
+    def set_heartbeat(self, heartbeat: HeartbeatOptions) -> None:
+        super().set_heartbeat(heartbeat)
+        for worker, thread in self.__workers:
+            worker.heartbeat = heartbeat
+
+    def set_overload(self, overload: OverloadOptions) -> None:
+        super().set_overload(overload)
+        for worker, thread in self.__workers:
+            worker.overload_signal.emit(overload)
+
+    def set_tracer(self, tracer) -> None:
+        super().set_tracer(tracer)
+        for worker, thread in self.__workers:
+            worker.tracer = tracer
+
+    def set_socket_options(self, socket_options: SocketOptions) -> None:
+        super().set_socket_options(socket_options)
+        for worker, thread in self.__workers:
+            worker.socket_options = socket_options
+
+    def set_shared_memory(self, shared_memory: SharedMemoryOptions) -> None:
+        super().set_shared_memory(shared_memory)
+        for worker, thread in self.__workers:
+            worker.shared_memory = shared_memory
 
     @Slot(int, bytes)
     def write(self, client_id: int, message: bytes):
         worker = self.__get_worker_by_client_id(client_id)
         if worker:
+            if self.tracer is not None:
+                self.tracer.write(client_id, worker.objectName())
             worker.write_signal.emit(client_id, message)
         else:
             self.client_error.emit(client_id, Exception("Client not found"))
 
+    @Slot(int, int, bytes)
+    def write_stream(self, client_id: int, stream_id: int, message: bytes):
+        worker = self.__get_worker_by_client_id(client_id)
+        if worker:
+            worker.write_stream_signal.emit(client_id, stream_id, message)
+        else:
+            self.client_error.emit(client_id, Exception("Client not found"))
+
     @Slot(bytes)
     def write_all(self, message: bytes):
-        for worker in self.__workers:
-            worker.write_signal.emit(message)
+        for worker, thread in self.__workers:
+            worker.write_all_signal.emit(message)
+
+    def threads(self) -> dict:
+        threads = super().threads()
+        threads.update({worker.objectName(): thread for worker, thread in self.__workers})
+        return threads
+
+    def worker_stats(self, per_client: bool = False) -> list:
+        for worker, thread in self.__workers:
+            worker.sample_signal.emit()
+        return [worker.snapshot(per_client) for worker, thread in self.__workers]
 
     @Slot(int)
     def disconnect(self, client_id: int):
@@ -169,12 +378,38 @@ class ThreadPoolBalancer(AbstractBalancer):
     def close(self):
         for worker, thread in self.__workers:
             worker.close_signal.emit()
+        self.closed.emit()
+
+    @Slot(float)
+    def drain(self, timeout: float = 5.0):
+        """Stop reading, flush queued data, close all sockets and stop worker threads.
+
+        Args:
+            timeout (float): Seconds to wait for queued data to be written.
+        """
+        self.start_drain([int(worker.objectName()) for worker, thread in self.__workers])
+        for worker, thread in self.__workers:
+            worker.drain_signal.emit(timeout)
+
+    def join_workers(self) -> None:
+        for worker, thread in self.__workers:
+            thread.quit()
+        for worker, thread in self.__workers:
+            thread.wait()
 
     @Slot(int)
     def wait(self, timeout: int = 0) -> None:
+        """Wait for worker threads to finish.
+
+        Args:
+            timeout (int): Milliseconds to wait for all threads. Zero waits until threads finish.
+        """
         timeout = timeout / len(self.__workers) if timeout > 0 else 0
         for worker, thread in self.__workers:
-            thread.wait(timeout)
+            if timeout > 0:
+                thread.wait(int(timeout))
+            else:
+                thread.wait()
 
     @Slot()
     def is_running(self) -> bool:
@@ -0,0 +1,514 @@
+from qtpy.QtCore import Slot, Signal, QObject, QThread, QIODevice, QTimer
+from qtpy.QtNetwork import QAbstractSocket, QUdpSocket, QHostAddress
+
+import socket
+import logging
+import ipaddress
+import itertools
+from time import monotonic
+
+from QtPyNetwork.common import DEFAULT_MTU, pack_datagrams, unpack_datagram, close_descriptor, delete_later
+from QtPyNetwork.exception import DeliveryFailedError
+from QtPyNetwork.metrics import Counters, ConnectionStats, DISCONNECT_LOCAL, DISCONNECT_IDLE_TIMEOUT, DISCONNECT_LOST
+from QtPyNetwork.options import ReliableOptions, OverloadOptions
+from QtPyNetwork.reliable import ReliableSession
+from QtPyNetwork.timer import TimerWheel
+from .AbstractBalancer import AbstractBalancer
+from .OverloadGuard import OverloadGuard
+
+SO_REUSEPORT = getattr(socket, "SO_REUSEPORT", None)
+
+
+class _Session:
+    """Peer which sent datagrams to server."""
+
+    __slots__ = ("client_id", "key", "host", "port", "last_seen", "handle", "outgoing", "reliable", "counters")
+
+    def __init__(self, client_id: int, key: tuple, host: QHostAddress, port: int, last_seen: float):
+        self.client_id = client_id
+        self.key = key
+        self.host = host
+        self.port = port
+        self.last_seen = last_seen
+        self.handle = None
+        self.outgoing = None
+        self.reliable: ReliableSession = None
+        # frames are datagrams
+        self.counters = Counters()
+
+
+class _Worker(QObject):
+    connected = Signal(int, str, int)
+    disconnected = Signal(int)
+    message_batch = Signal(list)
+    error = Signal(int, Exception)
+    closed = Signal()
+
+    bind_signal = Signal(int)
+    close_signal = Signal()
+    disconnect_signal = Signal(int)
+    write_signal = Signal(int, bytes, int)
+    write_all_signal = Signal(bytes)
+    sample_signal = Signal()
+    overload_signal = Signal(object)
+
+    def __init__(self, client_ids, session_timeout: float, batch_size: int, packed: bool, mtu: int,
+                 reliable: ReliableOptions):
+        super(_Worker, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.socket: QUdpSocket = None
+        self.client_ids = client_ids
+        self.session_timeout = session_timeout
+        self.batch_size = batch_size
+        self.packed = packed
+        self.mtu = mtu
+        self.reliable = reliable
+        self.wheel = None
+        self.own_thread = False
+        # created in worker thread
+        self.guard = None
+
+        self.sessions = {}
+        self.sessions_by_id = {}
+        self.stats = ConnectionStats()
+
+        # sessions with queued packed messages, flushed once per event loop iteration
+        self.pending = []
+        self.flush_timer = QTimer(self)
+        self.flush_timer.setSingleShot(True)
+        self.flush_timer.setInterval(0)
+        self.flush_timer.timeout.connect(self.__flush)
+
+        self.bind_signal.connect(self.__on_bind_signal)
+        self.close_signal.connect(self.__on_close_signal)
+        self.disconnect_signal.connect(self.__on_disconnect_signal)
+        self.write_signal.connect(self.__on_write_signal)
+        self.write_all_signal.connect(self.__on_write_all_signal)
+        self.sample_signal.connect(self.__on_sample_signal)
+        self.overload_signal.connect(self.__on_overload_signal)
+
+    @Slot(int)
+    def __on_bind_signal(self, socket_descriptor: int):
+        """Adopt bound datagram socket."""
+        self.logger = logging.getLogger(f"UDPBalancerWorker-{self.objectName()}")
+        udp = QUdpSocket()
+        udp.setParent(None)
+        if not udp.setSocketDescriptor(socket_descriptor, QAbstractSocket.BoundState, QIODevice.ReadWrite):
+            self.error.emit(0, Exception(udp.errorString()))
+            return
+        udp.readyRead.connect(self.__on_socket_ready_read)
+        self.socket = udp
+        self.wheel = TimerWheel.instance()
+
+    @Slot()
+    def __on_socket_ready_read(self):
+        """Drain all pending datagrams and deliver them in batches.
+
+        Note:
+            Emits connected signal for new peers and message_batch signal.
+        """
+        guard = self.guard
+        if guard is not None and guard.pauses_reading and guard.overloaded:
+            # datagrams wait in socket receive buffer, kernel drops them once it is full
+            return
+        udp = self.socket
+        sessions = self.sessions
+        batch_size = self.batch_size
+        packed = self.packed
+        reliable = self.reliable is not None
+        shed = guard is not None and guard.overloaded and 0 in guard.shed_streams
+        now = monotonic()
+        batch = []
+        acknowledge = set()
+        while udp.hasPendingDatagrams():
+            size = udp.pendingDatagramSize()
+            data, host, port = udp.readDatagram(max(size, 0))
+            key = (host.toString(), port)
+            session = sessions.get(key)
+            if session is None:
+                if guard is not None and guard.reject():
+                    continue
+                session = self.__create_session(key, host, port, now)
+                if batch:
+                    # keep order between messages and connected signal
+                    self.message_batch.emit(batch)
+                    batch = []
+                self.connected.emit(session.client_id, key[0], port)
+            session.last_seen = now
+            client_id = session.client_id
+            counters = session.counters
+            counters.frames_in += 1
+            counters.bytes_in += len(data)
+            try:
+                messages = unpack_datagram(data) if packed else (data,)
+                if reliable:
+                    acknowledge.add(session)
+                    for frame in messages:
+                        received = session.reliable.receive(frame)
+                        if shed:
+                            received = [message for message in received if not guard.shed_message(0)]
+                        batch.extend((client_id, message) for message in received)
+                else:
+                    if shed:
+                        messages = [message for message in messages if not guard.shed_message(0)]
+                    batch.extend((client_id, message) for message in messages)
+            except ValueError as e:
+                counters.decode_errors += 1
+                self.error.emit(client_id, e)
+            if len(batch) >= batch_size:
+                self.message_batch.emit(batch)
+                batch = []
+        if batch:
+            self.message_batch.emit(batch)
+        for session in acknowledge:
+            if session.reliable is not None:
+                session.reliable.flush_acks()
+
+    def __create_session(self, key: tuple, host: QHostAddress, port: int, now: float) -> _Session:
+        session = _Session(next(self.client_ids), key, host, port, now)
+        self.sessions[key] = session
+        self.sessions_by_id[session.client_id] = session
+        self.stats.add()
+        if self.reliable is not None:
+            session.reliable = ReliableSession(self.reliable, lambda frame: self.__send(session, frame),
+                                               lambda: self.__on_session_lost(session))
+        if self.session_timeout:
+            session.handle = self.wheel.schedule(self.session_timeout, lambda: self.__check_session(session))
+        return session
+
+    def __check_session(self, session: _Session):
+        session.handle = None
+        idle = monotonic() - session.last_seen
+        if idle >= self.session_timeout:
+            self.__expire_session(session, DISCONNECT_IDLE_TIMEOUT)
+        else:
+            session.handle = self.wheel.schedule(self.session_timeout - idle, lambda: self.__check_session(session))
+
+    def __expire_session(self, session: _Session, reason: str = DISCONNECT_LOCAL):
+        if self.sessions.pop(session.key, None) is None:
+            return
+        del self.sessions_by_id[session.client_id]
+        self.stats.remove(session.counters, reason)
+        if session.handle is not None:
+            self.wheel.cancel(session.handle)
+            session.handle = None
+        if session.reliable is not None:
+            session.reliable.close()
+            session.reliable = None
+        self.disconnected.emit(session.client_id)
+
+    def __on_session_lost(self, session: _Session):
+        self.error.emit(session.client_id, DeliveryFailedError(f"Client {session.client_id} did not acknowledge "
+                                                               f"message after {self.reliable.max_retransmits} "
+                                                               f"retransmits"))
+        self.__expire_session(session, DISCONNECT_LOST)
+
+    @Slot(int)
+    def __on_disconnect_signal(self, client_id: int):
+        session = self.sessions_by_id.get(client_id)
+        if session:
+            self.__expire_session(session)
+
+    @Slot(int, bytes, int)
+    def __on_write_signal(self, client_id: int, data: bytes, channel: int):
+        session = self.sessions_by_id.get(client_id)
+        if session is None:
+            self.error.emit(client_id, Exception(f"Client {client_id} not found"))
+        elif session.reliable is not None:
+            session.reliable.write(data, channel if channel >= 0 else None)
+        else:
+            self.__send(session, data)
+
+    @Slot(bytes)
+    def __on_write_all_signal(self, data: bytes):
+        for session in list(self.sessions.values()):
+            if session.reliable is not None:
+                session.reliable.write(data)
+            else:
+                self.__send(session, data)
+
+    def __send(self, session: _Session, data: bytes):
+        if self.packed:
+            self.__queue(session, data)
+        elif self.socket.writeDatagram(data, session.host, session.port) < 0:
+            self.error.emit(session.client_id, Exception(self.socket.errorString()))
+        else:
+            session.counters.frames_out += 1
+            session.counters.bytes_out += len(data)
+
+    def __queue(self, session: _Session, data: bytes):
+        if session.outgoing is None:
+            session.outgoing = []
+            self.pending.append(session)
+            if not self.flush_timer.isActive():
+                self.flush_timer.start()
+        session.outgoing.append(data)
+
+    @Slot()
+    def __flush(self):
+        """Send queued messages packed into datagrams."""
+        pending = self.pending
+        self.pending = []
+        for session in pending:
+            messages = session.outgoing
+            session.outgoing = None
+            if self.socket is None or session.key not in self.sessions:
+                continue
+            for datagram in pack_datagrams(messages, self.mtu):
+                if self.socket.writeDatagram(datagram, session.host, session.port) < 0:
+                    self.error.emit(session.client_id, Exception(self.socket.errorString()))
+                    break
+                session.counters.frames_out += 1
+                session.counters.bytes_out += len(datagram)
+
+    @Slot(object)
+    def __on_overload_signal(self, overload: OverloadOptions):
+        self.__close_guard()
+        if overload is not None:
+            self.guard = OverloadGuard(overload, lambda: ())
+            self.guard.overload_changed.connect(self.__on_overload_changed)
+
+    @Slot(bool)
+    def __on_overload_changed(self, overloaded: bool):
+        if not overloaded and self.socket is not None:
+            # readyRead is not emitted again for datagrams left unread while paused
+            self.__on_socket_ready_read()
+
+    def __close_guard(self):
+        if self.guard is not None:
+            self.guard.close()
+            delete_later(self.guard)
+            self.guard = None
+
+    @Slot()
+    def __on_sample_signal(self):
+        queued = 0
+        for session in list(self.sessions.values()):
+            if session.outgoing:
+                queued += len(session.outgoing)
+            if session.reliable is not None:
+                queued += session.reliable.pending()
+        self.stats.queued_messages = queued
+
+    def snapshot(self, per_client: bool) -> dict:
+        """Statistics of the worker. Called from balancer thread."""
+        counters = {session.client_id: session.counters for session in self.sessions.copy().values()}
+        stats = self.stats.snapshot(counters, per_client)
+        guard = self.guard
+        if guard is not None:
+            stats.update(guard.snapshot())
+        stats["worker"] = self.objectName()
+        return stats
+
+    @Slot()
+    def __on_close_signal(self):
+        """Close socket, expire all sessions and stop worker thread.
+
+        Note:
+            Emits disconnected signal for every session and closed signal.
+        """
+        self.__close_guard()
+        self.flush_timer.stop()
+        self.__flush()
+        for session in list(self.sessions.values()):
+            self.__expire_session(session)
+        if self.socket is not None:
+            try:
+                self.socket.close()
+            except RuntimeError:
+                pass
+        self.closed.emit()
+        if self.own_thread:
+            self.thread().quit()
+
+
+class UDPBalancer(AbstractBalancer):
+    """Receives datagrams and keeps a session for every peer.
+
+    Peer is represented by client ID from its first datagram until it is idle for session_timeout
+    seconds or disconnect is called. With threads greater than 1, every worker thread has its own
+    socket bound to the same port with SO_REUSEPORT and the kernel spreads peers between them.
+
+    With packed enabled, every datagram carries one or more messages prefixed with their size,
+    as sent by UDPClient with packed enabled. Messages written to the same peer during one event loop
+    iteration are packed into as few datagrams as mtu allows.
+
+    With reliable options, messages are acknowledged by peers and retransmitted when lost.
+    Peer must use UDPClient with the same reliable and packed settings. Peer which does not
+    acknowledge a message after max_retransmits retransmits is disconnected.
+
+    With overload options, every worker measures its event loop lag and applies overload policies
+    to its peer sessions, see OverloadOptions.
+
+    Args:
+        threads (int): Number of worker threads. Zero handles datagrams in the caller's thread.
+        session_timeout (float): Seconds of silence after which peer session expires. Zero disables expiry.
+        batch_size (int): Number of messages after which message_batch signal is emitted.
+        packed (bool): Pack and unpack multiple messages per datagram.
+        mtu (int): Maximum size of packed datagram payload.
+        reliable (ReliableOptions): Reliable delivery settings. None sends plain datagrams.
+        overload (OverloadOptions): Event loop lag monitoring and overload policies of worker threads.
+    """
+
+    def __init__(self, threads: int = 0, session_timeout: float = 60.0, batch_size: int = 64,
+                 packed: bool = False, mtu: int = DEFAULT_MTU, reliable: ReliableOptions = None,
+                 overload: OverloadOptions = None):
+        super(UDPBalancer, self).__init__(overload=overload)
+        if threads > 1 and SO_REUSEPORT is None:
+            self.logger.warning("SO_REUSEPORT is not supported on this platform, using one worker thread")
+            threads = 1
+        self.threads = threads
+        self.session_timeout = session_timeout
+        self.batch_size = batch_size
+        self.packed = packed
+        self.mtu = mtu
+        self.reliable = reliable
+        self.__client_ids = itertools.count(1)
+        self.__workers = []
+        self.__clients = {}
+        self.__running = False
+
+    @Slot(str, int)
+    def bind(self, ip: str, port: int) -> int:
+        """Bind sockets and start workers.
+
+        Args:
+            ip (str): Address to bind to.
+            port (int): Port to bind to. Zero selects free port.
+
+        Returns:
+            int: Bound port.
+        """
+        family = socket.AF_INET6 if ipaddress.ip_address(ip).version == 6 else socket.AF_INET
+        for i in range(max(self.threads, 1)):
+            native = socket.socket(family, socket.SOCK_DGRAM)
+            if self.threads > 1:
+                native.setsockopt(socket.SOL_SOCKET, SO_REUSEPORT, 1)
+            native.bind((ip, port))
+            native.setblocking(False)
+            port = native.getsockname()[1]
+            self.__start_worker(i, native.detach())
+        self.__running = True
+        return port
+
+    def __start_worker(self, index: int, socket_descriptor: int):
+        worker = _Worker(self.__client_ids, self.session_timeout, self.batch_size, self.packed, self.mtu,
+                         self.reliable)
+        worker.setObjectName(str(index))
+        worker.connected.connect(self.__on_worker_connected)
+        worker.disconnected.connect(self.__on_worker_disconnected)
+        worker.message_batch.connect(self.message_batch.emit)
+        worker.error.connect(self.client_error.emit)
+
+        thread = None
+        if self.threads > 0:
+            thread = QThread()
+            worker.own_thread = True
+            worker.moveToThread(thread)
+            thread.start()
+        self.__workers.append((worker, thread))
+        if self.overload is not None:
+            worker.overload_signal.emit(self.overload)
+        worker.bind_signal.emit(socket_descriptor)
+
+    def set_overload(self, overload: OverloadOptions) -> None:
+        super().set_overload(overload)
+        for worker, thread in self.__workers:
+            worker.overload_signal.emit(overload)
+
+    @Slot(int, str, int)
+    def __on_worker_connected(self, client_id: int, ip: str, port: int):
+        self.__clients[client_id] = self.sender()
+        self.connected.emit(client_id, ip, port)
+
+    @Slot(int)
+    def __on_worker_disconnected(self, client_id: int):
+        self.__clients.pop(client_id, None)
+        self.disconnected.emit(client_id)
+
+    @Slot(type, int)
+    def balance(self, socket_type: type, socket_descriptor: int) -> int:
+        """Stream sockets are not supported, socket is closed and reported as client error."""
+        client_id = self.get_next_socket_id()
+        close_descriptor(socket_descriptor)
+        # caller learns client ID when this returns
+        QTimer.singleShot(0, lambda: self.client_error.emit(
+            client_id, NotImplementedError(f"{self.__class__.__name__} does not accept stream sockets")))
+        QTimer.singleShot(0, lambda: self.disconnected.emit(client_id))
+        return client_id
+
+    @Slot(int, bytes)
+    def write(self, client_id: int, message: bytes, channel: int = None):
+        """Send message to peer.
+
+        Args:
+            client_id (int): Client ID.
+            message (bytes): Message.
+            channel (int): Reliable channel, CHANNEL_ORDERED or CHANNEL_UNORDERED.
+                Defaults to channel from reliable options. Ignored without reliable options.
+        """
+        worker = self.__clients.get(client_id)
+        if worker:
+            worker.write_signal.emit(client_id, message, -1 if channel is None else channel)
+        else:
+            self.client_error.emit(client_id, Exception(f"Client {client_id} not found"))
+
+    @Slot(bytes)
+    def write_all(self, message: bytes):
+        for worker, thread in self.__workers:
+            worker.write_all_signal.emit(message)
+
+    def worker_stats(self, per_client: bool = False) -> list:
+        """Frames of UDPBalancer are datagrams."""
+        for worker, thread in self.__workers:
+            worker.sample_signal.emit()
+        return [worker.snapshot(per_client) for worker, thread in self.__workers]
+
+    @Slot(int)
+    def disconnect(self, client_id: int):
+        worker = self.__clients.get(client_id)
+        if worker:
+            worker.disconnect_signal.emit(client_id)
+
+    @Slot()
+    def close(self):
+        if not self.__running:
+            return
+        self.__running = False
+        for worker, thread in self.__workers:
+            worker.close_signal.emit()
+        self.closed.emit()
+
+    @Slot(float)
+    def drain(self, timeout: float = 5.0):
+        """Close sockets and stop worker threads. Datagrams are sent immediately,
+        so there is nothing to flush."""
+        started = monotonic()
+        self.close()
+        self.join_workers()
+        self.drained.emit({"read": 0.0, "flush": 0.0, "join": monotonic() - started,
+                           "dropped_bytes": 0, "aborted": 0})
+
+    def join_workers(self) -> None:
+        for worker, thread in self.__workers:
+            if thread is not None:
+                thread.wait()
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.__running
+
+    @Slot(int)
+    def wait(self, timeout: int = 0) -> None:
+        """Wait for worker threads to finish.
+
+        Args:
+            timeout (int): Milliseconds to wait for each thread. Zero waits until threads finish.
+        """
+        for worker, thread in self.__workers:
+            if thread is None:
+                continue
+            if timeout > 0:
+                thread.wait(timeout)
+            else:
+                thread.wait()
@@ -1,4 +1,9 @@
-from .AbstractBalancer import AbstractBalancer
-from .NoBalancer import NoBalancer
-from .ThreadBalancer import ThreadBalancer
-from .ThreadPoolBalancer import ThreadPoolBalancer
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".AbstractBalancer": ("AbstractBalancer",),
+    ".NoBalancer": ("NoBalancer",),
+    ".ThreadBalancer": ("ThreadBalancer",),
+    ".ThreadPoolBalancer": ("ThreadPoolBalancer",),
+    ".UDPBalancer": ("UDPBalancer",),
+})
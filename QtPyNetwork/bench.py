@@ -0,0 +1,254 @@
+"""Load generator behind ``python -m QtPyNetwork bench``.
+
+Server runs in a separate process, so CPU time and memory of server and clients are measured
+separately and clients do not compete with server for the GIL. Clients are hosted by ClientManager.
+Every message starts with the time it was sent, echo server sends it back and client measures
+round trip latency. Sink server only counts received messages.
+
+Result is printed to stdout as a single JSON object.
+"""
+import sys
+import json
+import argparse
+import subprocess
+from struct import pack, unpack_from, calcsize
+from time import perf_counter, process_time
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+TIMESTAMP = '!d'
+TIMESTAMP_SIZE = calcsize(TIMESTAMP)
+# rate limited clients send messages every tick
+TICK = 0.01
+BALANCERS = ("no", "thread", "pool")
+
+
+def percentile(values: list, fraction: float) -> float:
+    """Nearest rank percentile of sorted values."""
+    if not values:
+        return None
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def usage(cpu_start: float) -> dict:
+    """CPU time used since cpu_start and peak resident set size of this process."""
+    rss = None
+    if resource is not None:
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # kilobytes on Linux, bytes on macOS
+        rss = rss / 1024 if sys.platform != "darwin" else rss / 1024 ** 2
+    return {"cpu_s": round(process_time() - cpu_start, 4), "max_rss_mb": rss and round(rss, 2)}
+
+
+def create_balancer(name: str, threads: int):
+    from QtPyNetwork.balancer import NoBalancer, ThreadBalancer, ThreadPoolBalancer
+    if name == "no":
+        return NoBalancer()
+    if name == "thread":
+        return ThreadBalancer()
+    return ThreadPoolBalancer(threads=threads)
+
+
+def serve(args) -> None:
+    """Run echo or sink server until every client disconnected. Prints port to stdout on start
+    and server statistics as JSON when done.
+    """
+    from qtpy.QtCore import QCoreApplication, QTimer
+    from QtPyNetwork.server import TCPServer
+
+    app = QCoreApplication(sys.argv)
+    server = TCPServer(create_balancer(args.balancer, args.threads))
+    state = {"messages": 0, "bytes": 0, "connected": 0, "disconnected": 0, "cpu": process_time()}
+
+    def on_message(client, message):
+        state["messages"] += 1
+        state["bytes"] += len(message)
+        if echo:
+            client.write(message)
+
+    def on_disconnected(client):
+        state["disconnected"] += 1
+        if state["disconnected"] >= args.clients:
+            app.quit()
+
+    def on_connected(client, ip, port):
+        state["connected"] += 1
+
+    echo = args.mode == "echo"
+    server.message.connect(on_message)
+    server.connected.connect(on_connected)
+    server.disconnected.connect(on_disconnected)
+    server.start("127.0.0.1", 0)
+    print(server.server.serverPort(), flush=True)
+    # give up if load generator died
+    QTimer.singleShot(int((args.duration + 60) * 1000), app.quit)
+    app.exec_()
+    result = {"messages": state["messages"], "bytes": state["bytes"], "connections": state["connected"]}
+    result.update(usage(state["cpu"]))
+    server.close()
+    server.balancer.close()
+    server.wait()
+    print(json.dumps(result), flush=True)
+
+
+def run(args) -> dict:
+    """Start server process, connect clients, send messages for duration seconds
+    and collect statistics.
+    """
+    from qtpy.QtCore import QCoreApplication, QTimer
+    from QtPyNetwork.client import ClientManager
+
+    command = [sys.executable, "-m", "QtPyNetwork", "bench", "--serve", "--balancer", args.balancer,
+               "--threads", str(args.threads), "--mode", args.mode, "--clients", str(args.clients),
+               "--duration", str(args.duration)]
+    process = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    port = int(process.stdout.readline())
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    manager = ClientManager(threads=args.client_threads)
+    echo = args.mode == "echo"
+    padding = b"x" * max(args.size - TIMESTAMP_SIZE, 0)
+    latencies = []
+    clients = []
+    state = {"connected": 0, "failed": 0, "sent": 0, "received": 0, "sending": False,
+             "started": 0.0, "stopped": 0.0, "cpu": 0.0, "credit": 0.0}
+
+    def send(client):
+        client.write(pack(TIMESTAMP, perf_counter()) + padding)
+        state["sent"] += 1
+
+    def start():
+        state["sending"] = True
+        state["cpu"] = process_time()
+        state["started"] = perf_counter()
+        if args.rate:
+            ticker.start()
+        elif echo:
+            # keep window messages in flight on every connection
+            for client in clients:
+                for _ in range(args.window):
+                    send(client)
+        else:
+            ticker.start()
+        QTimer.singleShot(int(args.duration * 1000), stop)
+
+    def stop():
+        state["sending"] = False
+        state["stopped"] = perf_counter()
+        ticker.stop()
+        # wait for echoes of messages in flight
+        QTimer.singleShot(int(args.drain * 1000) if echo else 0, app.quit)
+
+    def on_tick():
+        if args.rate:
+            state["credit"] += args.rate * TICK
+            count = int(state["credit"])
+            state["credit"] -= count
+        else:
+            count = args.window
+        for client in clients:
+            if client.is_connected():
+                for _ in range(count):
+                    send(client)
+
+    def on_connected(client, ip, port):
+        state["connected"] += 1
+        check_connected()
+
+    def on_failed(client):
+        state["failed"] += 1
+        check_connected()
+
+    def check_connected():
+        if state["connected"] + state["failed"] == args.clients:
+            start()
+
+    def on_message(client, message):
+        now = perf_counter()
+        latencies.append(now - unpack_from(TIMESTAMP, message)[0])
+        state["received"] += 1
+        if state["sending"] and not args.rate:
+            send(client)
+
+    ticker = QTimer()
+    ticker.setInterval(int(TICK * 1000))
+    ticker.timeout.connect(on_tick)
+    manager.connected.connect(on_connected)
+    manager.failed_to_connect.connect(on_failed)
+    manager.message.connect(on_message)
+    for _ in range(args.clients):
+        clients.append(manager.add_client("127.0.0.1", port, timeout=args.connect_timeout))
+    # give up if clients did not connect
+    QTimer.singleShot(int((args.connect_timeout + args.duration + args.drain + 5) * 1000), app.quit)
+    app.exec_()
+
+    elapsed = (state["stopped"] or perf_counter()) - state["started"] if state["started"] else 0.0
+    client_usage = usage(state["cpu"])
+    manager.close()
+    manager.wait()
+    try:
+        stdout, _ = process.communicate(timeout=30)
+        server = json.loads(stdout.strip().splitlines()[-1])
+    except (subprocess.TimeoutExpired, ValueError, IndexError):
+        process.kill()
+        server = None
+
+    latencies.sort()
+    delivered = state["received"] if echo else (server or {}).get("messages", 0)
+    return {
+        "config": {"balancer": args.balancer, "threads": args.threads, "mode": args.mode,
+                   "clients": args.clients, "client_threads": args.client_threads, "size": args.size,
+                   "rate": args.rate, "window": args.window, "duration": args.duration},
+        "connections": state["connected"],
+        "failed_connections": state["failed"],
+        "sent": state["sent"],
+        "received": state["received"],
+        "elapsed_s": round(elapsed, 4),
+        "throughput_msg_per_s": round(delivered / elapsed, 2) if elapsed else None,
+        "throughput_mb_per_s": round(delivered * max(args.size, TIMESTAMP_SIZE) / elapsed / 1024 ** 2, 3)
+        if elapsed else None,
+        "latency_ms": {name: None if value is None else round(value * 1000, 4) for name, value in (
+            ("p50", percentile(latencies, 0.5)),
+            ("p99", percentile(latencies, 0.99)),
+            ("p999", percentile(latencies, 0.999)),
+            ("max", latencies[-1] if latencies else None))},
+        "client": client_usage,
+        "server": server,
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("--balancer", choices=BALANCERS, default="pool",
+                        help="server balancer: NoBalancer, ThreadBalancer or ThreadPoolBalancer")
+    parser.add_argument("--threads", type=int, default=4, help="ThreadPoolBalancer threads")
+    parser.add_argument("--mode", choices=("echo", "sink"), default="echo",
+                        help="echo messages back and measure latency or only receive them")
+    parser.add_argument("--clients", type=int, default=10, help="number of concurrent connections")
+    parser.add_argument("--client-threads", type=int, default=2, help="ClientManager threads")
+    parser.add_argument("--size", type=int, default=64, help="message size in bytes, at least 8")
+    parser.add_argument("--rate", type=float, default=0,
+                        help="messages per second per connection, 0 sends as fast as window allows")
+    parser.add_argument("--window", type=int, default=1,
+                        help="messages in flight per connection (echo) or sent per tick (sink) without rate")
+    parser.add_argument("--duration", type=float, default=5, help="seconds to send messages for")
+    parser.add_argument("--drain", type=float, default=1, help="seconds to wait for echoes after sending")
+    parser.add_argument("--connect-timeout", type=int, default=10, help="connection timeout in seconds")
+    parser.add_argument("--output", help="write JSON result to file instead of stdout")
+    parser.add_argument("--serve", action="store_true", help=argparse.SUPPRESS)
+
+
+def main(args) -> None:
+    if args.serve:
+        serve(args)
+        return
+    if args.clients <= 0 or args.threads <= 0 or args.client_threads <= 0 or args.window <= 0:
+        raise SystemExit("clients, threads, client threads and window must be greater than 0")
+    result = json.dumps(run(args), indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(result + "\n")
+    else:
+        print(result)
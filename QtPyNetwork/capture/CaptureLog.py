@@ -0,0 +1,237 @@
+from struct import pack, pack_into, unpack_from, calcsize
+from bisect import bisect_right
+from time import monotonic, time
+
+import os
+import mmap
+
+MAGIC = b"QPNCAP01"
+# magic and wall clock time capture started at
+FILE_HEADER = '!8sd'
+FILE_HEADER_SIZE = calcsize(FILE_HEADER)
+# seconds since capture started, kind, client ID, stream ID and payload size
+RECORD = '!dBLLL'
+RECORD_SIZE = calcsize(RECORD)
+# seconds since capture started and file offset of the first record written at or after it
+INDEX_ENTRY = '!dQ'
+INDEX_ENTRY_SIZE = calcsize(INDEX_ENTRY)
+INDEX_SUFFIX = ".idx"
+
+# kind 0 is the zeroed space preallocated after the last record
+CAPTURE_CONNECTED = 1
+CAPTURE_DISCONNECTED = 2
+CAPTURE_IN = 3
+CAPTURE_OUT = 4
+
+KINDS = (CAPTURE_CONNECTED, CAPTURE_DISCONNECTED, CAPTURE_IN, CAPTURE_OUT)
+
+
+class CaptureRecord:
+    """One captured event.
+
+    Args:
+        time (float): Seconds since capture started.
+        kind (int): CAPTURE_CONNECTED (payload is peer address as ip:port), CAPTURE_DISCONNECTED,
+            CAPTURE_IN (message received from client) or CAPTURE_OUT (message written to client).
+        client_id (int): Client ID.
+        stream_id (int): Stream ID of message, 0 for plain messages.
+        payload (bytes): Message.
+    """
+
+    __slots__ = ("time", "kind", "client_id", "stream_id", "payload")
+
+    def __init__(self, time: float, kind: int, client_id: int, stream_id: int, payload: bytes):
+        self.time = time
+        self.kind = kind
+        self.client_id = client_id
+        self.stream_id = stream_id
+        self.payload = payload
+
+    def __repr__(self):
+        return (f"CaptureRecord(time={self.time}, kind={self.kind}, client_id={self.client_id}, "
+                f"stream_id={self.stream_id}, payload={len(self.payload)} bytes)")
+
+
+class CaptureWriter:
+    """Append-only capture log.
+
+    Records are copied into a memory-mapped file, so writing one costs no system call.
+    File grows by chunk_size when mapped space runs out and is truncated to its content
+    when closed. Space after the last record is zeroed, so logs of crashed processes
+    can be read up to the last record written.
+
+    Index file (log path with .idx suffix) holds offset of the first record of every
+    index_interval seconds, readers use it to start reading in the middle of the log.
+
+    Writer is not thread safe, AbstractServer.set_capture() uses it from the server's thread.
+
+    Args:
+        path (str): Log path. Existing log is overwritten.
+        chunk_size (int): Bytes the file grows by.
+        index_interval (float): Seconds between index entries.
+    """
+
+    def __init__(self, path: str, chunk_size: int = 4 * 1024 * 1024, index_interval: float = 1.0):
+        if chunk_size < FILE_HEADER_SIZE:
+            raise ValueError(f"Chunk size must be at least {FILE_HEADER_SIZE} bytes")
+        self.__path = path
+        self.__chunk_size = chunk_size
+        self.__index_interval = index_interval
+        self.__file = open(path, "w+b")
+        self.__index = open(path + INDEX_SUFFIX, "wb")
+        self.__size = chunk_size
+        self.__file.truncate(chunk_size)
+        self.__map = mmap.mmap(self.__file.fileno(), chunk_size)
+        pack_into(FILE_HEADER, self.__map, 0, MAGIC, time())
+        self.__offset = FILE_HEADER_SIZE
+        self.__started = monotonic()
+        self.__next_index = 0.0
+        self.__records = 0
+
+    def path(self) -> str:
+        return self.__path
+
+    def records(self) -> int:
+        """Number of records written."""
+        return self.__records
+
+    def size(self) -> int:
+        """Bytes of log content."""
+        return self.__offset
+
+    def is_closed(self) -> bool:
+        return self.__map is None
+
+    def record(self, kind: int, client_id: int, stream_id: int = 0, payload: bytes = b"") -> None:
+        """Append record stamped with the current time. Records of closed writer are dropped,
+        so server may keep capturing into a log which was closed before set_capture(None).
+
+        Args:
+            kind (int): One of CAPTURE_* constants.
+            client_id (int): Client ID.
+            stream_id (int): Stream ID of message, 0 for plain messages.
+            payload (bytes): Message or peer address.
+        """
+        if self.__map is None:
+            return
+        now = monotonic() - self.__started
+        offset = self.__offset
+        end = offset + RECORD_SIZE + len(payload)
+        if end > self.__size:
+            self.__grow(end)
+        if now >= self.__next_index:
+            self.__index.write(pack(INDEX_ENTRY, now, offset))
+            self.__next_index = (now // self.__index_interval + 1) * self.__index_interval
+        pack_into(RECORD, self.__map, offset, now, kind, client_id, stream_id, len(payload))
+        self.__map[offset + RECORD_SIZE:end] = payload
+        self.__offset = end
+        self.__records += 1
+
+    def __grow(self, end: int):
+        # mmap.resize() is not available everywhere, file is mapped again instead
+        size = self.__size
+        while size < end:
+            size += self.__chunk_size
+        self.__map.close()
+        self.__file.truncate(size)
+        self.__map = mmap.mmap(self.__file.fileno(), size)
+        self.__size = size
+
+    def flush(self) -> None:
+        """Write mapped pages and index to disk."""
+        if self.__map is None:
+            return
+        self.__map.flush()
+        self.__index.flush()
+
+    def close(self) -> None:
+        if self.__map is None:
+            return
+        self.__map.flush()
+        self.__map.close()
+        self.__map = None
+        self.__file.truncate(self.__offset)
+        self.__file.close()
+        self.__index.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+class CaptureReader:
+    """Reads capture log written by CaptureWriter.
+
+    Args:
+        path (str): Log path.
+
+    Raises:
+        ValueError: File is not a capture log.
+    """
+
+    def __init__(self, path: str):
+        self.__file = open(path, "rb")
+        size = os.fstat(self.__file.fileno()).st_size
+        if size < FILE_HEADER_SIZE:
+            self.__file.close()
+            raise ValueError(f"{path} is not a capture log")
+        self.__map = mmap.mmap(self.__file.fileno(), size, access=mmap.ACCESS_READ)
+        magic, self.__started = unpack_from(FILE_HEADER, self.__map, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path} is not a capture log")
+        self.__index_times = []
+        self.__index_offsets = []
+        try:
+            with open(path + INDEX_SUFFIX, "rb") as index:
+                data = index.read()
+        except OSError:
+            data = b""
+        for entry in range(len(data) // INDEX_ENTRY_SIZE):
+            entry_time, offset = unpack_from(INDEX_ENTRY, data, entry * INDEX_ENTRY_SIZE)
+            self.__index_times.append(entry_time)
+            self.__index_offsets.append(offset)
+
+    def started(self) -> float:
+        """Wall clock time capture started at, as returned by time.time()."""
+        return self.__started
+
+    def records(self, start: float = 0.0, end: float = None):
+        """Iterate over records in the order they were written.
+
+        Args:
+            start (float): Skip records captured earlier than start seconds.
+            end (float): Stop at the first record captured later than end seconds.
+
+        Yields:
+            CaptureRecord: Records.
+        """
+        data = self.__map
+        size = len(data)
+        position = bisect_right(self.__index_times, start) - 1
+        offset = self.__index_offsets[position] if position >= 0 else FILE_HEADER_SIZE
+        while offset + RECORD_SIZE <= size:
+            record_time, kind, client_id, stream_id, length = unpack_from(RECORD, data, offset)
+            payload_end = offset + RECORD_SIZE + length
+            if kind == 0 or payload_end > size:
+                return
+            if end is not None and record_time > end:
+                return
+            if record_time >= start:
+                yield CaptureRecord(record_time, kind, client_id, stream_id, data[offset + RECORD_SIZE:payload_end])
+            offset = payload_end
+
+    def __iter__(self):
+        return self.records()
+
+    def close(self) -> None:
+        self.__map.close()
+        self.__file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
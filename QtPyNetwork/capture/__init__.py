@@ -0,0 +1,6 @@
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".CaptureLog": ("CaptureWriter", "CaptureReader", "CaptureRecord", "CAPTURE_CONNECTED", "CAPTURE_DISCONNECTED",
+                    "CAPTURE_IN", "CAPTURE_OUT"),
+})
@@ -1,4 +1,4 @@
-from qtpy.QtCore import Slot, Signal, QObject
+from qtpy.QtCore import Slot, Signal, QObject, QTimer
 from qtpy.QtNetwork import QAbstractSocket
 
 from abc import abstractmethod
@@ -9,12 +9,15 @@ class AbstractClient(QObject):
     connected = Signal(str, int)
     disconnected = Signal()
     message = Signal(bytes)
+    stream_message = Signal(int, bytes)
     error = Signal(Exception)
     closed = Signal()
     failed_to_connect = Signal()
+    stats_updated = Signal(dict)
 
     def __init__(self):
         super(AbstractClient, self).__init__()
+        self.__stats_timer = None
 
     @abstractmethod
     @Slot(str, int)
@@ -53,6 +56,30 @@ class AbstractClient(QObject):
         """
         self.message.emit(message)
 
+    @Slot(int, bytes)
+    def write_stream(self, stream_id: int, data: bytes):
+        """Write data to logical stream. Stream 0 is the plain message stream.
+
+        Args:
+            stream_id (int): Stream ID.
+            data (bytes): Data to write.
+        """
+        if stream_id != 0:
+            self.error.emit(NotImplementedError(f"{self.__class__.__name__} does not support streams"))
+            return
+        self.write(data)
+
+    @Slot(int, bytes)
+    def on_stream_message(self, stream_id: int, message: bytes):
+        """Called when client receives message on logical stream other than 0.
+        Emits stream_message signal.
+
+        Args:
+            stream_id (int): Stream ID.
+            message (bytes): Message.
+        """
+        self.stream_message.emit(stream_id, message)
+
     @Slot()
     def on_disconnected(self):
         """Called when device disconnects from server.
@@ -82,6 +109,26 @@ class AbstractClient(QObject):
         Emits closed signal."""
         self.closed.emit()
 
+    @Slot()
+    def stats(self) -> dict:
+        """Traffic statistics of the client, see metrics.ConnectionStats.snapshot()."""
+        return {}
+
+    @Slot(float)
+    def set_stats_interval(self, interval: float) -> None:
+        """Emit stats_updated signal with stats() every interval seconds.
+
+        Args:
+            interval (float): Seconds between signals. Zero stops emitting.
+        """
+        if self.__stats_timer is None:
+            self.__stats_timer = QTimer(self)
+            self.__stats_timer.timeout.connect(lambda: self.stats_updated.emit(self.stats()))
+        if interval > 0:
+            self.__stats_timer.start(int(interval * 1000))
+        else:
+            self.__stats_timer.stop()
+
     @abstractmethod
     @Slot()
     def close(self):
@@ -0,0 +1,167 @@
+from qtpy.QtNetwork import QAbstractSocket, QTcpSocket, QHostAddress
+from qtpy.QtCore import QDeadlineTimer
+
+from collections import deque
+
+from QtPyNetwork.common import DataBuffer
+from QtPyNetwork.exception import NotConnectedError
+from QtPyNetwork.options import SocketOptions
+from QtPyNetwork.resolver import Resolver
+
+import logging
+
+
+class BlockingClient:
+    """Synchronous TCP client for scripts and worker processes without running Qt event loop.
+
+    Every call blocks until it is done or its timeout expires, sleeping in the operating system
+    in the meantime (waitForConnected, waitForReadyRead and waitForBytesWritten), so waiting
+    client uses no CPU. Client must be used from a single thread. Heartbeats are not supported,
+    pings sent by server are answered while client waits for data.
+
+    Timeouts are in seconds, None waits forever.
+
+    Example:
+        with BlockingClient() as client:
+            client.connect("127.0.0.1", 12500)
+            reply = client.request(b"hello", timeout=2)
+
+    Args:
+        socket_options (SocketOptions): Options applied to socket after connecting.
+    """
+
+    def __init__(self, socket_options: SocketOptions = None):
+        super(BlockingClient, self).__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.__socket: QTcpSocket = None
+        self.__buffer: DataBuffer = None
+        self.__socket_options = socket_options if socket_options is not None else SocketOptions()
+        self.__messages = deque()
+
+    @staticmethod
+    def __deadline(timeout: float) -> QDeadlineTimer:
+        return QDeadlineTimer(-1 if timeout is None else max(int(timeout * 1000), 0))
+
+    def connect(self, host: str, port: int, timeout: float = 5) -> None:
+        """Connect to server. Addresses of hostname are tried one after another,
+        alternating IPv6 and IPv4, until one connects or timeout expires.
+
+        Raises:
+            TimeoutError: Client did not connect before timeout.
+            NotConnectedError: Hostname could not be resolved or every connection attempt failed.
+        """
+        if self.__socket is not None:
+            self.close()
+        deadline = self.__deadline(timeout)
+        try:
+            addresses = Resolver.interleave(Resolver.resolve_blocking(host))
+        except OSError as e:
+            raise NotConnectedError(f"Could not resolve {host}: {e}") from e
+        error = None
+        for address in addresses:
+            self.__socket = QTcpSocket()
+            self.__buffer = DataBuffer(self.__socket)
+            self.__buffer.data.connect(self.__messages.append)
+            self._logger.debug(f"Connecting to {address}:{port}")
+            self.__socket.connectToHost(QHostAddress(address), port)
+            if self.__socket.waitForConnected(deadline.remainingTime()):
+                self.__socket_options.apply(self.__socket)
+                self._logger.info(f"Connected to {address}:{port}")
+                return
+            timed_out = self.__socket.error() == QAbstractSocket.SocketError.SocketTimeoutError
+            error = f"{address}: {self.__socket.errorString()}"
+            self.__drop_socket()
+            if timed_out or deadline.hasExpired():
+                raise TimeoutError(f"Connecting to {host}:{port} timed out")
+        raise NotConnectedError(error)
+
+    def send(self, data: bytes, timeout: float = 5) -> None:
+        """Write message and wait until it is handed to the operating system.
+
+        Raises:
+            TimeoutError: Message was not written before timeout.
+            NotConnectedError: Client is not connected.
+        """
+        self.__check_connected()
+        self.__buffer.write(data)
+        self.__flush(self.__deadline(timeout))
+
+    def recv(self, timeout: float = 5) -> bytes:
+        """Wait for message from server.
+
+        Raises:
+            TimeoutError: No message was received before timeout.
+            NotConnectedError: Client is not connected or server disconnected.
+        """
+        return self.__recv(self.__deadline(timeout))
+
+    def request(self, data: bytes, timeout: float = 5) -> bytes:
+        """Send message and wait for the next message from server.
+
+        Timeout covers both sending and receiving. Messages received earlier and not read
+        by recv() are returned first, so server must reply once to every message.
+
+        Raises:
+            TimeoutError: Reply was not received before timeout.
+            NotConnectedError: Client is not connected or server disconnected.
+        """
+        deadline = self.__deadline(timeout)
+        self.__check_connected()
+        self.__buffer.write(data)
+        self.__flush(deadline)
+        return self.__recv(deadline)
+
+    def pending(self) -> int:
+        """Number of received messages not read by recv() yet."""
+        return len(self.__messages)
+
+    def __flush(self, deadline: QDeadlineTimer) -> None:
+        socket = self.__socket
+        while socket.bytesToWrite() > 0:
+            if not socket.waitForBytesWritten(deadline.remainingTime()):
+                self.__raise_wait_error("Writing")
+
+    def __recv(self, deadline: QDeadlineTimer) -> bytes:
+        messages = self.__messages
+        while not messages:
+            self.__check_connected()
+            if not self.__socket.waitForReadyRead(deadline.remainingTime()):
+                self.__raise_wait_error("Receiving")
+        return messages.popleft()
+
+    def __raise_wait_error(self, action: str):
+        if self.__socket.state() != QAbstractSocket.SocketState.ConnectedState:
+            message = self.__socket.errorString()
+            self.__drop_socket()
+            raise NotConnectedError(message)
+        raise TimeoutError(f"{action} timed out")
+
+    def __check_connected(self) -> None:
+        if self.__socket is None:
+            raise NotConnectedError("Client is not connected")
+
+    def __drop_socket(self) -> None:
+        socket = self.__socket
+        self.__socket = None
+        self.__buffer = None
+        socket.abort()
+
+    def is_running(self) -> bool:
+        return self.__socket is not None and self.__socket.state() == QAbstractSocket.SocketState.ConnectedState
+
+    def close(self, timeout: float = 5) -> None:
+        """Write pending data and disconnect. Received messages not read yet are dropped."""
+        self.__messages.clear()
+        socket = self.__socket
+        if socket is None:
+            return
+        socket.disconnectFromHost()
+        if socket.state() != QAbstractSocket.SocketState.UnconnectedState:
+            socket.waitForDisconnected(self.__deadline(timeout).remainingTime())
+        self.__drop_socket()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
@@ -0,0 +1,491 @@
+from qtpy.QtCore import Slot, Signal, QObject, QThread, QTimer
+
+import logging
+
+from QtPyNetwork.common import delete_later
+from QtPyNetwork.exception import NotConnectedError
+from QtPyNetwork.metrics import merge_stats
+from QtPyNetwork.options import HeartbeatOptions, SocketOptions, ReconnectOptions
+from .TCPClient import TCPClient
+from ._worker import ClientWorker
+
+
+class ManagedClientSignals(QObject):
+    """Per-connection signals. Created only when ManagedClient.signals() is called."""
+
+    connected = Signal(str, int)
+    disconnected = Signal()
+    message = Signal(bytes)
+    stream_message = Signal(int, bytes)
+    error = Signal(Exception)
+    failed_to_connect = Signal()
+    reconnecting = Signal(int, float)
+    closed = Signal()
+
+
+class ManagedClient:
+    """Connection hosted by ClientManager, as seen from the manager's thread.
+
+    Like server side Client, it is a plain object with __slots__ and per-connection
+    Qt signals are created on first call of signals().
+    """
+
+    __slots__ = ("__manager", "__id", "__host", "__port", "__worker", "__connected", "__closed", "__signals")
+
+    def __init__(self, manager, client_id: int, host: str, port: int, worker: int):
+        self.__manager = manager
+        self.__id = client_id
+        self.__host = host
+        self.__port = port
+        self.__worker = worker
+        self.__connected = False
+        self.__closed = False
+        self.__signals = None
+
+    def manager(self):
+        return self.__manager
+
+    def id(self) -> int:
+        return self.__id
+
+    def host(self) -> str:
+        return self.__host
+
+    def port(self) -> int:
+        return self.__port
+
+    def worker(self) -> int:
+        """Index of worker thread hosting connection."""
+        return self.__worker
+
+    def set_connected(self, value: bool):
+        self.__connected = value
+
+    def is_connected(self) -> bool:
+        return self.__connected
+
+    def set_closed(self):
+        self.__closed = True
+        self.__connected = False
+
+    def is_closed(self) -> bool:
+        return self.__closed
+
+    def signals(self) -> ManagedClientSignals:
+        """Get per-connection signals. QObject is created on first call."""
+        if self.__signals is None:
+            self.__signals = ManagedClientSignals()
+        return self.__signals
+
+    def has_signals(self) -> bool:
+        return self.__signals is not None
+
+    def write(self, data: bytes):
+        self.__manager.write(self, data)
+
+    def write_stream(self, stream_id: int, data: bytes):
+        self.__manager.write_stream(self, stream_id, data)
+
+    def close(self):
+        self.__manager.close_client(self)
+
+
+class _Worker(ClientWorker):
+    """Owns connections assigned to one thread. All control signals are queued,
+    so the manager's thread never waits for the worker."""
+
+    connected = Signal(int, str, int)
+    disconnected = Signal(int)
+    message = Signal(int, bytes)
+    stream_message = Signal(int, int, bytes)
+    error = Signal(int, Exception)
+    failed_to_connect = Signal(int)
+    reconnecting = Signal(int, int, float)
+    closed = Signal(int)
+
+    connect_signal = Signal(int, str, int, int)
+    write_signal = Signal(int, bytes)
+    write_stream_signal = Signal(int, int, bytes)
+    close_client_signal = Signal(int)
+    close_signal = Signal()
+
+    def __init__(self, heartbeat: HeartbeatOptions, socket_options: SocketOptions, reconnect: ReconnectOptions):
+        super(_Worker, self).__init__()
+        self.heartbeat = heartbeat
+        self.socket_options = socket_options
+        self.reconnect = reconnect
+
+        self.connect_signal.connect(self.__on_connect_signal)
+        self.write_signal.connect(self.__on_write_signal)
+        self.write_stream_signal.connect(self.__on_write_stream_signal)
+        self.close_client_signal.connect(self.__on_close_client_signal)
+        self.close_signal.connect(self.__on_close_signal)
+
+    @Slot(int, str, int, int)
+    def __on_connect_signal(self, client_id: int, host: str, port: int, timeout: int):
+        client = TCPClient(self.heartbeat, self.socket_options, self.reconnect)
+        client.setParent(self)
+        client.connected.connect(lambda ip, client_port: self.connected.emit(client_id, ip, client_port))
+        client.disconnected.connect(lambda: self.__on_client_disconnected(client_id))
+        client.failed_to_connect.connect(lambda: self.__on_client_failed_to_connect(client_id))
+        client.message.connect(lambda message: self.message.emit(client_id, message))
+        client.stream_message.connect(lambda stream_id, message:
+                                      self.stream_message.emit(client_id, stream_id, message))
+        client.error.connect(lambda error: self.error.emit(client_id, error))
+        client.reconnecting.connect(lambda attempt, delay: self.reconnecting.emit(client_id, attempt, delay))
+        self.clients[client_id] = client
+        client.start(host, port, timeout)
+
+    def __on_client_disconnected(self, client_id: int):
+        self.disconnected.emit(client_id)
+        if self.reconnect is None:
+            self.__on_close_client_signal(client_id)
+
+    def __on_client_failed_to_connect(self, client_id: int):
+        self.failed_to_connect.emit(client_id)
+        self.__on_close_client_signal(client_id)
+
+    @Slot(int, bytes)
+    def __on_write_signal(self, client_id: int, data: bytes):
+        client = self.clients.get(client_id)
+        if client is not None:
+            client.write(data)
+
+    @Slot(int, int, bytes)
+    def __on_write_stream_signal(self, client_id: int, stream_id: int, data: bytes):
+        client = self.clients.get(client_id)
+        if client is not None:
+            client.write_stream(stream_id, data)
+
+    @Slot(int)
+    def __on_close_client_signal(self, client_id: int):
+        client = self.clients.pop(client_id, None)
+        if client is None:
+            return
+        client.close()
+        self.retire(client)
+        # client may be closed from one of its own signals
+        delete_later(client)
+        self.closed.emit(client_id)
+
+    @Slot()
+    def __on_close_signal(self):
+        for client_id in list(self.clients):
+            self.__on_close_client_signal(client_id)
+        QThread.currentThread().quit()
+
+
+class ClientManager(QObject):
+    """Hosts many TCP client connections on a fixed pool of worker threads.
+
+    Every new connection is placed on the worker thread with the fewest connections.
+    Connections are represented by ManagedClient handles. Manager signals are emitted
+    for every connection, per-connection signals are available via ManagedClient.signals().
+    Methods of the manager never wait for worker threads, including close_client() and close().
+
+    Without reconnect options, connections which disconnect or fail to connect are closed
+    and removed. With reconnect options they are removed only when they give up reconnecting.
+    closed signal is emitted with handle of every removed connection and manager_closed
+    once all worker threads finished after close().
+
+    Args:
+        threads (int): Number of worker threads.
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        socket_options (SocketOptions): Options applied to sockets after connecting.
+        reconnect (ReconnectOptions): Automatic reconnection settings. None disables reconnecting.
+    """
+
+    connected = Signal(ManagedClient, str, int)
+    disconnected = Signal(ManagedClient)
+    message = Signal(ManagedClient, bytes)
+    stream_message = Signal(ManagedClient, int, bytes)
+    error = Signal(ManagedClient, Exception)
+    failed_to_connect = Signal(ManagedClient)
+    reconnecting = Signal(ManagedClient, int, float)
+    closed = Signal(ManagedClient)
+    manager_closed = Signal()
+    stats_updated = Signal(dict)
+
+    def __init__(self, threads: int = QThread.idealThreadCount(), heartbeat: HeartbeatOptions = None,
+                 socket_options: SocketOptions = None, reconnect: ReconnectOptions = None):
+        super(ClientManager, self).__init__()
+        if threads <= 0:
+            raise ValueError("Thread count must be greater than 0")
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__clients = {}
+        self.__next_id = 0
+        self.__workers = []
+        self.__load = []
+        self.__running_threads = 0
+        self.__stats_timer = None
+        for i in range(threads):
+            worker = _Worker(heartbeat, socket_options, reconnect)
+            worker.setObjectName(str(i))
+            worker.connected.connect(self.__on_worker_connected)
+            worker.disconnected.connect(self.__on_worker_disconnected)
+            worker.message.connect(self.__on_worker_message)
+            worker.stream_message.connect(self.__on_worker_stream_message)
+            worker.error.connect(self.__on_worker_error)
+            worker.failed_to_connect.connect(self.__on_worker_failed_to_connect)
+            worker.reconnecting.connect(self.__on_worker_reconnecting)
+            worker.closed.connect(self.__on_worker_closed)
+            thread = QThread()
+            thread.setObjectName(f"ClientManager-{i}")
+            thread.finished.connect(self.__on_thread_finished)
+            worker.moveToThread(thread)
+            thread.start()
+            self.__running_threads += 1
+            self.__workers.append((worker, thread))
+            self.__load.append(0)
+
+    @Slot(str, int, int)
+    def add_client(self, host: str, port: int, timeout: int = 5) -> ManagedClient:
+        """Connect new client to server on the least loaded worker thread.
+
+        Args:
+            host (str): Server hostname or IP address.
+            port (int): Server port.
+            timeout (int): Connection timeout in seconds.
+
+        Returns:
+            ManagedClient: Connection handle.
+        """
+        if not self.__running_threads:
+            raise NotConnectedError("Client manager is closed")
+        load = self.__load
+        index = load.index(min(load))
+        load[index] += 1
+        client_id = self.__next_id
+        self.__next_id += 1
+        client = ManagedClient(self, client_id, host, port, index)
+        self.__clients[client_id] = client
+        self.__workers[index][0].connect_signal.emit(client_id, host, port, timeout)
+        return client
+
+    @Slot(int, str, int)
+    def __on_worker_connected(self, client_id: int, ip: str, port: int):
+        client = self.__clients.get(client_id)
+        if client is not None:
+            client.set_connected(True)
+            if client.has_signals():
+                client.signals().connected.emit(ip, port)
+            self.on_connected(client, ip, port)
+
+    @Slot(int)
+    def __on_worker_disconnected(self, client_id: int):
+        client = self.__clients.get(client_id)
+        if client is not None:
+            client.set_connected(False)
+            if client.has_signals():
+                client.signals().disconnected.emit()
+            self.on_disconnected(client)
+
+    @Slot(int, bytes)
+    def __on_worker_message(self, client_id: int, message: bytes):
+        client = self.__clients.get(client_id)
+        if client is not None:
+            if client.has_signals():
+                client.signals().message.emit(message)
+            self.on_message(client, message)
+
+    @Slot(int, int, bytes)
+    def __on_worker_stream_message(self, client_id: int, stream_id: int, message: bytes):
+        client = self.__clients.get(client_id)
+        if client is not None:
+            if client.has_signals():
+                client.signals().stream_message.emit(stream_id, message)
+            self.on_stream_message(client, stream_id, message)
+
+    @Slot(int, Exception)
+    def __on_worker_error(self, client_id: int, error: Exception):
+        client = self.__clients.get(client_id)
+        if client is not None:
+            if client.has_signals():
+                client.signals().error.emit(error)
+            self.on_error(client, error)
+
+    @Slot(int)
+    def __on_worker_failed_to_connect(self, client_id: int):
+        client = self.__clients.get(client_id)
+        if client is not None:
+            if client.has_signals():
+                client.signals().failed_to_connect.emit()
+            self.failed_to_connect.emit(client)
+
+    @Slot(int, int, float)
+    def __on_worker_reconnecting(self, client_id: int, attempt: int, delay: float):
+        client = self.__clients.get(client_id)
+        if client is not None:
+            if client.has_signals():
+                client.signals().reconnecting.emit(attempt, delay)
+            self.reconnecting.emit(client, attempt, delay)
+
+    @Slot(int)
+    def __on_worker_closed(self, client_id: int):
+        client = self.__clients.pop(client_id, None)
+        if client is None:
+            return
+        self.__load[client.worker()] -= 1
+        client.set_closed()
+        if client.has_signals():
+            client.signals().closed.emit()
+        self.on_closed(client)
+
+    @Slot()
+    def __on_thread_finished(self):
+        self.__running_threads -= 1
+        if self.__running_threads == 0:
+            self.manager_closed.emit()
+
+    @Slot(ManagedClient, str, int)
+    def on_connected(self, client: ManagedClient, ip: str, port: int):
+        """Called when client connects to server.
+        Emits connected signal.
+
+        Args:
+            client (ManagedClient): Client.
+            ip (str): Server IP address.
+            port (int): Server port.
+        """
+        self.connected.emit(client, ip, port)
+
+    @Slot(ManagedClient, bytes)
+    def on_message(self, client: ManagedClient, message: bytes):
+        """Called when client receives message from server.
+        Emits message signal.
+
+        Args:
+            client (ManagedClient): Client.
+            message (bytes): Message.
+        """
+        self.message.emit(client, message)
+
+    @Slot(ManagedClient, int, bytes)
+    def on_stream_message(self, client: ManagedClient, stream_id: int, message: bytes):
+        """Called when client receives message on logical stream other than 0.
+        Emits stream_message signal.
+
+        Args:
+            client (ManagedClient): Client.
+            stream_id (int): Stream ID.
+            message (bytes): Message.
+        """
+        self.stream_message.emit(client, stream_id, message)
+
+    @Slot(ManagedClient)
+    def on_disconnected(self, client: ManagedClient):
+        """Called when client disconnects from server.
+        Emits disconnected signal.
+
+        Args:
+            client (ManagedClient): Client.
+        """
+        self.disconnected.emit(client)
+
+    @Slot(ManagedClient, Exception)
+    def on_error(self, client: ManagedClient, error: Exception):
+        """Called when client error occurs.
+        Emits error signal.
+
+        Args:
+            client (ManagedClient): Client.
+            error (Exception): Error.
+        """
+        self.error.emit(client, error)
+
+    @Slot(ManagedClient)
+    def on_closed(self, client: ManagedClient):
+        """Called when client is closed and removed from manager.
+        Emits closed signal.
+
+        Args:
+            client (ManagedClient): Client.
+        """
+        self.closed.emit(client)
+
+    @Slot(ManagedClient, bytes)
+    def write(self, client: ManagedClient, data: bytes):
+        """Write data to server of client.
+
+        Args:
+            client (ManagedClient): Client.
+            data (bytes): Data to write.
+        """
+        if client.is_closed():
+            self.on_error(client, NotConnectedError(f"Client {client.id()} is closed"))
+            return
+        self.__workers[client.worker()][0].write_signal.emit(client.id(), data)
+
+    @Slot(ManagedClient, int, bytes)
+    def write_stream(self, client: ManagedClient, stream_id: int, data: bytes):
+        """Write data to logical stream of client.
+
+        Args:
+            client (ManagedClient): Client.
+            stream_id (int): Stream ID.
+            data (bytes): Data to write.
+        """
+        if client.is_closed():
+            self.on_error(client, NotConnectedError(f"Client {client.id()} is closed"))
+            return
+        self.__workers[client.worker()][0].write_stream_signal.emit(client.id(), stream_id, data)
+
+    @Slot(ManagedClient)
+    def close_client(self, client: ManagedClient):
+        """Close client without waiting for its worker thread. closed signal is emitted once it is closed."""
+        if not client.is_closed():
+            self.__workers[client.worker()][0].close_client_signal.emit(client.id())
+
+    def get_client_by_id(self, client_id: int):
+        return self.__clients.get(client_id)
+
+    def clients(self) -> list:
+        return list(self.__clients.values())
+
+    def load(self) -> list:
+        """Number of connections hosted by every worker thread."""
+        return list(self.__load)
+
+    @Slot()
+    def stats(self, per_client: bool = False) -> dict:
+        """Traffic statistics summed over all connections, see metrics.merge_stats(). workers holds
+        statistics of every worker thread and clients (with per_client) of every open connection by ID.
+        Queue depths are sampled by worker threads and returned with the next call.
+        """
+        for worker, thread in self.__workers:
+            worker.sample_signal.emit()
+        return merge_stats([worker.snapshot(per_client) for worker, thread in self.__workers])
+
+    @Slot(float)
+    def set_stats_interval(self, interval: float) -> None:
+        """Emit stats_updated signal with stats() every interval seconds.
+
+        Args:
+            interval (float): Seconds between signals. Zero stops emitting.
+        """
+        if self.__stats_timer is None:
+            self.__stats_timer = QTimer(self)
+            self.__stats_timer.timeout.connect(lambda: self.stats_updated.emit(self.stats()))
+        if interval > 0:
+            self.__stats_timer.start(int(interval * 1000))
+        else:
+            self.__stats_timer.stop()
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.__running_threads > 0
+
+    @Slot(int)
+    def wait(self, timeout: int = 5) -> bool:
+        """Wait for worker threads to finish after close().
+
+        Returns:
+            bool: True if all threads finished.
+        """
+        return all([thread.wait(timeout * 1000) for worker, thread in self.__workers])
+
+    @Slot()
+    def close(self):
+        """Close all clients and stop worker threads without waiting for them."""
+        for worker, thread in self.__workers:
+            worker.close_signal.emit()
@@ -0,0 +1,287 @@
+from qtpy.QtCore import Slot, Signal, QThread, QTimer
+
+import logging
+
+from QtPyNetwork.common import HEADER_SIZE, delete_later
+from QtPyNetwork.exception import NotConnectedError
+from QtPyNetwork.metrics import merge_stats
+from QtPyNetwork.options import HeartbeatOptions, SocketOptions
+from .TCPClient import TCPClient
+from ._worker import ClientWorker
+from .AbstractClient import AbstractClient
+
+
+class _Member:
+    """Pool connection as seen from the caller's thread."""
+
+    __slots__ = ("index", "worker", "connected", "pending")
+
+    def __init__(self, index: int, worker):
+        self.index = index
+        self.worker = worker
+        self.connected = False
+        # bytes handed to worker and not yet written to socket
+        self.pending = 0
+
+
+class _Worker(ClientWorker):
+    """Owns pool connections assigned to one thread."""
+
+    connected = Signal(int, str, int)
+    disconnected = Signal(int)
+    message = Signal(int, bytes)
+    stream_message = Signal(int, int, bytes)
+    bytes_written = Signal(int, int)
+    error = Signal(int, Exception)
+    closed = Signal()
+
+    start_signal = Signal(int)
+    write_signal = Signal(int, bytes)
+    write_stream_signal = Signal(int, int, bytes)
+    close_signal = Signal()
+
+    def __init__(self, ip: str, port: int, timeout: int, reconnect_delay: float, heartbeat: HeartbeatOptions,
+                 socket_options: SocketOptions):
+        super(_Worker, self).__init__()
+        self.ip = ip
+        self.port = port
+        self.timeout = timeout
+        self.reconnect_delay = reconnect_delay
+        self.heartbeat = heartbeat
+        self.socket_options = socket_options
+        self.closing = False
+
+        self.start_signal.connect(self.__on_start_signal)
+        self.write_signal.connect(self.__on_write_signal)
+        self.write_stream_signal.connect(self.__on_write_stream_signal)
+        self.close_signal.connect(self.__on_close_signal)
+
+    @Slot(int)
+    def __on_start_signal(self, index: int):
+        """Create and connect member client in worker thread."""
+        if self.closing:
+            return
+        old = self.clients.pop(index, None)
+        if old is not None:
+            old.close()
+            self.retire(old)
+            delete_later(old)
+        client = TCPClient(self.heartbeat, self.socket_options)
+        client.setParent(self)
+        client.connected.connect(lambda ip, port: self.connected.emit(index, ip, port))
+        client.disconnected.connect(lambda: self.__on_member_down(index, client))
+        client.failed_to_connect.connect(lambda: self.__on_member_down(index, client))
+        client.message.connect(lambda message: self.message.emit(index, message))
+        client.stream_message.connect(lambda stream_id, message: self.stream_message.emit(index, stream_id, message))
+        client.bytes_written.connect(lambda written: self.bytes_written.emit(index, written))
+        client.error.connect(lambda error: self.error.emit(index, error))
+        self.clients[index] = client
+        client.start(self.ip, self.port, self.timeout)
+
+    def __on_member_down(self, index: int, client: TCPClient):
+        if self.clients.get(index) is not client:
+            return
+        self.disconnected.emit(index)
+        if not self.closing:
+            QTimer.singleShot(int(self.reconnect_delay * 1000), lambda: self.__on_start_signal(index))
+
+    @Slot(int, bytes)
+    def __on_write_signal(self, index: int, data: bytes):
+        client = self.clients.get(index)
+        if client is not None:
+            client.write(data)
+
+    @Slot(int, int, bytes)
+    def __on_write_stream_signal(self, index: int, stream_id: int, data: bytes):
+        client = self.clients.get(index)
+        if client is not None:
+            client.write_stream(stream_id, data)
+
+    @Slot()
+    def __on_close_signal(self):
+        self.closing = True
+        for client in self.clients.values():
+            client.close()
+            self.retire(client)
+        self.clients.clear()
+        self.closed.emit()
+        QThread.currentThread().quit()
+
+
+class ClientPool(AbstractClient):
+    """Keeps several TCP connections to one server, spread over a few worker threads.
+
+    Every message is sent on the connected member with the least bytes waiting to be written.
+    Messages written with the same key always use the same member while it stays connected,
+    so related messages keep their order. Members which disconnect or fail to connect
+    are replaced after reconnect_delay seconds.
+
+    connected signal is emitted when the first member connects and disconnected signal
+    when the last member disconnects. Messages from all members are emitted by message signal.
+
+    Args:
+        size (int): Number of connections.
+        threads (int): Number of worker threads.
+        reconnect_delay (float): Seconds to wait before replacing failed member.
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        socket_options (SocketOptions): Options applied to sockets after connecting.
+    """
+
+    def __init__(self, size: int = 4, threads: int = 2, reconnect_delay: float = 1.0,
+                 heartbeat: HeartbeatOptions = None, socket_options: SocketOptions = None):
+        super(ClientPool, self).__init__()
+        if size <= 0 or threads <= 0:
+            raise ValueError("Pool size and thread count must be greater than 0")
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.__size = size
+        self.__threads_count = min(threads, size)
+        self.__reconnect_delay = reconnect_delay
+        self.__heartbeat = heartbeat
+        self.__socket_options = socket_options
+        self.__members = []
+        self.__workers = []
+        # workers told to close, kept until their threads finish
+        self.__stopping = []
+        self.__connected = 0
+
+    @Slot(str, int)
+    def start(self, ip: str, port: int, timeout: int = 5):
+        if self.__workers:
+            self.close()
+        if self.__stopping:
+            self.wait()
+        self.__workers = []
+        self.__members = []
+        self.__connected = 0
+        for i in range(self.__threads_count):
+            worker = _Worker(ip, port, timeout, self.__reconnect_delay, self.__heartbeat, self.__socket_options)
+            worker.connected.connect(self.__on_member_connected)
+            worker.disconnected.connect(self.__on_member_disconnected)
+            worker.message.connect(lambda index, message: self.on_message(message))
+            worker.stream_message.connect(lambda index, stream_id, message: self.on_stream_message(stream_id, message))
+            worker.bytes_written.connect(self.__on_member_bytes_written)
+            worker.error.connect(lambda index, error: self.error.emit(error))
+            worker.setObjectName(str(i))
+            thread = QThread()
+            worker.moveToThread(thread)
+            thread.start()
+            self.__workers.append((worker, thread))
+        for index in range(self.__size):
+            worker = self.__workers[index % self.__threads_count][0]
+            self.__members.append(_Member(index, worker))
+            worker.start_signal.emit(index)
+
+    @Slot(int, str, int)
+    def __on_member_connected(self, index: int, ip: str, port: int):
+        member = self.__members[index]
+        member.connected = True
+        member.pending = 0
+        self.__connected += 1
+        if self.__connected == 1:
+            self.on_connected(ip, port)
+
+    @Slot(int)
+    def __on_member_disconnected(self, index: int):
+        member = self.__members[index]
+        if not member.connected:
+            return
+        member.connected = False
+        self.__connected -= 1
+        if self.__connected == 0:
+            self.on_disconnected()
+
+    @Slot(int, int)
+    def __on_member_bytes_written(self, index: int, written: int):
+        member = self.__members[index]
+        member.pending = max(0, member.pending - written)
+
+    def __select(self, key) -> _Member:
+        members = self.__members
+        if key is not None and members:
+            start = hash(key) % len(members)
+            for i in range(len(members)):
+                member = members[(start + i) % len(members)]
+                if member.connected:
+                    return member
+            return None
+        best = None
+        for member in members:
+            if member.connected and (best is None or member.pending < best.pending):
+                best = member
+                if not member.pending:
+                    break
+        return best
+
+    @Slot(bytes)
+    def write(self, data: bytes, key=None):
+        """Write data on the least loaded connection.
+
+        Args:
+            data (bytes): Data to write.
+            key (hashable): Messages with the same key are sent on the same connection.
+        """
+        member = self.__select(key)
+        if member is None:
+            self.error.emit(NotConnectedError("No pool connection is connected"))
+            return
+        member.pending += len(data) + HEADER_SIZE
+        member.worker.write_signal.emit(member.index, data)
+
+    @Slot(int, bytes)
+    def write_stream(self, stream_id: int, data: bytes):
+        """Write data to logical stream. Stream is pinned to one connection to keep its order."""
+        member = self.__select(stream_id)
+        if member is None:
+            self.error.emit(NotConnectedError("No pool connection is connected"))
+            return
+        member.pending += len(data)
+        member.worker.write_stream_signal.emit(member.index, stream_id, data)
+
+    @Slot()
+    def size(self) -> int:
+        return self.__size
+
+    @Slot()
+    def connected_count(self) -> int:
+        """Number of connected members."""
+        return self.__connected
+
+    @Slot()
+    def pending_bytes(self) -> list:
+        """Bytes waiting to be written for every member."""
+        return [member.pending for member in self.__members]
+
+    @Slot()
+    def stats(self, per_client: bool = False) -> dict:
+        """Traffic statistics summed over members, see metrics.merge_stats(). workers holds statistics
+        of every worker thread and clients (with per_client) of every member by index. Queue depths
+        are sampled by worker threads and returned with the next call.
+        """
+        workers = self.__workers + self.__stopping
+        for worker, thread in workers:
+            worker.sample_signal.emit()
+        return merge_stats([worker.snapshot(per_client) for worker, thread in workers])
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.__connected > 0
+
+    @Slot(int)
+    def wait(self, timeout: int = 5):
+        """Wait for worker threads to finish after close()."""
+        for worker, thread in self.__workers + self.__stopping:
+            thread.wait(timeout * 1000)
+        self.__stopping = [(worker, thread) for worker, thread in self.__stopping if not thread.isFinished()]
+
+    @Slot()
+    def close(self):
+        """Close all members and stop worker threads without waiting for them, see wait()."""
+        for worker, thread in self.__workers:
+            # worker quits its thread once its members are closed
+            worker.close_signal.emit()
+        self.__stopping.extend(self.__workers)
+        self.__workers = []
+        for member in self.__members:
+            member.connected = False
+        self.__connected = 0
+        self.closed.emit()
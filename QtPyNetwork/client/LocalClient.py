@@ -0,0 +1,161 @@
+from qtpy.QtNetwork import QLocalSocket
+from qtpy.QtCore import Slot, QTimer, QThread
+
+from QtPyNetwork.common import DataBuffer
+from QtPyNetwork.exception import IdleTimeoutError
+from QtPyNetwork.metrics import ConnectionStats
+from QtPyNetwork.options import HeartbeatOptions, SharedMemoryOptions
+from .AbstractClient import AbstractClient
+
+import logging
+
+
+class LocalClient(AbstractClient):
+    """Local socket client (Unix domain socket or Windows named pipe) for LocalServer.
+
+    Args:
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        shared_memory (SharedMemoryOptions): Shared memory transport settings. None disables shared memory.
+    """
+
+    def __init__(self, heartbeat: HeartbeatOptions = None, shared_memory: SharedMemoryOptions = None):
+        super(LocalClient, self).__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.__buffer = None
+        self.__socket: QLocalSocket = None
+        self.__heartbeat = heartbeat
+        self.__shared_memory = shared_memory
+        self.__rtt = None
+        self.__connection_stats = ConnectionStats()
+        self.__open = False
+
+    @Slot(str, int)
+    def start(self, name: str, port: int = 0, timeout: int = 5):
+        """Connect to server.
+
+        Args:
+            name (str): Server name or path of socket file.
+            port (int): Unused, kept for compatibility with AbstractClient.
+            timeout (int): Seconds to wait for connection.
+        """
+        if self.__socket:
+            self._logger.info(f"Closing and connecting to {name}")
+            self.__count_disconnect()
+            self.__socket.close()
+            self.__socket = None
+            self.__buffer = None
+
+        self.__socket = QLocalSocket()
+
+        self.__buffer = DataBuffer(self.__socket, self.__heartbeat, self.__shared_memory)
+        self.__buffer.data.connect(self.on_message)
+        self.__buffer.stream_data.connect(self.on_stream_message)
+        self.__buffer.rtt_measured.connect(self.__on_rtt_measured)
+        self.__buffer.timeout.connect(lambda: self.error.emit(IdleTimeoutError("Connection timed out")))
+
+        self.__socket.connected.connect(self.__on_socket_connected)
+        self.__socket.disconnected.connect(self.__on_socket_disconnected)
+        self.__socket.error.connect(self.__on_socket_error)
+        self.__socket.connectToServer(name)
+
+        self._logger.debug(f"Connecting to {name}")
+        QTimer.singleShot(timeout * 1000, self.__check_connected)
+
+    @Slot(bytes)
+    def write(self, data: bytes):
+        if self.__buffer:
+            self.__buffer.write(data)
+
+    @Slot(int, bytes)
+    def write_stream(self, stream_id: int, data: bytes):
+        if self.__buffer:
+            self.__buffer.write_stream(stream_id, data)
+
+    @Slot(int)
+    def pause_stream(self, stream_id: int):
+        """Stop granting flow control credit to stream until resume_stream() is called."""
+        if self.__buffer:
+            self.__buffer.pause_stream(stream_id)
+
+    @Slot(int)
+    def resume_stream(self, stream_id: int):
+        if self.__buffer:
+            self.__buffer.resume_stream(stream_id)
+
+    @Slot(float)
+    def __on_rtt_measured(self, rtt: float):
+        self.__rtt = rtt
+
+    @Slot()
+    def rtt(self):
+        """Last round trip time measured by heartbeat in milliseconds or None if not measured yet."""
+        return self.__rtt
+
+    def is_shared_memory_active(self) -> bool:
+        """Whether server attached to the shared memory ring, so large messages are written to it."""
+        return self.__buffer is not None and self.__buffer.is_shared_memory_active()
+
+    @Slot()
+    def __on_socket_connected(self):
+        name = self.__socket.fullServerName()
+        self._logger.info(f"Connected to {name}")
+        self.__open = True
+        self.__connection_stats.add()
+        self.on_connected(name, 0)
+
+    @Slot()
+    def __on_socket_disconnected(self):
+        self._logger.info("Disconnected from server")
+        self.__count_disconnect()
+        self.on_disconnected()
+
+    @Slot()
+    def __on_socket_error(self):
+        """Handle socket errors.
+
+        Note:
+            Emits error signal.
+        """
+        if self.__socket:
+            self.error.emit(Exception(self.__socket.errorString()))
+
+    @Slot()
+    def __check_connected(self):
+        if self.__socket and self.__socket.state() != QLocalSocket.ConnectedState:
+            self.__socket.abort()
+            self.on_failed_to_connect()
+
+    @Slot(int)
+    def wait(self, timeout: int = 5):
+        """Wait until queued data is written.
+
+        Args:
+            timeout (int): Seconds to wait.
+        """
+        if self.__socket is not None and self.__socket.state() == QLocalSocket.ConnectedState:
+            self.__socket.waitForBytesWritten(timeout * 1000)
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.__socket is not None and self.__socket.state() == QLocalSocket.ConnectedState
+
+    def __count_disconnect(self):
+        if self.__open:
+            self.__open = False
+            self.__connection_stats.remove(self.__buffer.counters(), self.__buffer.disconnect_reason())
+
+    @Slot()
+    def stats(self) -> dict:
+        """Traffic statistics, see metrics.ConnectionStats.snapshot()."""
+        if QThread.currentThread() == self.thread() and self.__open:
+            self.__connection_stats.sample([self.__buffer])
+        counters = {0: self.__buffer.counters()} if self.__open else {}
+        return self.__connection_stats.snapshot(counters)
+
+    @Slot()
+    def close(self):
+        if self.__socket:
+            self.__count_disconnect()
+            self.__socket.close()
+            self.__socket = None
+        self.closed.emit()
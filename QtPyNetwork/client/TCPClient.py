@@ -1,57 +1,272 @@
-from qtpy.QtNetwork import QAbstractSocket, QTcpSocket, QHostAddress
-from qtpy.QtCore import Signal, Slot, QTimer, QDeadlineTimer
+from qtpy.QtNetwork import QAbstractSocket, QTcpSocket
+from qtpy.QtCore import Signal, Slot, QTimer, QThread
 
-from QtPyNetwork.common import DataBuffer
+from collections import deque
+from time import monotonic
+import random
+
+from QtPyNetwork.common import DataBuffer, delete_later
+from QtPyNetwork.exception import IdleTimeoutError, NotConnectedError, QueueFullError
+from QtPyNetwork.metrics import ConnectionStats
+from QtPyNetwork.options import HeartbeatOptions, SocketOptions, ReconnectOptions, SharedMemoryOptions
+from QtPyNetwork.resolver import Connector
 from .AbstractClient import AbstractClient
 
 import logging
 
 
 class TCPClient(AbstractClient):
-    def __init__(self):
+    """TCP client.
+
+    Server can be given by IP address or hostname. Hostnames are resolved through the cache shared
+    by all clients (see Resolver) and their addresses are tried in parallel, alternating IPv6 and IPv4
+    (see Connector). Messages written while connecting are queued and written after connecting.
+
+    bytes_written signal is emitted with number of bytes (including frame headers)
+    handed to the operating system.
+
+    With reconnect options, client connects again after failed connection attempt or disconnection,
+    waiting a jittered, exponentially growing delay between attempts. reconnecting signal is emitted
+    with attempt number and delay in seconds before every attempt. Messages written while
+    not connected are queued and written in order after connecting, before connected signal
+    is emitted. failed_to_connect is emitted once max_attempts is reached.
+
+    Without reconnect options, writing while not connected emits error with NotConnectedError.
+
+    Args:
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        socket_options (SocketOptions): Options applied to socket after connecting.
+        reconnect (ReconnectOptions): Automatic reconnection settings. None disables reconnecting.
+        shared_memory (SharedMemoryOptions): Shared memory transport settings, used when server runs on the same
+            host. None disables shared memory.
+    """
+
+    bytes_written = Signal(int)
+    reconnecting = Signal(int, float)
+
+    def __init__(self, heartbeat: HeartbeatOptions = None, socket_options: SocketOptions = None,
+                 reconnect: ReconnectOptions = None, shared_memory: SharedMemoryOptions = None):
         super(TCPClient, self).__init__()
         self._logger = logging.getLogger(self.__class__.__name__)
-        self.__buffer = None
+        self.__buffer: DataBuffer = None
         self.__socket: QAbstractSocket = None
+        self.__connector: Connector = None
+        self.__heartbeat = heartbeat
+        self.__socket_options = socket_options if socket_options is not None else SocketOptions()
+        self.__reconnect = reconnect
+        self.__shared_memory = shared_memory
+        self.__rtt = None
+
+        self.__address = None
+        self.__closing = False
+        self.__attempt = 0
+        self.__connect_started = None
+        self.__queue = deque()
+        self.__stats = {"attempts": 0, "successes": 0, "failures": 0,
+                        "last_connect_ms": None, "total_connect_ms": 0.0}
+        self.__connection_stats = ConnectionStats()
+
+        self.__connect_timer = QTimer(self)
+        self.__connect_timer.setSingleShot(True)
+        self.__connect_timer.timeout.connect(self.__check_connected)
+        self.__reconnect_timer = QTimer(self)
+        self.__reconnect_timer.setSingleShot(True)
+        self.__reconnect_timer.timeout.connect(self.__connect)
 
     @Slot(str, int)
     def start(self, ip: str, port: int, timeout: int = 5):
-        if self.__socket:
+        if self.__socket or self.__connector:
             self._logger.info(f"Closing and connecting to {ip}:{port}")
-            self.__socket.close()
-            self.__socket = None
-            self.__buffer = None
+            if self.__socket:
+                self.__socket.close()
+            self.__drop_socket()
+
+        self.__address = (ip, port, timeout)
+        self.__closing = False
+        self.__attempt = 0
+        self.__reconnect_timer.stop()
+        self.__connect()
 
-        self.__socket = QTcpSocket()
+    @Slot()
+    def __connect(self):
+        self.__drop_socket()
+        ip, port, timeout = self.__address
+
+        self.__stats["attempts"] += 1
+        self.__connect_started = monotonic()
+        self.__connector = Connector(ip, port)
+        self.__connector.succeeded.connect(self.__on_connector_succeeded)
+        self.__connector.failed.connect(self.__on_connector_failed)
 
-        self.__buffer = DataBuffer(self.__socket)
+        self._logger.debug(f"Connecting to {ip}:{port}")
+        self._logger.debug(f"Starting connection timer with timeout {timeout} seconds")
+        self.__connect_timer.start(int(timeout * 1000))
+        self.__connector.start()
+
+    @Slot(object)
+    def __on_connector_succeeded(self, socket: QTcpSocket):
+        self.__drop_socket()
+        self.__socket = socket
+        self.__connection_stats.add()
+
+        self.__buffer = DataBuffer(self.__socket, self.__heartbeat, self.__shared_memory)
         self.__buffer.data.connect(self.on_message)
+        self.__buffer.stream_data.connect(self.on_stream_message)
+        self.__buffer.rtt_measured.connect(self.__on_rtt_measured)
+        self.__buffer.timeout.connect(lambda: self.error.emit(IdleTimeoutError("Connection timed out")))
 
-        self.__socket.connected.connect(self.__on_socket_connected)
         self.__socket.disconnected.connect(self.__on_socket_disconnected)
         self.__socket.error.connect(self.__on_socket_error)
-        self.__socket.connectToHost(QHostAddress(ip), port)
+        self.__socket.bytesWritten.connect(self.bytes_written.emit)
+        self.__on_socket_connected()
+        if self.__socket is socket and socket.bytesAvailable():
+            self.__buffer.on_socket_ready_read()
 
-        self._logger.debug(f"Connecting to {ip}:{port}")
-        self._logger.debug(f"Starting connection timer with timeout {timeout} seconds")
-        QTimer.singleShot(timeout * 1000, self.__check_connected)
+    @Slot(str)
+    def __on_connector_failed(self, error: str):
+        self.error.emit(Exception(error))
+        self.__on_connect_failed()
+
+    def __drop_socket(self):
+        """Forget current socket and connection attempts without emitting any of their signals."""
+        connector = self.__connector
+        if connector is not None:
+            self.__connector = None
+            connector.abort()
+            # connector may be dropped from one of its own signals
+            delete_later(connector)
+        socket = self.__socket
+        if socket is None:
+            return
+        self.__socket = None
+        self.__connection_stats.remove(self.__buffer.counters(), self.__buffer.disconnect_reason())
+        self.__buffer.stop_heartbeat()
+        self.__buffer.setParent(socket)
+        self.__buffer = None
+        socket.blockSignals(True)
+        socket.abort()
+        delete_later(socket)
+
+    def __is_connected(self) -> bool:
+        return self.__socket is not None and self.__socket.state() == QAbstractSocket.SocketState.ConnectedState
+
+    def __enqueue(self, stream_id: int, data: bytes) -> bool:
+        """Queue message written while not connected. Returns False if message can not be queued."""
+        reconnect = self.__reconnect
+        if self.__connector is None and (reconnect is None or self.__closing or self.__address is None):
+            return False
+        if reconnect is not None and len(self.__queue) >= reconnect.queue_size:
+            self.error.emit(QueueFullError(f"Outbound queue is full ({reconnect.queue_size} messages)"))
+        else:
+            self.__queue.append((stream_id, data))
+        return True
 
     @Slot(bytes)
     def write(self, data: bytes):
-        if self.__buffer:
+        if self.__is_connected():
             self.__buffer.write(data)
+        elif not self.__enqueue(0, data):
+            self.error.emit(NotConnectedError("Client is not connected"))
+
+    @Slot(int, bytes)
+    def write_stream(self, stream_id: int, data: bytes):
+        if self.__is_connected():
+            self.__buffer.write_stream(stream_id, data)
+        elif not self.__enqueue(stream_id, data):
+            self.error.emit(NotConnectedError("Client is not connected"))
+
+    @Slot(int)
+    def pause_stream(self, stream_id: int):
+        """Stop granting flow control credit to stream until resume_stream() is called."""
+        if self.__buffer:
+            self.__buffer.pause_stream(stream_id)
+
+    @Slot(int)
+    def resume_stream(self, stream_id: int):
+        if self.__buffer:
+            self.__buffer.resume_stream(stream_id)
+
+    @Slot()
+    def queue_size(self) -> int:
+        """Number of messages queued while not connected."""
+        return len(self.__queue)
+
+    @Slot()
+    def connect_stats(self) -> dict:
+        """Connection attempt statistics.
+
+        Returns:
+            dict: attempts, successes and failures counters, duration of the last successful
+                connection attempt (last_connect_ms) and its average (avg_connect_ms) in milliseconds,
+                both None before the first connection.
+        """
+        stats = dict(self.__stats)
+        total = stats.pop("total_connect_ms")
+        stats["avg_connect_ms"] = total / stats["successes"] if stats["successes"] else None
+        return stats
+
+    @Slot()
+    def sample_stats(self):
+        """Sample queue depth of the connection. Must be called from the client's thread,
+        stats() does it when called from there."""
+        buffer = self.__buffer
+        self.__connection_stats.sample([buffer] if buffer is not None else [])
+
+    @Slot()
+    def stats(self) -> dict:
+        """Traffic statistics of all connections of the client, see metrics.ConnectionStats.snapshot().
+        queued_messages includes messages queued while not connected, connect holds connect_stats().
+        """
+        if QThread.currentThread() == self.thread():
+            self.sample_stats()
+        buffer = self.__buffer
+        stats = self.__connection_stats.snapshot({0: buffer.counters()} if buffer is not None else {})
+        stats["queued_messages"] += len(self.__queue)
+        stats["connect"] = self.connect_stats()
+        return stats
+
+    @Slot(float)
+    def __on_rtt_measured(self, rtt: float):
+        self.__rtt = rtt
+
+    @Slot()
+    def rtt(self):
+        """Last round trip time measured by heartbeat in milliseconds or None if not measured yet."""
+        return self.__rtt
+
+    def is_shared_memory_active(self) -> bool:
+        """Whether server attached to the shared memory ring, so large messages are written to it."""
+        return self.__buffer is not None and self.__buffer.is_shared_memory_active()
 
     @Slot()
     def __on_socket_connected(self):
+        self.__connect_timer.stop()
+        elapsed = (monotonic() - self.__connect_started) * 1000
+        self.__connect_started = None
+        self.__attempt = 0
+        self.__stats["successes"] += 1
+        self.__stats["last_connect_ms"] = elapsed
+        self.__stats["total_connect_ms"] += elapsed
+
+        self.__socket_options.apply(self.__socket)
         ip = self.__socket.peerAddress().toString()
         port = int(self.__socket.peerPort())
-        self._logger.info("Connected to {}:{}".format(ip, port))
+        self._logger.info("Connected to {}:{} in {:.1f} ms".format(ip, port, elapsed))
+        queue = self.__queue
+        while queue and self.__is_connected():
+            stream_id, data = queue.popleft()
+            if stream_id == 0:
+                self.__buffer.write(data)
+            else:
+                self.__buffer.write_stream(stream_id, data)
         self.on_connected(ip, port)
 
     @Slot()
     def __on_socket_disconnected(self):
         self._logger.info("Disconnected from server")
         self.on_disconnected()
+        if self.__reconnect is not None and not self.__closing and self.__socket is not None:
+            self.__schedule_reconnect()
 
     @Slot()
     def __on_socket_error(self):
@@ -66,25 +281,53 @@ class TCPClient(AbstractClient):
 
     @Slot()
     def __check_connected(self):
-        if self.__socket and self.__socket.state() != QAbstractSocket.SocketState.ConnectedState:
-            self.__socket.close()
+        if self.__connector is not None:
+            self.__on_connect_failed()
+
+    def __on_connect_failed(self):
+        self.__connect_timer.stop()
+        self.__connect_started = None
+        self.__stats["failures"] += 1
+        self.__drop_socket()
+        if self.__reconnect is None:
+            self.__queue.clear()
             self.on_failed_to_connect()
+        elif not self.__closing:
+            self.__schedule_reconnect()
+
+    def __schedule_reconnect(self):
+        options = self.__reconnect
+        self.__attempt += 1
+        if options.max_attempts and self.__attempt > options.max_attempts:
+            self._logger.info(f"Giving up after {options.max_attempts} reconnection attempts")
+            self.__queue.clear()
+            self.on_failed_to_connect()
+            return
+        # random delay keeps clients disconnected at the same moment from reconnecting at the same moment
+        delay = options.delay(self.__attempt, random.random())
+        self._logger.debug(f"Reconnecting in {delay:.3f} seconds, attempt {self.__attempt}")
+        self.reconnecting.emit(self.__attempt, delay)
+        self.__reconnect_timer.start(int(delay * 1000))
 
     @Slot(int)
     def wait(self, timeout: int = 5):
-        """Wait for client to close."""
-        timer = QDeadlineTimer(1000 * timeout)
-        while not timer.hasExpired():
-            if self.__socket.state() != QAbstractSocket.SocketState.ConnectedState:
-                break
+        """Wait for client to disconnect. Blocks calling thread without using CPU."""
+        if self.__socket is not None and self.__socket.state() != QAbstractSocket.SocketState.UnconnectedState:
+            self.__socket.waitForDisconnected(timeout * 1000)
 
     @Slot()
     def is_running(self) -> bool:
-        return self.__socket is not None and self.__socket.state() == QAbstractSocket.SocketState.ConnectedState
+        return self.__is_connected()
 
     @Slot()
     def close(self):
+        """Close socket and stop reconnecting. Queued messages are dropped."""
+        self.__closing = True
+        self.__connect_started = None
+        self.__connect_timer.stop()
+        self.__reconnect_timer.stop()
+        self.__queue.clear()
         if self.__socket:
             self.__socket.close()
-            self.__socket = None
+        self.__drop_socket()
         self.closed.emit()
@@ -1,21 +1,28 @@
 from qtpy.QtCore import Slot, Signal, QThread, Qt
+
+from QtPyNetwork.options import HeartbeatOptions, SocketOptions, ReconnectOptions
 from .TCPClient import TCPClient
 from .AbstractClient import AbstractClient
 
 
 class _Worker(TCPClient):
     write_signal = Signal(bytes)
+    write_stream_signal = Signal(int, bytes)
     close_signal = Signal()
     start_signal = Signal()
+    sample_signal = Signal()
 
-    def __init__(self, ip: str, port: int, timeout: int = 5):
-        super().__init__()
+    def __init__(self, ip: str, port: int, timeout: int = 5, heartbeat: HeartbeatOptions = None,
+                 socket_options: SocketOptions = None, reconnect: ReconnectOptions = None):
+        super().__init__(heartbeat, socket_options, reconnect)
         self.__ip = ip
         self.__port = port
         self.__timeout = timeout
 
         self.write_signal.connect(self.write)
+        self.write_stream_signal.connect(self.write_stream)
         self.start_signal.connect(self.start)
+        self.sample_signal.connect(self.sample_stats)
         self.close_signal.connect(self.close, Qt.BlockingQueuedConnection)
 
     @Slot()
@@ -25,24 +32,39 @@ class _Worker(TCPClient):
 
 
 class ThreadedTCPClient(AbstractClient):
+    """TCP client running in its own thread.
+
+    Args:
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        socket_options (SocketOptions): Options applied to socket after connecting.
+        reconnect (ReconnectOptions): Automatic reconnection settings. None disables reconnecting.
+    """
 
-    def __init__(self):
+    reconnecting = Signal(int, float)
+
+    def __init__(self, heartbeat: HeartbeatOptions = None, socket_options: SocketOptions = None,
+                 reconnect: ReconnectOptions = None):
         super().__init__()
         self.__worker: _Worker = None
         self.__thread: QThread = None
+        self.__heartbeat = heartbeat
+        self.__socket_options = socket_options
+        self.__reconnect = reconnect
 
     @Slot(str, int)
     def start(self, ip: str, port: int, timeout: int = 5):
         if self.is_running():
             self.close()
 
-        self.__worker = _Worker(ip, port, timeout)
+        self.__worker = _Worker(ip, port, timeout, self.__heartbeat, self.__socket_options, self.__reconnect)
         self.__worker.message.connect(self.on_message)
+        self.__worker.stream_message.connect(self.on_stream_message)
         self.__worker.connected.connect(self.on_connected)
         self.__worker.failed_to_connect.connect(self.on_failed_to_connect)
         self.__worker.disconnected.connect(self.on_disconnected)
         self.__worker.closed.connect(self.on_closed)
         self.__worker.error.connect(self.on_error)
+        self.__worker.reconnecting.connect(self.reconnecting.emit)
         self.__thread = QThread()
         self.__worker.moveToThread(self.__thread)
         self.__thread.started.connect(self.__worker.start_signal.emit)
@@ -56,6 +78,31 @@ class ThreadedTCPClient(AbstractClient):
     def write(self, data: bytes):
         self.__worker.write_signal.emit(data)
 
+    @Slot(int, bytes)
+    def write_stream(self, stream_id: int, data: bytes):
+        self.__worker.write_stream_signal.emit(stream_id, data)
+
+    @Slot()
+    def rtt(self):
+        """Last round trip time measured by heartbeat in milliseconds or None if not measured yet."""
+        if self.__worker is not None:
+            return self.__worker.rtt()
+
+    @Slot()
+    def connect_stats(self):
+        """Connection attempt statistics, see TCPClient.connect_stats()."""
+        if self.__worker is not None:
+            return self.__worker.connect_stats()
+
+    @Slot()
+    def stats(self) -> dict:
+        """Traffic statistics, see TCPClient.stats(). Queue depth is sampled by client thread
+        and returned with the next call."""
+        if self.__worker is None:
+            return {}
+        self.__worker.sample_signal.emit()
+        return self.__worker.stats()
+
     @Slot()
     def is_running(self) -> bytes:
         return (self.__worker is not None and self.__worker.is_running()
@@ -63,9 +110,9 @@ class ThreadedTCPClient(AbstractClient):
 
     @Slot(int)
     def wait(self, timeout: int = 5):
-        if self.__worker is not None and self.__thread is not None:
-            self.__worker.wait(timeout)
-            self.__thread.wait(timeout)
+        """Wait for client thread to finish."""
+        if self.__thread is not None:
+            self.__thread.wait(timeout * 1000)
 
     @Slot()
     def close(self):
@@ -0,0 +1,108 @@
+from qtpy.QtCore import Slot, Signal, QThread, Qt
+
+from QtPyNetwork.common import DEFAULT_MTU
+from QtPyNetwork.options import ReliableOptions
+from .UDPClient import UDPClient
+from .AbstractClient import AbstractClient
+
+
+class _Worker(UDPClient):
+    write_signal = Signal(bytes, int)
+    close_signal = Signal()
+    start_signal = Signal()
+    sample_signal = Signal()
+
+    def __init__(self, ip: str, port: int, timeout: int = 5, packed: bool = False, mtu: int = DEFAULT_MTU,
+                 reliable: ReliableOptions = None):
+        super().__init__(packed, mtu, reliable)
+        self.__ip = ip
+        self.__port = port
+        self.__timeout = timeout
+
+        self.write_signal.connect(self.__on_write_signal)
+        self.start_signal.connect(self.start)
+        self.sample_signal.connect(self.sample_stats)
+        self.close_signal.connect(self.close, Qt.BlockingQueuedConnection)
+
+    @Slot()
+    def start(self):
+        """Worker must be started from its own thread."""
+        super(_Worker, self).start(self.__ip, self.__port, self.__timeout)
+
+    @Slot(bytes, int)
+    def __on_write_signal(self, data: bytes, channel: int):
+        self.write(data, channel if channel >= 0 else None)
+
+
+class ThreadedUDPClient(AbstractClient):
+    """UDP client running in its own thread.
+
+    Args:
+        packed (bool): Pack and unpack multiple messages per datagram.
+        mtu (int): Maximum size of packed datagram payload.
+        reliable (ReliableOptions): Reliable delivery settings. None sends plain datagrams.
+    """
+
+    def __init__(self, packed: bool = False, mtu: int = DEFAULT_MTU, reliable: ReliableOptions = None):
+        super().__init__()
+        self.__worker: _Worker = None
+        self.__thread: QThread = None
+        self.__packed = packed
+        self.__mtu = mtu
+        self.__reliable = reliable
+
+    @Slot(str, int)
+    def start(self, ip: str, port: int, timeout: int = 5):
+        if self.is_running():
+            self.close()
+
+        self.__worker = _Worker(ip, port, timeout, self.__packed, self.__mtu, self.__reliable)
+        self.__worker.message.connect(self.on_message)
+        self.__worker.connected.connect(self.on_connected)
+        self.__worker.failed_to_connect.connect(self.on_failed_to_connect)
+        self.__worker.disconnected.connect(self.on_disconnected)
+        self.__worker.closed.connect(self.on_closed)
+        self.__worker.error.connect(self.on_error)
+        self.__thread = QThread()
+        self.__worker.moveToThread(self.__thread)
+        self.__thread.started.connect(self.__worker.start_signal.emit)
+        self.__thread.start()
+
+    @Slot(Exception)
+    def on_error(self, error: Exception):
+        self.error.emit(error)
+
+    @Slot(bytes)
+    def write(self, data: bytes, channel: int = None):
+        self.__worker.write_signal.emit(data, -1 if channel is None else channel)
+
+    @Slot()
+    def rtt(self):
+        """Round trip time measured by reliable delivery in milliseconds or None if not measured yet."""
+        if self.__worker is not None:
+            return self.__worker.rtt()
+
+    @Slot()
+    def stats(self) -> dict:
+        """Traffic statistics, see UDPClient.stats(). Queued messages are sampled by client thread
+        and returned with the next call."""
+        if self.__worker is None:
+            return {}
+        self.__worker.sample_signal.emit()
+        return self.__worker.stats()
+
+    @Slot()
+    def is_running(self) -> bool:
+        return (self.__worker is not None and self.__worker.is_running()
+                and self.__thread is not None and self.__thread.isRunning())
+
+    @Slot(int)
+    def wait(self, timeout: int = 5):
+        if self.__thread is not None:
+            self.__thread.wait(timeout * 1000)
+
+    @Slot()
+    def close(self):
+        if self.__worker is not None and self.__thread is not None:
+            self.__worker.close_signal.emit()
+            self.__thread.quit()
@@ -0,0 +1,218 @@
+from qtpy.QtNetwork import QAbstractSocket, QUdpSocket, QHostAddress
+from qtpy.QtCore import Slot, QTimer, QThread
+
+from QtPyNetwork.common import DEFAULT_MTU, pack_datagrams, unpack_datagram, delete_later
+from QtPyNetwork.exception import DeliveryFailedError
+from QtPyNetwork.metrics import Counters, ConnectionStats, DISCONNECT_LOCAL, DISCONNECT_LOST
+from QtPyNetwork.options import ReliableOptions
+from QtPyNetwork.reliable import ReliableSession
+from .AbstractClient import AbstractClient
+
+import logging
+
+
+class UDPClient(AbstractClient):
+    """UDP client. Sends datagrams to single server address.
+
+    Without packing every message is sent immediately in its own datagram.
+    With packed enabled, messages written during one event loop iteration are queued
+    and packed into as few datagrams as mtu allows. Server must use UDPBalancer with packed enabled.
+
+    With reliable options, messages are acknowledged by server and retransmitted when lost.
+    If a message is not acknowledged after max_retransmits retransmits, error signal is emitted
+    with DeliveryFailedError and socket is closed.
+
+    Args:
+        packed (bool): Pack and unpack multiple messages per datagram.
+        mtu (int): Maximum size of packed datagram payload.
+        reliable (ReliableOptions): Reliable delivery settings. None sends plain datagrams.
+    """
+
+    def __init__(self, packed: bool = False, mtu: int = DEFAULT_MTU, reliable: ReliableOptions = None):
+        super(UDPClient, self).__init__()
+        self._logger = logging.getLogger(self.__class__.__name__)
+        self.__socket: QUdpSocket = None
+        self.__packed = packed
+        self.__mtu = mtu
+        self.__reliable_options = reliable
+        self.__reliable: ReliableSession = None
+        self.__outgoing = []
+        self.__counters = Counters()
+        self.__connection_stats = ConnectionStats()
+        self.__open = False
+        self.__flush_timer = QTimer(self)
+        self.__flush_timer.setSingleShot(True)
+        self.__flush_timer.setInterval(0)
+        self.__flush_timer.timeout.connect(self.flush)
+
+    @Slot(str, int)
+    def start(self, ip: str, port: int, timeout: int = 5):
+        if self.__socket:
+            self._logger.info(f"Closing and connecting to {ip}:{port}")
+            self.__close_socket()
+
+        self.__socket = QUdpSocket()
+        self.__counters = Counters()
+        if self.__reliable_options is not None:
+            self.__reliable = ReliableSession(self.__reliable_options, self.__send, self.__on_reliable_lost)
+        self.__socket.connected.connect(self.__on_socket_connected)
+        self.__socket.disconnected.connect(self.__on_socket_disconnected)
+        self.__socket.readyRead.connect(self.__on_socket_ready_read)
+        self.__socket.error.connect(self.__on_socket_error)
+        self.__socket.connectToHost(QHostAddress(ip), port)
+
+        self._logger.debug(f"Connecting to {ip}:{port}")
+        QTimer.singleShot(timeout * 1000, self.__check_connected)
+
+    @Slot(bytes)
+    def write(self, data: bytes, channel: int = None):
+        """Write data to server.
+
+        Args:
+            data (bytes): Data to write.
+            channel (int): Reliable channel, CHANNEL_ORDERED or CHANNEL_UNORDERED.
+                Defaults to channel from reliable options. Ignored without reliable options.
+        """
+        if self.__socket is None:
+            return
+        if self.__reliable is not None:
+            self.__reliable.write(data, channel)
+        else:
+            self.__send(data)
+
+    def __send(self, data: bytes):
+        if not self.__packed:
+            if self.__socket.write(data) >= 0:
+                self.__counters.frames_out += 1
+                self.__counters.bytes_out += len(data)
+            return
+        self.__outgoing.append(data)
+        if not self.__flush_timer.isActive():
+            self.__flush_timer.start()
+
+    @Slot()
+    def flush(self):
+        """Send queued messages without waiting for the next event loop iteration."""
+        self.__flush_timer.stop()
+        messages = self.__outgoing
+        if not messages:
+            return
+        self.__outgoing = []
+        if self.__socket is None:
+            return
+        for datagram in pack_datagrams(messages, self.__mtu):
+            if self.__socket.write(datagram) < 0:
+                break
+            self.__counters.frames_out += 1
+            self.__counters.bytes_out += len(datagram)
+
+    @Slot()
+    def __on_socket_ready_read(self):
+        socket = self.__socket
+        reliable = self.__reliable
+        while socket is not None and socket.hasPendingDatagrams():
+            data = socket.readDatagram(max(socket.pendingDatagramSize(), 0))[0]
+            self.__counters.frames_in += 1
+            self.__counters.bytes_in += len(data)
+            try:
+                messages = unpack_datagram(data) if self.__packed else (data,)
+                if reliable is not None:
+                    messages = [message for frame in messages for message in reliable.receive(frame)]
+            except ValueError as e:
+                self.__counters.decode_errors += 1
+                self.error.emit(e)
+                continue
+            for message in messages:
+                self.on_message(message)
+            # socket is None if client was closed from message handler
+            socket = self.__socket
+        if reliable is not None and self.__socket is not None:
+            reliable.flush_acks()
+
+    def __on_reliable_lost(self):
+        self.error.emit(DeliveryFailedError(f"Message was not acknowledged after "
+                                            f"{self.__reliable_options.max_retransmits} retransmits"))
+        if self.__socket is not None:
+            self.__close_socket(DISCONNECT_LOST)
+
+    @Slot()
+    def rtt(self):
+        """Round trip time measured by reliable delivery in milliseconds or None if not measured yet."""
+        if self.__reliable is not None:
+            return self.__reliable.rtt()
+
+    @Slot()
+    def __on_socket_connected(self):
+        ip = self.__socket.peerAddress().toString()
+        port = int(self.__socket.peerPort())
+        self._logger.info("Connected to {}:{}".format(ip, port))
+        self.__open = True
+        self.__connection_stats.add()
+        self.on_connected(ip, port)
+
+    @Slot()
+    def __on_socket_disconnected(self):
+        self._logger.info("Disconnected from server")
+        self.on_disconnected()
+
+    @Slot()
+    def __on_socket_error(self):
+        """Handle socket errors, for example ICMP port unreachable.
+
+        Note:
+            Emits error signal.
+        """
+        if self.__socket:
+            self.error.emit(Exception(self.__socket.errorString()))
+
+    @Slot()
+    def __check_connected(self):
+        if self.__socket and self.__socket.state() != QAbstractSocket.SocketState.ConnectedState:
+            self.__close_socket()
+            self.on_failed_to_connect()
+
+    def __close_socket(self, reason: str = DISCONNECT_LOCAL):
+        self.flush()
+        if self.__open:
+            self.__open = False
+            self.__connection_stats.remove(self.__counters, reason)
+        if self.__reliable is not None:
+            self.__reliable.close()
+            self.__reliable = None
+        socket = self.__socket
+        self.__socket = None
+        socket.close()
+        # socket may be closed from one of its own signals
+        delete_later(socket)
+
+    @Slot()
+    def sample_stats(self):
+        """Sample queued messages. Must be called from the client's thread,
+        stats() does it when called from there."""
+        queued = len(self.__outgoing)
+        if self.__reliable is not None:
+            queued += self.__reliable.pending()
+        self.__connection_stats.queued_messages = queued
+
+    @Slot()
+    def stats(self) -> dict:
+        """Traffic statistics, see metrics.ConnectionStats.snapshot(). Frames are datagrams."""
+        if QThread.currentThread() == self.thread():
+            self.sample_stats()
+        return self.__connection_stats.snapshot({0: self.__counters} if self.__open else {})
+
+    @Slot(int)
+    def wait(self, timeout: int = 5):
+        """Datagrams are sent immediately, there is nothing to wait for."""
+        pass
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.__socket is not None and self.__socket.state() == QAbstractSocket.SocketState.ConnectedState
+
+    @Slot()
+    def close(self):
+        """Send queued messages and close socket."""
+        if self.__socket:
+            self.__close_socket()
+        self.closed.emit()
@@ -1,2 +1,12 @@
-from .TCPClient import TCPClient
-from .ThreadedTCPClient import ThreadedTCPClient
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".TCPClient": ("TCPClient",),
+    ".ThreadedTCPClient": ("ThreadedTCPClient",),
+    ".UDPClient": ("UDPClient",),
+    ".ThreadedUDPClient": ("ThreadedUDPClient",),
+    ".LocalClient": ("LocalClient",),
+    ".ClientPool": ("ClientPool",),
+    ".BlockingClient": ("BlockingClient",),
+    ".ClientManager": ("ClientManager", "ManagedClient", "ManagedClientSignals"),
+})
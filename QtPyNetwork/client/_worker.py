@@ -0,0 +1,43 @@
+from qtpy.QtCore import Slot, Signal, QObject
+
+from QtPyNetwork.metrics import merge_stats
+
+
+class ClientWorker(QObject):
+    """Base of worker objects which own TCP clients in their thread, used by ClientPool and ClientManager.
+
+    Subclasses keep their clients in clients dict and call retire() for every client they drop,
+    so its counters stay in snapshot().
+    """
+
+    sample_signal = Signal()
+
+    def __init__(self):
+        super(ClientWorker, self).__init__()
+        self.clients = {}
+        # statistics of closed clients
+        self.retired = {}
+        self.sample_signal.connect(self.sample_stats)
+
+    def retire(self, client) -> None:
+        """Keep counters of client which is going away."""
+        retired = merge_stats([self.retired, client.stats()])
+        del retired["workers"]
+        retired.update(connections=0, queued_bytes=0, queued_messages=0)
+        self.retired = retired
+
+    @Slot()
+    def sample_stats(self) -> None:
+        for client in self.clients.values():
+            client.sample_stats()
+
+    def snapshot(self, per_client: bool = False) -> dict:
+        """Statistics of current and closed clients. Called from other thread, clients are only read."""
+        clients = self.clients.copy()
+        current = {client_id: client.stats() for client_id, client in clients.items()}
+        stats = merge_stats([dict(self.retired)] + list(current.values()))
+        del stats["workers"]
+        stats["worker"] = self.objectName()
+        if per_client:
+            stats["clients"] = current
+        return stats
@@ -1,34 +1,170 @@
-from qtpy.QtNetwork import QAbstractSocket, QUdpSocket
+from qtpy import PYSIDE2, PYSIDE6
+from qtpy.QtNetwork import QAbstractSocket, QUdpSocket, QLocalSocket, QHostAddress
 from qtpy.QtCore import QObject, QTimer, Signal, Slot
 from struct import unpack, calcsize, pack
+from collections import deque
+from time import monotonic
 
-HEADER = '!L'
-HEADER_SIZE = calcsize(HEADER)
+import socket as _socket
+import logging
+
+from QtPyNetwork.options import HeartbeatOptions, SharedMemoryOptions
+from QtPyNetwork.framing import (HEADER, HEADER_SIZE, CONTROL_FLAG, SIZE_MASK, CONTROL, CONTROL_SIZE,  # noqa: F401
+                                 CONTROL_PING, CONTROL_PONG, CONTROL_STREAM, CONTROL_CREDIT, CONTROL_SHARED_OPEN,
+                                 CONTROL_SHARED_ACK, CONTROL_SHARED_DATA, TIMESTAMP, STREAM, STREAM_SIZE, CREDIT,
+                                 STREAM_WINDOW, SHARED_OPEN, SHARED_OPEN_SIZE, SHARED_DATA, DATAGRAM_HEADER,
+                                 DATAGRAM_HEADER_SIZE, DEFAULT_MTU, pack_datagrams, unpack_datagram)
+from QtPyNetwork.timer import TimerWheel
+from QtPyNetwork.metrics.Counters import (Counters, DISCONNECT_LOCAL, DISCONNECT_REMOTE, DISCONNECT_IDLE_TIMEOUT,
+                                          DISCONNECT_ERROR)
+
+if PYSIDE2 or PYSIDE6:
+    from qtpy.shiboken import delete as _delete, isValid as _is_valid
+else:
+    from qtpy.sip import delete as _delete, isdeleted as _is_deleted
+
+    def _is_valid(obj) -> bool:
+        return not _is_deleted(obj)
+
+# bytes socket keeps reading while reading is paused, then TCP flow control slows the peer down
+PAUSED_READ_BUFFER = 64 * 1024
+
+# QAbstractSocket.SocketError and QLocalSocket.LocalSocketError share these values
+_NO_ERROR = -1
+_PEER_CLOSED = 1
+
+# notification of message copied into shared memory ring, control frame of CONTROL_SHARED_DATA type
+_SHARED_NOTIFICATION = HEADER + CONTROL[1:] + SHARED_DATA[1:]
+_SHARED_NOTIFICATION_SIZE = calcsize(SHARED_DATA) + CONTROL_SIZE
+
+
+def delete_later(obj: QObject) -> None:
+    """Delete Qt object when control returns to the event loop of the current thread.
+
+    Use instead of QObject.deleteLater() for objects created from Python. Objects deleted
+    by the event loop call Python virtual handlers while Qt holds its connection locks, which
+    deadlocks with other threads holding the GIL and waiting for the same lock. Here object
+    is deleted from Python, with the GIL already held.
+
+    Args:
+        obj (QObject): Object to delete. It may be emitting signal at the moment.
+    """
+    QTimer.singleShot(0, lambda: _delete(obj) if _is_valid(obj) else None)
+
+
+def close_descriptor(socket_descriptor: int) -> None:
+    """Close accepted socket descriptor which was not passed to a Qt socket."""
+    try:
+        _socket.socket(fileno=socket_descriptor).close()
+    except OSError:
+        pass
+
+
+class LocalSocket(QLocalSocket):
+    """QLocalSocket with the part of QAbstractSocket interface used by balancers and DataBuffer,
+    so local connections can be passed to balance() like TCP connections.
+
+    Peer of a local socket always runs on this host, it is reported as localhost with port 0.
+    """
+
+    def disconnectFromHost(self) -> None:
+        self.disconnectFromServer()
+
+    def peerAddress(self) -> QHostAddress:
+        return QHostAddress(QHostAddress.LocalHost)
+
+    def peerPort(self) -> int:
+        return 0
+
+
+class _Stream:
+    """Flow control state of one logical stream."""
+
+    __slots__ = ("credit", "queue", "consumed", "paused")
+
+    def __init__(self):
+        self.credit = STREAM_WINDOW
+        self.queue = deque()
+        self.consumed = 0
+        self.paused = False
 
 
 class DataBuffer(QObject):
     """Small wrapper around QT's QAbstractSocket to make it easier to use.
-    Stores data in a buffer and emits signals when data is ready."""
+    Stores data in a buffer and emits signals when data is ready.
+
+    Control frames (ping and pong) are handled internally and are never emitted
+    via data signal.
+
+    Messages written with write_stream() are delivered by stream_data signal with their stream ID.
+    Streams share the connection, but each has its own flow control: a stream may have
+    at most STREAM_WINDOW bytes in flight, further messages are queued until the receiver
+    grants credit. Credit is granted as messages are delivered, unless the stream is paused,
+    so a slow stream never blocks the other ones. Stream 0 is the plain data stream.
+
+    Traffic of the connection is counted in Counters returned by counters(), frames include
+    control frames and bytes include frame headers.
+
+    With shared memory enabled, socket is offered a ring in shared memory once connected, and large
+    messages are moved through it when the peer on the same host attaches, see SharedMemoryOptions.
+    Messages received from the ring are counted as if they were read from socket.
+
+    Args:
+        socket (QAbstractSocket): Connected or connecting socket.
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings. None disables heartbeats.
+        shared_memory (SharedMemoryOptions): Shared memory transport settings. None disables shared memory.
+    """
 
     data = Signal(bytes)
+    stream_data = Signal(int, bytes)
+    rtt_measured = Signal(float)
+    timeout = Signal()
 
-    def __init__(self, socket: QAbstractSocket):
+    def __init__(self, socket: QAbstractSocket, heartbeat: HeartbeatOptions = None,
+                 shared_memory: SharedMemoryOptions = None):
         super().__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
         self.__data = b""
         self.__size_left = 0
+        self.__control = False
         self.__socket = socket
         self.__socket.readyRead.connect(self.on_socket_ready_read)
+        self.__streams = {}
+        self.__counters = Counters()
+        self.__timed_out = False
+        self.__reading_paused = False
+
+        self.__last_read = monotonic()
+        self.__rtt = None
+        self.__heartbeat = heartbeat
+        self.__heartbeat_handle = None
+        self.__wheel = None
+        if heartbeat is not None:
+            self.__wheel = TimerWheel.instance()
+            self.__socket.disconnected.connect(self.stop_heartbeat)
+            self.__heartbeat_handle = self.__wheel.schedule(heartbeat.interval, self.__on_heartbeat)
+
+        self.__shared_memory = shared_memory
+        # ring offered to the peer, ring the peer attached to and ring the peer writes to
+        self.__offered_ring = None
+        self.__ring_out = None
+        self.__ring_in = None
+        if shared_memory is not None:
+            self.__socket.disconnected.connect(self.close_shared_memory)
+            if self.__socket.state() == QAbstractSocket.SocketState.ConnectedState:
+                self.__offer_shared_memory()
+            else:
+                self.__socket.connected.connect(self.__offer_shared_memory)
 
     @Slot()
     def on_socket_ready_read(self) -> None:
         """Read data from socket."""
+        self.__last_read = monotonic()
         while self.__socket.bytesAvailable():
             size_left = self.__size_left
-            # print(f"Left: {size_left}")
             if size_left > 0:
                 data = self.__socket.read(size_left)
                 size_left = size_left - len(data)
-                # print(f"ContinueR: {size_left}, {len(data)}")
                 if size_left > 0:
                     self.__data += data
                     self.__size_left = size_left
@@ -36,17 +172,67 @@ class DataBuffer(QObject):
                     data = self.__data + data
                     self.__data = b""
                     self.__size_left = 0
-                    self.data.emit(data)
+                    self.__on_frame(data)
             else:
+                if self.__socket.bytesAvailable() < HEADER_SIZE:
+                    # wait for the rest of the header
+                    return
                 header = self.__socket.read(HEADER_SIZE)
                 data_size = unpack(HEADER, header)[0]
+                self.__control = bool(data_size & CONTROL_FLAG)
+                data_size = data_size & SIZE_MASK
                 data = self.__socket.read(data_size)
-                # print(f"EmptyB: {header}, {data_size}")
                 if len(data) < data_size:
                     self.__data = data
                     self.__size_left = data_size - len(data)
                 else:
-                    self.data.emit(data)
+                    self.__on_frame(data)
+
+    def __on_frame(self, data: bytes) -> None:
+        counters = self.__counters
+        counters.frames_in += 1
+        counters.bytes_in += len(data) + HEADER_SIZE
+        if not self.__control:
+            self.data.emit(data)
+            return
+        if len(data) < CONTROL_SIZE:
+            # exceptions must not leave the readyRead slot, malformed frames are dropped
+            counters.decode_errors += 1
+            self.logger.debug("Control frame without control type")
+            return
+        control_type = unpack(CONTROL, data[:CONTROL_SIZE])[0]
+        body = data[CONTROL_SIZE:]
+        if control_type == CONTROL_STREAM and len(body) >= STREAM_SIZE:
+            self.__on_stream_frame(unpack(STREAM, body[:STREAM_SIZE])[0], body[STREAM_SIZE:])
+        elif control_type == CONTROL_CREDIT and len(body) == calcsize(CREDIT):
+            self.__on_credit_frame(*unpack(CREDIT, body))
+        elif control_type == CONTROL_PING:
+            self.write_control(CONTROL_PONG, body)
+        elif control_type == CONTROL_PONG and len(body) == calcsize(TIMESTAMP):
+            self.__rtt = (monotonic() - unpack(TIMESTAMP, body)[0]) * 1000
+            self.rtt_measured.emit(self.__rtt)
+        elif control_type == CONTROL_SHARED_DATA and self.__ring_in is not None and len(body) == calcsize(SHARED_DATA):
+            ring = self.__ring_in
+            size = unpack(SHARED_DATA, body)[0]
+            if size > ring.capacity() or size > ring.available():
+                # ring and notifications are out of sync, nothing more can be read
+                counters.decode_errors += 1
+                self.logger.warning(f"Peer announced {size} bytes its shared memory does not hold, aborting")
+                self.__socket.abort()
+                return
+            data = ring.get(size)
+            counters.bytes_in += len(data)
+            self.data.emit(data)
+        elif control_type == CONTROL_SHARED_OPEN and len(body) > SHARED_OPEN_SIZE:
+            self.__attach_shared_memory(unpack(SHARED_OPEN, body[:SHARED_OPEN_SIZE])[0], body[SHARED_OPEN_SIZE:])
+        elif control_type == CONTROL_SHARED_ACK and self.__offered_ring is not None:
+            # peer mapped the ring, its name is not needed anymore
+            self.__ring_out = self.__offered_ring
+            self.__offered_ring = None
+            self.__ring_out.unlink()
+        else:
+            counters.decode_errors += 1
+            self.logger.debug(f"Unknown control frame {control_type}")
 
     @Slot(bytes)
     def write(self, data: bytes) -> None:
@@ -55,6 +241,342 @@ class DataBuffer(QObject):
         Args:
             data (bytes): Data to write.
         """
+        ring = self.__ring_out
+        if ring is not None and len(data) >= self.__shared_memory.threshold and ring.put(data):
+            counters = self.__counters
+            counters.frames_out += 1
+            counters.bytes_out += len(data) + HEADER_SIZE
+            self.__socket.write(pack(_SHARED_NOTIFICATION, _SHARED_NOTIFICATION_SIZE | CONTROL_FLAG,
+                                     CONTROL_SHARED_DATA, len(data)))
+            self.__socket.flush()
+            return
         data = pack(HEADER, len(data)) + data
+        counters = self.__counters
+        counters.frames_out += 1
+        counters.bytes_out += len(data)
         self.__socket.write(data)
         self.__socket.flush()
+
+    def write_control(self, control_type: int, body: bytes = b"") -> None:
+        """Write control frame to socket.
+
+        Args:
+            control_type (int): Control frame type.
+            body (bytes): Control frame payload.
+        """
+        data = pack(CONTROL, control_type) + body
+        counters = self.__counters
+        counters.frames_out += 1
+        counters.bytes_out += len(data) + HEADER_SIZE
+        self.__socket.write(pack(HEADER, len(data) | CONTROL_FLAG) + data)
+        self.__socket.flush()
+
+    def write_stream(self, stream_id: int, data: bytes) -> None:
+        """Write message to logical stream. Message is queued if the stream ran out of credit.
+
+        Args:
+            stream_id (int): Stream ID. Stream 0 is the plain data stream without flow control.
+            data (bytes): Data to write.
+        """
+        if stream_id == 0:
+            self.write(data)
+            return
+        stream = self.__stream(stream_id)
+        if stream.queue or stream.credit <= 0:
+            stream.queue.append(data)
+        else:
+            self.__send_stream_frame(stream_id, stream, data)
+
+    def __send_stream_frame(self, stream_id: int, stream: _Stream, data: bytes) -> None:
+        # message larger than remaining credit is sent whole, credit goes negative
+        stream.credit -= len(data)
+        self.write_control(CONTROL_STREAM, pack(STREAM, stream_id) + data)
+
+    def __stream(self, stream_id: int) -> _Stream:
+        stream = self.__streams.get(stream_id)
+        if stream is None:
+            stream = self.__streams[stream_id] = _Stream()
+        return stream
+
+    def __on_stream_frame(self, stream_id: int, data: bytes) -> None:
+        if stream_id == 0:
+            self.data.emit(data)
+            return
+        stream = self.__stream(stream_id)
+        stream.consumed += len(data)
+        if not stream.paused and stream.consumed >= STREAM_WINDOW // 2:
+            self.__grant(stream_id, stream)
+        self.stream_data.emit(stream_id, data)
+
+    def __grant(self, stream_id: int, stream: _Stream) -> None:
+        if stream.consumed:
+            self.write_control(CONTROL_CREDIT, pack(CREDIT, stream_id, stream.consumed))
+            stream.consumed = 0
+
+    def __on_credit_frame(self, stream_id: int, credit: int) -> None:
+        stream = self.__stream(stream_id)
+        stream.credit += credit
+        while stream.queue and stream.credit > 0:
+            self.__send_stream_frame(stream_id, stream, stream.queue.popleft())
+
+    def pause_stream(self, stream_id: int) -> None:
+        """Stop granting credit to stream. Peer stops sending once its credit is used up,
+        messages already in flight are still delivered."""
+        self.__stream(stream_id).paused = True
+
+    def resume_stream(self, stream_id: int) -> None:
+        """Grant credit for messages delivered while stream was paused."""
+        stream = self.__stream(stream_id)
+        stream.paused = False
+        self.__grant(stream_id, stream)
+
+    def close_stream(self, stream_id: int) -> None:
+        """Forget stream state. Messages waiting for credit are dropped."""
+        self.__streams.pop(stream_id, None)
+
+    def stream_queue_size(self, stream_id: int) -> int:
+        """Number of messages waiting for credit."""
+        stream = self.__streams.get(stream_id)
+        return len(stream.queue) if stream is not None else 0
+
+    def rtt(self):
+        """Last measured round trip time in milliseconds or None if no pong was received yet."""
+        return self.__rtt
+
+    def idle_time(self) -> float:
+        """Seconds since last data was received."""
+        return monotonic() - self.__last_read
+
+    def read_time(self) -> float:
+        """time.monotonic() when socket was read last time."""
+        return self.__last_read
+
+    def counters(self) -> Counters:
+        """Traffic counters of the connection. May be read from any thread."""
+        return self.__counters
+
+    def queued_bytes(self) -> int:
+        """Bytes written to socket and not sent yet. Must be called from the socket's thread."""
+        try:
+            return self.__socket.bytesToWrite()
+        except RuntimeError:
+            return 0
+
+    def queued_messages(self) -> int:
+        """Number of stream messages waiting for credit."""
+        return sum(len(stream.queue) for stream in self.__streams.values())
+
+    def disconnect_reason(self) -> str:
+        """Why the connection was closed, one of DISCONNECT_* constants of metrics."""
+        if self.__timed_out:
+            return DISCONNECT_IDLE_TIMEOUT
+        try:
+            error = int(self.__socket.error())
+        except RuntimeError:
+            return DISCONNECT_LOCAL
+        if error == _NO_ERROR:
+            return DISCONNECT_LOCAL
+        if error == _PEER_CLOSED:
+            return DISCONNECT_REMOTE
+        return DISCONNECT_ERROR
+
+    @Slot()
+    def stop_reading(self) -> None:
+        """Stop reading and emitting incoming frames. Used when connection is drained."""
+        self.stop_heartbeat()
+        try:
+            self.__socket.readyRead.disconnect(self.on_socket_ready_read)
+        except (TypeError, RuntimeError):
+            pass
+
+    @Slot()
+    def pause_reading(self) -> None:
+        """Stop reading frames until resume_reading() is called. Socket buffers at most
+        PAUSED_READ_BUFFER bytes, then the peer is slowed down by TCP flow control.
+        Connection does not time out while reading is paused."""
+        if self.__reading_paused:
+            return
+        self.__reading_paused = True
+        try:
+            self.__socket.readyRead.disconnect(self.on_socket_ready_read)
+            self.__socket.setReadBufferSize(PAUSED_READ_BUFFER)
+        except (TypeError, RuntimeError):
+            pass
+
+    @Slot()
+    def resume_reading(self) -> None:
+        """Resume reading paused by pause_reading() and read frames buffered meanwhile."""
+        if not self.__reading_paused:
+            return
+        self.__reading_paused = False
+        try:
+            self.__socket.setReadBufferSize(0)
+            self.__socket.readyRead.connect(self.on_socket_ready_read)
+            self.on_socket_ready_read()
+        except RuntimeError:
+            pass
+
+    def is_reading_paused(self) -> bool:
+        return self.__reading_paused
+
+    def is_shared_memory_active(self) -> bool:
+        """Whether peer attached to the ring offered by this side, so large messages are written to it."""
+        return self.__ring_out is not None
+
+    def __is_peer_local(self) -> bool:
+        # shared memory is only offered to and accepted from peers on this host
+        if isinstance(self.__socket, QLocalSocket):
+            return True
+        try:
+            return self.__socket.peerAddress().isLoopback()
+        except RuntimeError:
+            return False
+
+    @Slot()
+    def __offer_shared_memory(self) -> None:
+        if not self.__is_peer_local():
+            return
+        from QtPyNetwork.sharedmemory import SharedRing
+        try:
+            ring = SharedRing.create(self.__shared_memory.size)
+        except OSError as e:
+            self.logger.warning(f"Failed to create shared memory, using socket only: {e}")
+            return
+        self.__offered_ring = ring
+        self.write_control(CONTROL_SHARED_OPEN, pack(SHARED_OPEN, ring.size()) + ring.name().encode())
+
+    def __attach_shared_memory(self, size: int, name: bytes) -> None:
+        if self.__shared_memory is None or self.__ring_in is not None:
+            return
+        if not self.__is_peer_local():
+            # offers are only sent to peers on the same host
+            self.__counters.decode_errors += 1
+            self.logger.debug("Ignoring shared memory offer of remote peer")
+            return
+        from QtPyNetwork.sharedmemory import SharedRing
+        try:
+            self.__ring_in = SharedRing.attach(name.decode(), size)
+        except (OSError, ValueError, UnicodeDecodeError) as e:
+            # peer runs in another container or offered memory which is not a ring
+            self.logger.debug(f"Failed to attach to shared memory of peer, using socket only: {e}")
+            return
+        self.write_control(CONTROL_SHARED_ACK)
+
+    @Slot()
+    def close_shared_memory(self) -> None:
+        """Unmap shared memory rings. Connection keeps working over socket only."""
+        for ring in (self.__offered_ring, self.__ring_out, self.__ring_in):
+            if ring is not None:
+                ring.close()
+        self.__offered_ring = self.__ring_out = self.__ring_in = None
+
+    @Slot()
+    def stop_heartbeat(self) -> None:
+        """Cancel scheduled heartbeat check."""
+        if self.__heartbeat_handle is not None:
+            self.__wheel.cancel(self.__heartbeat_handle)
+            self.__heartbeat_handle = None
+
+    def __on_heartbeat(self) -> None:
+        self.__heartbeat_handle = None
+        heartbeat = self.__heartbeat
+        try:
+            if self.__socket.state() != QAbstractSocket.SocketState.ConnectedState:
+                return
+            if self.__reading_paused:
+                # nothing is read, peer may be alive
+                self.__last_read = monotonic()
+            idle = monotonic() - self.__last_read
+            if heartbeat.timeout and idle >= heartbeat.timeout:
+                self.logger.debug(f"Connection idle for {idle:.1f} seconds, aborting")
+                self.__timed_out = True
+                self.timeout.emit()
+                self.__socket.abort()
+                return
+            if heartbeat.ping:
+                self.write_control(CONTROL_PING, pack(TIMESTAMP, monotonic()))
+        except RuntimeError:
+            # socket was deleted
+            return
+        delay = heartbeat.interval
+        if heartbeat.timeout:
+            delay = min(delay, heartbeat.timeout - idle)
+        self.__heartbeat_handle = self.__wheel.schedule(delay, self.__on_heartbeat)
+
+
+class SocketDrainer(QObject):
+    """Gracefully closes sockets. Reading is stopped, queued data is flushed
+    and FIN is sent. Sockets which did not flush before deadline are aborted.
+
+    Must be created in the thread the sockets live in.
+
+    Args:
+        sockets (list): List of (QAbstractSocket, DataBuffer) tuples.
+        timeout (float): Deadline in seconds.
+    """
+
+    finished = Signal(int, int)
+
+    def __init__(self, sockets: list, timeout: float):
+        super(SocketDrainer, self).__init__()
+        self.__sockets = list(sockets)
+        self.__timeout = timeout
+        self.__remaining = set()
+        self.__done = False
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.__on_deadline)
+
+    @Slot()
+    def start(self):
+        """Start draining. Emits finished(dropped_bytes, aborted_sockets) when done."""
+        for socket, buffer in self.__sockets:
+            try:
+                if buffer is not None:
+                    buffer.stop_reading()
+                # sockets with nothing to flush disconnect synchronously
+                socket.disconnectFromHost()
+            except RuntimeError:
+                pass
+        for socket, buffer in self.__sockets:
+            if not self.__is_unconnected(socket):
+                self.__remaining.add(socket)
+                socket.disconnected.connect(self.__on_socket_disconnected)
+        if self.__remaining:
+            self.__timer.start(int(self.__timeout * 1000))
+        else:
+            self.__finish(0, 0)
+
+    @staticmethod
+    def __is_unconnected(socket) -> bool:
+        try:
+            return socket.state() == QAbstractSocket.SocketState.UnconnectedState
+        except RuntimeError:
+            return True
+
+    @Slot()
+    def __on_socket_disconnected(self):
+        self.__remaining.discard(self.sender())
+        if not self.__remaining and not self.__done:
+            self.__timer.stop()
+            self.__finish(0, 0)
+
+    @Slot()
+    def __on_deadline(self):
+        self.__done = True
+        dropped = 0
+        aborted = 0
+        for socket in list(self.__remaining):
+            try:
+                dropped += socket.bytesToWrite()
+                aborted += 1
+                socket.abort()
+            except RuntimeError:
+                pass
+        self.__remaining.clear()
+        self.__finish(dropped, aborted)
+
+    def __finish(self, dropped: int, aborted: int):
+        self.__done = True
+        self.__sockets.clear()
+        self.finished.emit(dropped, aborted)
@@ -6,3 +6,23 @@ class NotConnectedError(Exception):
 
 class ServerNotRunning(Exception):
     pass
+
+
+class IdleTimeoutError(Exception):
+    pass
+
+
+class DeliveryFailedError(Exception):
+    pass
+
+
+class RPCError(Exception):
+    pass
+
+
+class RPCTimeoutError(RPCError):
+    pass
+
+
+class QueueFullError(Exception):
+    pass
@@ -0,0 +1,128 @@
+"""Wire format shared by all transports. Does not depend on Qt, so it can be used by tools
+and processes which only encode or decode messages."""
+from struct import unpack, unpack_from, calcsize, pack
+
+HEADER = '!L'
+HEADER_SIZE = calcsize(HEADER)
+
+# highest bit of the size header marks control frames, first payload byte is control type
+CONTROL_FLAG = 0x80000000
+SIZE_MASK = 0x7FFFFFFF
+CONTROL = '!B'
+CONTROL_SIZE = calcsize(CONTROL)
+CONTROL_PING = 1
+CONTROL_PONG = 2
+CONTROL_STREAM = 3
+CONTROL_CREDIT = 4
+CONTROL_SHARED_OPEN = 5
+CONTROL_SHARED_ACK = 6
+CONTROL_SHARED_DATA = 7
+TIMESTAMP = '!d'
+
+# stream frames are control frames carrying stream ID and payload, stream 0 uses plain data frames
+STREAM = '!L'
+STREAM_SIZE = calcsize(STREAM)
+# credit frames carry stream ID and number of bytes the peer may send in addition
+CREDIT = '!LL'
+# bytes every stream may send before receiving credit
+STREAM_WINDOW = 65536
+
+# shared memory offers carry ring size followed by its name, peer answers with empty ack once attached,
+# then messages copied into the ring are announced by data frames carrying their size
+SHARED_OPEN = '!Q'
+SHARED_OPEN_SIZE = calcsize(SHARED_OPEN)
+SHARED_DATA = '!L'
+
+# packed datagrams carry several messages, each prefixed with its size
+DATAGRAM_HEADER = '!H'
+DATAGRAM_HEADER_SIZE = calcsize(DATAGRAM_HEADER)
+DEFAULT_MTU = 1400
+
+
+def pack_frame(data: bytes) -> bytes:
+    """Frame message the way DataBuffer.write() does."""
+    return pack(HEADER, len(data)) + data
+
+
+def pack_control_frame(control_type: int, body: bytes = b"") -> bytes:
+    """Frame control message the way DataBuffer.write_control() does."""
+    return pack(HEADER, (CONTROL_SIZE + len(body)) | CONTROL_FLAG) + pack(CONTROL, control_type) + body
+
+
+def unpack_frames(data: bytes) -> tuple:
+    """Split stream of frames into complete frames.
+
+    Args:
+        data (bytes): Data read from stream, starting at frame boundary.
+
+    Returns:
+        tuple: List of (control, payload) tuples, control is True for control frames whose payload
+            starts with control type, and bytes of incomplete frame left at the end.
+    """
+    frames = []
+    offset = 0
+    end = len(data)
+    while end - offset >= HEADER_SIZE:
+        size = unpack_from(HEADER, data, offset)[0]
+        frame_end = offset + HEADER_SIZE + (size & SIZE_MASK)
+        if frame_end > end:
+            break
+        frames.append((bool(size & CONTROL_FLAG), data[offset + HEADER_SIZE:frame_end]))
+        offset = frame_end
+    return frames, data[offset:]
+
+
+def pack_datagrams(messages: list, mtu: int = DEFAULT_MTU) -> list:
+    """Pack messages into as few datagrams as possible.
+
+    Messages keep their order. Message which does not fit into MTU on its own
+    is sent in a separate datagram.
+
+    Args:
+        messages (list): List of messages (bytes).
+        mtu (int): Maximum datagram payload size.
+
+    Returns:
+        list: List of datagrams (bytes).
+    """
+    datagrams = []
+    chunks = []
+    size = 0
+    for message in messages:
+        chunk = pack(DATAGRAM_HEADER, len(message)) + message
+        if chunks and size + len(chunk) > mtu:
+            datagrams.append(b"".join(chunks))
+            chunks = []
+            size = 0
+        chunks.append(chunk)
+        size += len(chunk)
+    if chunks:
+        datagrams.append(b"".join(chunks))
+    return datagrams
+
+
+def unpack_datagram(datagram: bytes) -> list:
+    """Split packed datagram into messages.
+
+    Args:
+        datagram (bytes): Datagram created by pack_datagrams.
+
+    Returns:
+        list: List of messages (bytes).
+
+    Raises:
+        ValueError: Datagram is truncated or malformed.
+    """
+    messages = []
+    offset = 0
+    end = len(datagram)
+    while offset < end:
+        if end - offset < DATAGRAM_HEADER_SIZE:
+            raise ValueError("Truncated datagram header")
+        size = unpack(DATAGRAM_HEADER, datagram[offset:offset + DATAGRAM_HEADER_SIZE])[0]
+        offset += DATAGRAM_HEADER_SIZE
+        if end - offset < size:
+            raise ValueError("Truncated datagram message")
+        messages.append(datagram[offset:offset + size])
+        offset += size
+    return messages
@@ -0,0 +1,45 @@
+"""Lazily loaded packages. Exported names are imported from their submodules on first use,
+so importing a package does not load Qt or modules which are never used."""
+from types import ModuleType
+
+import sys
+import importlib
+
+# package name -> exported name -> submodule
+_exports = {}
+
+
+class _LazyPackage(ModuleType):
+
+    def __getattr__(self, name):
+        submodule = _exports[self.__name__].get(name)
+        if submodule is None:
+            raise AttributeError(f"module {self.__name__!r} has no attribute {name!r}")
+        value = getattr(importlib.import_module(submodule, self.__name__), name)
+        ModuleType.__setattr__(self, name, value)
+        return value
+
+    def __setattr__(self, name, value):
+        # import system binds every loaded submodule to its package, exported object
+        # named like its submodule must not be replaced by the module
+        if isinstance(value, ModuleType) and name in _exports[self.__name__]:
+            return
+        ModuleType.__setattr__(self, name, value)
+
+    def __dir__(self):
+        return sorted(set(ModuleType.__dir__(self)) | set(_exports[self.__name__]))
+
+
+def attach(package: str, exports: dict) -> list:
+    """Load exported names of package on first use.
+
+    Args:
+        package (str): Name of the package, __name__ of its __init__.
+        exports (dict): Submodule (relative, like ".TCPServer") -> names it exports.
+
+    Returns:
+        list: Exported names, to be used as __all__.
+    """
+    _exports[package] = {name: submodule for submodule, names in exports.items() for name in names}
+    sys.modules[package].__class__ = _LazyPackage
+    return list(_exports[package])
@@ -0,0 +1,159 @@
+from .Histogram import merge_histograms
+
+COUNTERS = ("bytes_in", "bytes_out", "frames_in", "frames_out", "decode_errors")
+GAUGES = ("connections", "connections_total", "queued_bytes", "queued_messages")
+
+DISCONNECT_LOCAL = "local"
+DISCONNECT_REMOTE = "remote"
+DISCONNECT_IDLE_TIMEOUT = "idle_timeout"
+DISCONNECT_LOST = "lost"
+DISCONNECT_ERROR = "error"
+
+# values of workers which are not added up, the highest one is kept
+MAX_KEYS = frozenset(("loop_lag", "loop_lag_last", "loop_lag_max"))
+
+
+class Counters:
+    """Traffic counters of one connection.
+
+    Counters are plain integers updated only by the thread which owns the connection,
+    so they are incremented without locks. Other threads may read them at any time,
+    the values they see are at most a few frames behind.
+    """
+
+    __slots__ = COUNTERS
+
+    def __init__(self):
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.frames_in = 0
+        self.frames_out = 0
+        self.decode_errors = 0
+
+    def add(self, other: "Counters") -> None:
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.frames_in += other.frames_in
+        self.frames_out += other.frames_out
+        self.decode_errors += other.decode_errors
+
+    def as_dict(self) -> dict:
+        return {name: getattr(self, name) for name in COUNTERS}
+
+
+class ConnectionStats:
+    """Statistics of connections owned by one thread, for example balancer worker.
+
+    Counters of open connections are read from their Counters by snapshot(), counters
+    of closed connections are added up by remove(), so totals never go back.
+    Queue depths come from Qt sockets, which may be used only from their own thread,
+    so they are sampled by sample() in the owning thread and snapshot() returns the last sample.
+    """
+
+    __slots__ = ("closed", "disconnects", "opened", "queued_bytes", "queued_messages")
+
+    def __init__(self):
+        self.closed = Counters()
+        self.disconnects = {}
+        self.opened = 0
+        self.queued_bytes = 0
+        self.queued_messages = 0
+
+    def add(self) -> None:
+        """Count new connection."""
+        self.opened += 1
+
+    def remove(self, counters: Counters, reason: str) -> None:
+        """Keep counters of closed connection.
+
+        Args:
+            counters (Counters): Counters of the connection.
+            reason (str): Disconnect reason, one of DISCONNECT_* constants.
+        """
+        self.closed.add(counters)
+        self.disconnects[reason] = self.disconnects.get(reason, 0) + 1
+
+    def merge(self, other: "ConnectionStats") -> None:
+        """Add counters of closed connections and disconnects of other statistics."""
+        self.closed.add(other.closed)
+        self.opened += other.opened
+        for reason, count in list(other.disconnects.items()):
+            self.disconnects[reason] = self.disconnects.get(reason, 0) + count
+
+    def sample(self, buffers) -> None:
+        """Sample queue depths of connections. Must be called from the owning thread.
+
+        Args:
+            buffers (iterable): DataBuffer of every open connection.
+        """
+        queued_bytes = 0
+        queued_messages = 0
+        for buffer in buffers:
+            queued_bytes += buffer.queued_bytes()
+            queued_messages += buffer.queued_messages()
+        self.queued_bytes = queued_bytes
+        self.queued_messages = queued_messages
+
+    def snapshot(self, counters: dict, per_client: bool = False) -> dict:
+        """Current statistics. Safe to call from any thread.
+
+        Args:
+            counters (dict): Client ID -> Counters of every open connection.
+            per_client (bool): Include counters of every open connection as clients.
+
+        Returns:
+            dict: Counters summed over open and closed connections, connections (open),
+                connections_total (ever opened), queued_bytes, queued_messages
+                and disconnects (reason -> count).
+        """
+        total = Counters()
+        total.add(self.closed)
+        for connection in counters.values():
+            total.add(connection)
+        result = total.as_dict()
+        result["connections"] = len(counters)
+        result["connections_total"] = self.opened
+        result["queued_bytes"] = self.queued_bytes
+        result["queued_messages"] = self.queued_messages
+        result["disconnects"] = dict(self.disconnects)
+        if per_client:
+            result["clients"] = {client_id: connection.as_dict() for client_id, connection in counters.items()}
+        return result
+
+
+def merge_stats(workers: list) -> dict:
+    """Sum statistics of workers.
+
+    Args:
+        workers (list): Snapshots of every worker, each with worker key naming it.
+
+    Returns:
+        dict: Sums of numeric values and disconnects, maximum of lags, lag histograms added up,
+            clients of all workers merged and list of worker snapshots (without clients) as workers.
+    """
+    result = dict.fromkeys(COUNTERS + GAUGES, 0)
+    disconnects = {}
+    clients = None
+    histograms = []
+    for worker in workers:
+        for key, value in worker.items():
+            if key == "disconnects":
+                for reason, count in value.items():
+                    disconnects[reason] = disconnects.get(reason, 0) + count
+            elif key == "clients":
+                clients = clients if clients is not None else {}
+                clients.update(value)
+            elif key == "loop_lag_seconds":
+                histograms.append(value)
+            elif key in MAX_KEYS:
+                result[key] = max(result.get(key, 0), value)
+            elif key != "worker" and isinstance(value, (int, float)) and not isinstance(value, bool):
+                result[key] = result.get(key, 0) + value
+        worker.pop("clients", None)
+    result["disconnects"] = disconnects
+    if histograms:
+        result["loop_lag_seconds"] = merge_histograms(histograms)
+    result["workers"] = workers
+    if clients is not None:
+        result["clients"] = clients
+    return result
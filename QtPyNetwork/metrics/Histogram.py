@@ -0,0 +1,48 @@
+from bisect import bisect_left
+
+# upper bounds of histogram buckets in seconds, the last bucket is unbounded
+LAG_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+# finer buckets for message processing stages, which take microseconds when all goes well
+LATENCY_BUCKETS = (0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005) + LAG_BUCKETS
+
+
+class LagHistogram:
+    """Histogram of durations in seconds with fixed buckets.
+
+    Args:
+        bounds (tuple): Sorted upper bounds of buckets, the last bucket is unbounded.
+    """
+
+    __slots__ = ("bounds", "counts", "count", "sum")
+
+    def __init__(self, bounds: tuple = LAG_BUCKETS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def as_dict(self) -> dict:
+        """Cumulative bucket counts by upper bound (inf for the last one), count and sum,
+        the shape Prometheus histograms use."""
+        buckets = {}
+        total = 0
+        for bound, count in zip(self.bounds + (float("inf"),), list(self.counts)):
+            total += count
+            buckets[bound] = total
+        return {"buckets": buckets, "count": self.count, "sum": round(self.sum, 9)}
+
+
+def merge_histograms(histograms: list) -> dict:
+    """Add up histograms returned by LagHistogram.as_dict()."""
+    result = {"buckets": {}, "count": 0, "sum": 0.0}
+    for histogram in histograms:
+        for bound, count in histogram["buckets"].items():
+            result["buckets"][bound] = result["buckets"].get(bound, 0) + count
+        result["count"] += histogram["count"]
+        result["sum"] += histogram["sum"]
+    return result
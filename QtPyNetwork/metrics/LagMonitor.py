@@ -0,0 +1,93 @@
+from qtpy.QtCore import QObject, QTimer, Qt, Signal, Slot
+
+from time import monotonic
+
+from QtPyNetwork.perthread import PerThread
+from .Histogram import LagHistogram
+
+# weight of the newest probe in smoothed lag
+SMOOTHING = 0.25
+
+# finished is emitted by the thread itself, timer can be stopped before monitor is deleted from other thread
+_monitors = PerThread(lambda monitor: monitor.stop())
+
+
+class LagMonitor(QObject):
+    """Measures event loop lag of the thread it lives in.
+
+    Probe timer is started every interval, the time it fires late is the time the event loop
+    was busy with other events. Every probe is recorded in a histogram and in smoothed lag,
+    and probed signal is emitted with it. Probes run as long as the thread runs.
+
+    Monitor must be used only from the thread it was created in, except snapshot() and lag().
+    Use LagMonitor.instance() to get the monitor of the current thread.
+
+    Args:
+        interval (float): Seconds between probes.
+    """
+
+    probed = Signal(float)
+
+    def __init__(self, interval: float = 0.1):
+        super(LagMonitor, self).__init__()
+        self.__interval = interval
+        self.__histogram = LagHistogram()
+        self.__lag = 0.0
+        self.__last = 0.0
+        self.__max = 0.0
+        self.__expected = 0.0
+
+        self.__timer = QTimer(self)
+        self.__timer.setTimerType(Qt.PreciseTimer)
+        self.__timer.setSingleShot(True)
+        self.__timer.timeout.connect(self.__on_timer_timeout)
+
+    @staticmethod
+    def instance(interval: float = 0.1) -> "LagMonitor":
+        """Get started lag monitor of the current thread. Monitor is created on first use.
+
+        Args:
+            interval (float): Seconds between probes. Every interval has its own monitor.
+        """
+        return _monitors.get(interval, lambda: LagMonitor.__create(interval))
+
+    @staticmethod
+    def __create(interval: float) -> "LagMonitor":
+        monitor = LagMonitor(interval)
+        monitor.start()
+        return monitor
+
+    def interval(self) -> float:
+        return self.__interval
+
+    @Slot()
+    def start(self) -> None:
+        self.__schedule()
+
+    @Slot()
+    def stop(self) -> None:
+        self.__timer.stop()
+
+    def __schedule(self) -> None:
+        self.__expected = monotonic() + self.__interval
+        self.__timer.start(int(self.__interval * 1000))
+
+    @Slot()
+    def __on_timer_timeout(self):
+        lag = max(0.0, monotonic() - self.__expected)
+        self.__schedule()
+        self.__histogram.observe(lag)
+        self.__last = lag
+        self.__max = max(self.__max, lag)
+        self.__lag += (lag - self.__lag) * SMOOTHING
+        self.probed.emit(lag)
+
+    def lag(self) -> float:
+        """Smoothed event loop lag in seconds. May be read from any thread."""
+        return self.__lag
+
+    def snapshot(self) -> dict:
+        """Smoothed (loop_lag), last (loop_lag_last) and maximum lag (loop_lag_max) in seconds
+        and histogram of all probes (loop_lag_seconds). Safe to call from any thread."""
+        return {"loop_lag": round(self.__lag, 6), "loop_lag_last": round(self.__last, 6),
+                "loop_lag_max": round(self.__max, 6), "loop_lag_seconds": self.__histogram.as_dict()}
@@ -0,0 +1,188 @@
+from qtpy.QtCore import QObject, Slot
+from qtpy.QtNetwork import QTcpServer, QHostAddress, QAbstractSocket
+
+import logging
+
+from QtPyNetwork import common
+from .Counters import COUNTERS
+
+# values which only grow are exported as Prometheus counters, everything else as gauges
+COUNTER_KEYS = frozenset(COUNTERS + ("connections_total", "disconnects", "rejected", "attempts",
+                                     "successes", "failures", "shed", "traces"))
+MAX_REQUEST_SIZE = 8192
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _collect(families: dict, prefix: str, stats: dict, labels: dict) -> None:
+    for key, value in stats.items():
+        if key in ("worker", "workers", "clients") or value is None:
+            continue
+        if key == "disconnects":
+            for reason, count in value.items():
+                _sample(families, prefix, key, count, dict(labels, reason=reason))
+        elif isinstance(value, dict) and "buckets" in value:
+            _histogram(families, f"{prefix}_{key}", value, labels)
+        elif isinstance(value, dict):
+            _collect(families, f"{prefix}_{key}", value, labels)
+        elif isinstance(value, (int, float)):
+            _sample(families, prefix, key, value, labels)
+
+
+def _sample(families: dict, prefix: str, key: str, value, labels: dict) -> None:
+    counter = key in COUNTER_KEYS
+    name = f"{prefix}_{key}"
+    if counter and not name.endswith("_total"):
+        name += "_total"
+    families.setdefault(name, ("counter" if counter else "gauge", []))[1].append((name, labels, value))
+
+
+def _histogram(families: dict, name: str, histogram: dict, labels: dict) -> None:
+    samples = families.setdefault(name, ("histogram", []))[1]
+    for bound, count in histogram["buckets"].items():
+        samples.append((f"{name}_bucket", dict(labels, le="+Inf" if bound == float("inf") else bound), count))
+    samples.append((f"{name}_sum", labels, histogram["sum"]))
+    samples.append((f"{name}_count", labels, histogram["count"]))
+
+
+def render_prometheus(sources: dict, prefix: str = "qtpynetwork") -> str:
+    """Render statistics in Prometheus text exposition format.
+
+    Numeric values become metrics named prefix_key labeled with source name, nested dictionaries
+    are flattened into prefix_key_subkey and lag histograms exported as histograms. Per-worker values are exported as prefix_worker_key
+    metrics with worker label, so they do not add up with the totals. Per-client values are not
+    exported, there may be too many of them.
+
+    Args:
+        sources (dict): Source name -> statistics returned by stats().
+        prefix (str): Metric name prefix.
+
+    Returns:
+        str: Metrics.
+    """
+    families = {}
+    for source, stats in sources.items():
+        labels = {"source": source}
+        _collect(families, prefix, stats, labels)
+        for worker in stats.get("workers", ()):
+            _collect(families, f"{prefix}_worker", worker, dict(labels, worker=worker.get("worker", "")))
+    lines = []
+    for family, (kind, samples) in families.items():
+        lines.append(f"# TYPE {family} {kind}")
+        for name, labels, value in samples:
+            label_text = ",".join(f'{key}="{_escape(value)}"' for key, value in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value!r}" if isinstance(value, float)
+                         else f"{name}{{{label_text}}} {int(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class MetricsServer(QObject):
+    """Tiny HTTP server exposing statistics of servers and clients in Prometheus text format.
+
+    Statistics are collected when metrics are scraped, by calling stats() of every source
+    in the thread of MetricsServer. Every path except /metrics is answered with 404.
+
+    Example:
+        metrics = MetricsServer()
+        metrics.add_source("server", server)
+        metrics.start("127.0.0.1", 9464)
+
+    Args:
+        prefix (str): Metric name prefix.
+    """
+
+    def __init__(self, prefix: str = "qtpynetwork"):
+        super(MetricsServer, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__prefix = prefix
+        self.__sources = {}
+        self.__requests = {}
+        self.__server = QTcpServer(self)
+        self.__server.newConnection.connect(self.__on_new_connection)
+
+    def add_source(self, name: str, source) -> None:
+        """Add object to collect statistics from.
+
+        Args:
+            name (str): Value of source label.
+            source: Object with stats() method or callable returning statistics.
+        """
+        self.__sources[name] = source
+
+    def remove_source(self, name: str) -> None:
+        self.__sources.pop(name, None)
+
+    def render(self) -> str:
+        """Collect statistics of all sources and render them."""
+        collected = {}
+        for name, source in list(self.__sources.items()):
+            try:
+                collected[name] = source.stats() if hasattr(source, "stats") else source()
+            except Exception as e:
+                self.logger.error(f"Could not collect statistics of {name}: {e}")
+        return render_prometheus(collected, self.__prefix)
+
+    @Slot(str, int)
+    def start(self, ip: str = "127.0.0.1", port: int = 9464) -> bool:
+        """Start listening. Returns False if address could not be bound."""
+        if not self.__server.listen(QHostAddress(ip), port):
+            self.logger.error(f"Could not listen on {ip}:{port}: {self.__server.errorString()}")
+            return False
+        return True
+
+    @Slot()
+    def port(self) -> int:
+        return self.__server.serverPort()
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.__server.isListening()
+
+    @Slot()
+    def close(self) -> None:
+        self.__server.close()
+        for socket in list(self.__requests):
+            socket.abort()
+        self.__requests.clear()
+
+    @Slot()
+    def __on_new_connection(self):
+        while self.__server.hasPendingConnections():
+            socket = self.__server.nextPendingConnection()
+            self.__requests[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self.__on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.__drop(socket))
+
+    def __on_ready_read(self, socket: QAbstractSocket):
+        if socket not in self.__requests:
+            return
+        request = self.__requests[socket] + bytes(socket.readAll())
+        if b"\r\n\r\n" not in request and b"\n\n" not in request:
+            if len(request) > MAX_REQUEST_SIZE:
+                self.__respond(socket, "413 Payload Too Large", b"")
+            else:
+                self.__requests[socket] = request
+            return
+        parts = request.split(b"\n", 1)[0].split()
+        if len(parts) < 2 or parts[0] not in (b"GET", b"HEAD"):
+            self.__respond(socket, "405 Method Not Allowed", b"")
+        elif parts[1].split(b"?", 1)[0] != b"/metrics":
+            self.__respond(socket, "404 Not Found", b"")
+        else:
+            body = self.render().encode()
+            self.__respond(socket, "200 OK", b"" if parts[0] == b"HEAD" else body, len(body))
+
+    def __respond(self, socket: QAbstractSocket, status: str, body: bytes, length: int = None):
+        del self.__requests[socket]
+        header = (f"HTTP/1.0 {status}\r\nContent-Type: {CONTENT_TYPE}\r\n"
+                  f"Content-Length: {len(body) if length is None else length}\r\nConnection: close\r\n\r\n")
+        socket.write(header.encode() + body)
+        socket.disconnectFromHost()
+
+    def __drop(self, socket: QAbstractSocket):
+        self.__requests.pop(socket, None)
+        # socket is still emitting disconnected
+        common.delete_later(socket)
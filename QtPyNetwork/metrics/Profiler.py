@@ -0,0 +1,322 @@
+from qtpy.QtCore import QObject, Signal, Slot
+from qtpy.QtNetwork import QLocalServer, QLocalSocket
+
+import os
+import sys
+import time
+import ctypes
+import cProfile
+import logging
+import threading
+
+from QtPyNetwork import common
+
+PROFILE_CPROFILE = "cprofile"
+PROFILE_SAMPLING = "sampling"
+
+MODES = (PROFILE_CPROFILE, PROFILE_SAMPLING)
+EXTENSIONS = {PROFILE_CPROFILE: "pstats", PROFILE_SAMPLING: "collapsed"}
+MAX_COMMAND_SIZE = 1024
+
+
+def _pin_thread_state() -> int:
+    """Keep Python thread state of the current thread until _unpin_thread_state() is called.
+
+    PyQt creates a new thread state for every call into Python from a QThread which does not run
+    Python code and drops it afterwards, taking profile function with it. Holding one more
+    GIL state reference keeps the thread state, so profiler stays enabled between slot calls.
+    """
+    return ctypes.pythonapi.PyGILState_Ensure()
+
+
+def _unpin_thread_state(state: int) -> None:
+    ctypes.pythonapi.PyGILState_Release(state)
+
+
+class _Sampler(threading.Thread):
+    """Samples Python stack of one thread and counts collapsed stacks.
+    Samples taken while the thread waits in Qt event loop have no Python frames and are counted as idle."""
+
+    def __init__(self, ident: int, interval: float):
+        super(_Sampler, self).__init__(name=f"Sampler-{ident}", daemon=True)
+        self.target = ident
+        self.interval = interval
+        self.stacks = {}
+        self.samples = 0
+        self.idle = 0
+        self.__stop = threading.Event()
+
+    def run(self):
+        labels = {}
+        while not self.__stop.wait(self.interval):
+            self.samples += 1
+            frame = sys._current_frames().get(self.target)
+            if frame is None:
+                self.idle += 1
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                label = labels.get(code)
+                if label is None:
+                    label = labels[code] = (f"{code.co_name} "
+                                            f"({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                stack.append(label)
+                frame = frame.f_back
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+
+    def stop(self):
+        self.__stop.set()
+        self.join()
+
+    def dump(self, path: str):
+        """Write stacks in collapsed format used by flame graph tools, one stack and its count per line."""
+        with open(path, "w") as file:
+            for stack, count in sorted(self.stacks.items()):
+                file.write(f"{stack} {count}\n")
+
+
+class _ThreadProfiler(QObject):
+    """Runs profiler in the thread it was moved to."""
+    start_signal = Signal(str, float)
+    stop_signal = Signal(str)
+
+    finished = Signal(str, str)
+    failed = Signal(str, str)
+
+    def __init__(self, name: str):
+        super(_ThreadProfiler, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.setObjectName(name)
+        self.__profile = None
+        self.__sampler = None
+        self.__state = None
+        self.start_signal.connect(self.__on_start_signal)
+        self.stop_signal.connect(self.__on_stop_signal)
+
+    @Slot(str, float)
+    def __on_start_signal(self, mode: str, interval: float):
+        try:
+            if mode == PROFILE_CPROFILE:
+                self.__state = _pin_thread_state()
+                self.__profile = cProfile.Profile()
+                self.__profile.enable()
+            else:
+                self.__sampler = _Sampler(threading.get_ident(), interval)
+                self.__sampler.start()
+        except Exception as e:
+            self.failed.emit(self.objectName(), str(e))
+
+    @Slot(str)
+    def __on_stop_signal(self, path: str):
+        try:
+            if self.__profile is not None:
+                self.__profile.disable()
+                _unpin_thread_state(self.__state)
+                self.__profile.dump_stats(path)
+            elif self.__sampler is not None:
+                self.__sampler.stop()
+                self.__sampler.dump(path)
+                self.logger.debug(f"Thread {self.objectName()}: {self.__sampler.samples} samples, "
+                                  f"{self.__sampler.idle} idle")
+            self.finished.emit(self.objectName(), path)
+        except Exception as e:
+            self.failed.emit(self.objectName(), str(e))
+        finally:
+            self.__profile = None
+            self.__sampler = None
+            self.__state = None
+            common.delete_later(self)
+
+
+class Profiler(QObject):
+    """Turns profilers on and off for single threads of a running process.
+
+    Threads are named like balancer workers, the thread Profiler lives in is main. Two modes are available:
+
+        - PROFILE_CPROFILE: deterministic cProfile of every Python call in the thread, dumped as pstats file.
+        - PROFILE_SAMPLING: stack of the thread is sampled every interval by a helper thread,
+          which costs the profiled thread almost nothing. Dumped as collapsed stacks for flame graphs.
+
+    Profilers are controlled with start() and stop() slots, which may be connected to signals,
+    or through local admin socket opened by listen(). Admin socket accepts line commands
+    and answers each with line starting with ok or error:
+
+        - threads: names of threads which can be profiled.
+        - start <thread> [cprofile|sampling] [interval]: start profiler.
+        - stop <thread>: stop profiler, answered with path of the dump once it is written.
+
+    Example:
+        profiler = Profiler("/tmp/profiles", balancer)
+        profiler.listen("myserver-profiler")
+        # echo "start 0 sampling" | nc -U /tmp/myserver-profiler
+
+    Args:
+        directory (str): Directory dumps are written to.
+        threads: Balancer or other object with threads() method returning name -> QThread,
+            or dict of them. Looked up on every start, so threads started later can be profiled.
+    """
+
+    started = Signal(str, str)
+    finished = Signal(str, str)
+    failed = Signal(str, str)
+
+    def __init__(self, directory: str = ".", threads=None):
+        super(Profiler, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__directory = directory
+        self.__threads = threads
+        self.__profilers = {}
+        self.__waiting = {}
+        self.__commands = {}
+        self.__server = None
+
+    def threads(self) -> dict:
+        """Threads which can be profiled by name."""
+        threads = {"main": self.thread()}
+        if hasattr(self.__threads, "threads"):
+            threads.update(self.__threads.threads())
+        elif self.__threads is not None:
+            threads.update(self.__threads)
+        return threads
+
+    @Slot()
+    def profiling(self) -> dict:
+        """Names of threads being profiled and their profiler modes."""
+        return {name: mode for name, (profiler, mode) in self.__profilers.items()}
+
+    @Slot(str)
+    @Slot(str, str)
+    @Slot(str, str, float)
+    def start(self, thread: str = "main", mode: str = PROFILE_CPROFILE, interval: float = 0.005) -> bool:
+        """Start profiling thread.
+
+        Args:
+            thread (str): Thread name, see threads().
+            mode (str): PROFILE_CPROFILE or PROFILE_SAMPLING.
+            interval (float): Seconds between samples of PROFILE_SAMPLING.
+
+        Returns:
+            bool: False if thread does not exist, is already profiled or mode is unknown.
+        """
+        qthread = self.threads().get(thread)
+        if qthread is None or thread in self.__profilers or mode not in MODES or interval <= 0:
+            self.logger.error(f"Could not start {mode} profiler of thread {thread}")
+            return False
+        profiler = _ThreadProfiler(thread)
+        profiler.finished.connect(self.__on_profiler_finished)
+        profiler.failed.connect(self.__on_profiler_failed)
+        if qthread is not profiler.thread():
+            profiler.moveToThread(qthread)
+        self.__profilers[thread] = (profiler, mode)
+        profiler.start_signal.emit(mode, interval)
+        self.started.emit(thread, mode)
+        return True
+
+    @Slot(str)
+    def stop(self, thread: str = "main") -> bool:
+        """Stop profiling thread. Profile is dumped by the thread, finished signal is emitted with its path.
+
+        Returns:
+            bool: False if thread is not profiled.
+        """
+        if thread not in self.__profilers:
+            return False
+        profiler, mode = self.__profilers[thread]
+        name = f"profile-{thread}-{time.strftime('%Y%m%d-%H%M%S')}.{EXTENSIONS[mode]}"
+        profiler.stop_signal.emit(os.path.join(self.__directory, name))
+        return True
+
+    @Slot(str, str)
+    def __on_profiler_finished(self, thread: str, path: str):
+        self.__profilers.pop(thread, None)
+        self.logger.info(f"Profile of thread {thread} written to {path}")
+        self.__answer(thread, f"ok {path}")
+        self.finished.emit(thread, path)
+
+    @Slot(str, str)
+    def __on_profiler_failed(self, thread: str, error: str):
+        self.__profilers.pop(thread, None)
+        self.logger.error(f"Profiler of thread {thread} failed: {error}")
+        self.__answer(thread, f"error {error}")
+        self.failed.emit(thread, error)
+
+    @Slot(str)
+    def listen(self, name: str) -> bool:
+        """Open local admin socket. Returns False if it could not be opened."""
+        self.__server = QLocalServer(self)
+        self.__server.newConnection.connect(self.__on_new_connection)
+        if not self.__server.listen(name):
+            QLocalServer.removeServer(name)
+            if not self.__server.listen(name):
+                self.logger.error(f"Could not listen on {name}: {self.__server.errorString()}")
+                return False
+        return True
+
+    @Slot()
+    def close(self) -> None:
+        """Close admin socket. Running profilers are stopped."""
+        for thread in list(self.__profilers):
+            self.stop(thread)
+        if self.__server is not None:
+            self.__server.close()
+            self.__server = None
+        for socket in list(self.__commands):
+            socket.abort()
+        self.__commands.clear()
+        self.__waiting.clear()
+
+    @Slot()
+    def __on_new_connection(self):
+        while self.__server.hasPendingConnections():
+            socket = self.__server.nextPendingConnection()
+            self.__commands[socket] = b""
+            socket.readyRead.connect(lambda socket=socket: self.__on_ready_read(socket))
+            socket.disconnected.connect(lambda socket=socket: self.__drop(socket))
+
+    def __on_ready_read(self, socket: QLocalSocket):
+        if socket not in self.__commands:
+            return
+        data = self.__commands[socket] + bytes(socket.readAll())
+        *lines, data = data.split(b"\n")
+        if len(data) > MAX_COMMAND_SIZE:
+            socket.write(b"error command too long\n")
+            socket.disconnectFromServer()
+            return
+        self.__commands[socket] = data
+        for line in lines:
+            answer = self.__command(socket, line.decode(errors="replace").split())
+            if answer is not None:
+                socket.write(answer.encode() + b"\n")
+
+    def __command(self, socket: QLocalSocket, command: list):
+        if not command:
+            return None
+        if command[0] == "threads":
+            return "ok " + " ".join(self.threads())
+        if command[0] == "start" and 2 <= len(command) <= 4:
+            try:
+                interval = float(command[3]) if len(command) > 3 else 0.005
+            except ValueError:
+                return "error invalid interval"
+            mode = command[2] if len(command) > 2 else PROFILE_CPROFILE
+            return "ok" if self.start(command[1], mode, interval) else "error could not start profiler"
+        if command[0] == "stop" and len(command) == 2:
+            if not self.stop(command[1]):
+                return "error thread is not profiled"
+            self.__waiting.setdefault(command[1], []).append(socket)
+            return None
+        return "error unknown command"
+
+    def __answer(self, thread: str, answer: str):
+        for socket in self.__waiting.pop(thread, []):
+            if socket in self.__commands:
+                socket.write(answer.encode() + b"\n")
+
+    def __drop(self, socket: QLocalSocket):
+        self.__commands.pop(socket, None)
+        for sockets in self.__waiting.values():
+            if socket in sockets:
+                sockets.remove(socket)
+        common.delete_later(socket)
@@ -0,0 +1,221 @@
+from collections import deque
+from time import monotonic
+
+import logging
+
+from .Histogram import LagHistogram, LATENCY_BUCKETS
+
+TRACE_RECEIVE = "receive"
+TRACE_WRITE = "write"
+
+# stage name -> (start stamp, end stamp)
+STAGES = {
+    TRACE_RECEIVE: (
+        ("read", ("read", "decoded")),
+        ("enqueue", ("decoded", "enqueued")),
+        ("hop", ("enqueued", "dispatched")),
+        ("handler", ("dispatched", "handled")),
+        ("receive_total", ("read", "handled")),
+    ),
+    TRACE_WRITE: (
+        ("write_hop", ("written", "received")),
+        ("flush", ("received", "flushed")),
+        ("write_total", ("written", "flushed")),
+    ),
+}
+
+
+class Trace:
+    """Timestamps of one sampled message, in seconds of time.monotonic().
+
+    Received messages are stamped when socket read started (read), frame was decoded (decoded),
+    handed over to the server's thread (enqueued), dispatched to the server (dispatched) and when
+    on_message returned (handled). Written messages are stamped when write was called (written),
+    reached the worker thread (received) and were written and flushed to socket (flushed).
+    """
+
+    __slots__ = ("kind", "client_id", "worker", "stamps")
+
+    def __init__(self, kind: str, client_id: int, worker: str, stamps: dict):
+        self.kind = kind
+        self.client_id = client_id
+        self.worker = worker
+        self.stamps = stamps
+
+    def stages(self) -> dict:
+        """Stage name -> duration in seconds."""
+        stamps = self.stamps
+        return {stage: stamps[end] - stamps[start] for stage, (start, end) in STAGES[self.kind]
+                if start in stamps and end in stamps}
+
+    def as_dict(self) -> dict:
+        return {"kind": self.kind, "client_id": self.client_id, "worker": self.worker,
+                "stamps": dict(self.stamps), "stages": self.stages()}
+
+
+class Tracer:
+    """Measures latency of message processing stages on sampled messages.
+
+    Every sample_every-th message of every connection is traced, other messages pass through
+    untouched. Completed traces feed latency histograms per stage and per worker and are passed
+    to hooks, which may export them. Messages are matched across threads by their order, which
+    Qt queued connections keep, so traces never travel with the messages.
+
+    Tracing is enabled by AbstractServer.set_tracer(). Without tracer, received messages take
+    no extra steps and written messages cost one attribute check.
+
+    All methods except wrap_receive(), write_received() and write_flushed() must be called
+    from the server's thread, hooks are called from it as well.
+
+    Args:
+        sample_every (int): Trace every n-th message of a connection.
+    """
+
+    def __init__(self, sample_every: int = 100):
+        if sample_every < 1:
+            raise ValueError("Sample interval must be at least 1")
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__sample_every = sample_every
+        self.__hooks = []
+        self.__histograms = {}
+        self.__worker_histograms = {}
+        self.__traces = 0
+        # traces waiting for the other thread, by client ID
+        self.__pending_received = {}
+        self.__pending_written = {}
+        # messages counted by server thread and by worker threads, by client ID
+        self.__dispatched = {}
+        self.__written = {}
+        self.__received = {}
+        # write traces completed in worker threads
+        self.__completed = deque()
+
+    def sample_every(self) -> int:
+        return self.__sample_every
+
+    def add_hook(self, hook) -> None:
+        """Call hook with every completed Trace."""
+        self.__hooks.append(hook)
+
+    def remove_hook(self, hook) -> None:
+        self.__hooks.remove(hook)
+
+    def wrap_receive(self, emit, client_id: int, worker: str, buffer):
+        """Wrap function delivering received messages of connection to the server's thread.
+        Called in the worker thread when connection is set up.
+
+        Args:
+            emit (callable): Function called with client ID and message.
+            client_id (int): Client ID.
+            worker (str): Worker name.
+            buffer (DataBuffer): Buffer of the connection.
+
+        Returns:
+            callable: Function called with message instead of emit.
+        """
+        sample_every = self.__sample_every
+        pending = self.__pending_received.setdefault(client_id, deque())
+        count = 0
+
+        def receive(data: bytes):
+            nonlocal count
+            count += 1
+            if count % sample_every:
+                emit(client_id, data)
+                return
+            decoded = monotonic()
+            trace = Trace(TRACE_RECEIVE, client_id, worker, {"read": buffer.read_time(), "decoded": decoded})
+            # trace must be waiting before message arrives
+            pending.append(trace)
+            trace.stamps["enqueued"] = monotonic()
+            emit(client_id, data)
+        return receive
+
+    def dispatched(self, client_id: int) -> Trace:
+        """Count message received by server. Returns its trace if it was sampled."""
+        count = self.__dispatched.get(client_id, 0) + 1
+        self.__dispatched[client_id] = count
+        if count % self.__sample_every:
+            return None
+        pending = self.__pending_received.get(client_id)
+        if not pending:
+            return None
+        trace = pending.popleft()
+        trace.stamps["dispatched"] = monotonic()
+        return trace
+
+    def handled(self, trace: Trace) -> None:
+        """Complete trace of received message after server handled it."""
+        trace.stamps["handled"] = monotonic()
+        self.__complete(trace)
+
+    def write(self, client_id: int, worker: str) -> None:
+        """Count message written by server, before it is handed over to worker thread."""
+        count = self.__written.get(client_id, 0) + 1
+        self.__written[client_id] = count
+        if not count % self.__sample_every:
+            trace = Trace(TRACE_WRITE, client_id, worker, {"written": monotonic()})
+            self.__pending_written.setdefault(client_id, deque()).append(trace)
+
+    def write_received(self, client_id: int) -> Trace:
+        """Count written message reaching worker thread. Returns its trace if it was sampled."""
+        count = self.__received.get(client_id, 0) + 1
+        self.__received[client_id] = count
+        if count % self.__sample_every:
+            return None
+        pending = self.__pending_written.get(client_id)
+        if not pending:
+            return None
+        trace = pending.popleft()
+        trace.stamps["received"] = monotonic()
+        return trace
+
+    def write_flushed(self, trace: Trace) -> None:
+        """Complete trace of written message after it was flushed. Called in worker thread."""
+        trace.stamps["flushed"] = monotonic()
+        self.__completed.append(trace)
+
+    def forget(self, client_id: int) -> None:
+        """Drop state of disconnected client."""
+        self.__pending_received.pop(client_id, None)
+        self.__pending_written.pop(client_id, None)
+        self.__dispatched.pop(client_id, None)
+        self.__written.pop(client_id, None)
+        self.__received.pop(client_id, None)
+
+    def __complete(self, trace: Trace) -> None:
+        completed = self.__completed
+        while completed:
+            self.__record(completed.popleft())
+        self.__record(trace)
+
+    def __record(self, trace: Trace) -> None:
+        self.__traces += 1
+        worker_histograms = self.__worker_histograms.setdefault(trace.worker, {})
+        for stage, duration in trace.stages().items():
+            for histograms in (self.__histograms, worker_histograms):
+                histogram = histograms.get(stage)
+                if histogram is None:
+                    histogram = histograms[stage] = LagHistogram(LATENCY_BUCKETS)
+                histogram.observe(duration)
+        for hook in self.__hooks:
+            try:
+                hook(trace)
+            except Exception as e:
+                self.logger.error(f"Trace hook failed: {e}")
+
+    def stats(self) -> dict:
+        """Number of completed traces (traces) and histogram of every stage as latency_<stage>_seconds,
+        workers holds the same histograms of every worker."""
+        completed = self.__completed
+        while completed:
+            self.__record(completed.popleft())
+        stats = {"traces": self.__traces}
+        stats.update(self.__histogram_dicts(self.__histograms))
+        stats["workers"] = [dict(self.__histogram_dicts(histograms), worker=worker)
+                            for worker, histograms in self.__worker_histograms.items()]
+        return stats
+
+    @staticmethod
+    def __histogram_dicts(histograms: dict) -> dict:
+        return {f"latency_{stage}_seconds": histogram.as_dict() for stage, histogram in histograms.items()}
@@ -0,0 +1,11 @@
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".Counters": ("Counters", "ConnectionStats", "merge_stats", "COUNTERS", "DISCONNECT_LOCAL", "DISCONNECT_REMOTE",
+                  "DISCONNECT_IDLE_TIMEOUT", "DISCONNECT_LOST", "DISCONNECT_ERROR"),
+    ".Histogram": ("LagHistogram", "LAG_BUCKETS", "LATENCY_BUCKETS", "merge_histograms"),
+    ".LagMonitor": ("LagMonitor",),
+    ".MetricsServer": ("MetricsServer", "render_prometheus"),
+    ".Tracer": ("Tracer", "Trace", "TRACE_RECEIVE", "TRACE_WRITE"),
+    ".Profiler": ("Profiler", "PROFILE_CPROFILE", "PROFILE_SAMPLING"),
+})
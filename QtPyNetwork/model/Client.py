@@ -1,57 +1,86 @@
-from qtpy.QtCore import QObject, Slot, Signal
+from qtpy.QtCore import QObject, Signal
 
 import ipaddress
 
-from QtPyNetwork.exception import NotConnectedError
 
+class ClientSignals(QObject):
+    """Per-client signals. Created only when Client.signals() is called."""
 
-class Client(QObject):
-    """Represents psychical device connected to server."""
+    message = Signal(bytes)
+    stream_message = Signal(int, bytes)
+    disconnected = Signal()
+    error = Signal(Exception)
 
-    def __init__(self, server, device_id: int, ip: str, port: int):
-        super(Client, self).__init__(None)
-        try:
-            ipaddress.ip_address(ip)
-        except ValueError:
-            raise ValueError("Device's IP address is not valid!")
 
-        if not 1 <= port <= 65535:
-            raise ValueError("Port must be in range 1, 65535")
+class Client:
+    """Represents psychical device connected to server.
+
+    Client is a plain object with __slots__ to keep connection setup cheap.
+    Per-client Qt signals are available via signals(), which creates
+    the QObject on first use. IP address is parsed only when ip_address() is called.
+    """
+
+    __slots__ = ("__server", "__id", "__ip", "__port", "__connected", "__rtt", "__signals", "__weakref__")
 
+    def __init__(self, server, device_id: int, ip: str, port: int):
         self.__ip = ip
         self.__port = port
         self.__id = device_id
         self.__connected = True
         self.__server = server
+        self.__rtt = None
+        self.__signals = None
 
-    @Slot()
     def server(self):
         return self.__server
 
-    @Slot()
     def id(self):
         return self.__id
 
-    @Slot()
     def ip(self):
         return self.__ip
 
-    @Slot()
+    def ip_address(self):
+        """Parsed IP address.
+
+        Returns:
+            ipaddress.IPv4Address | ipaddress.IPv6Address: Client IP address.
+
+        Raises:
+            ValueError: IP address is not valid.
+        """
+        return ipaddress.ip_address(self.__ip)
+
     def port(self):
         return self.__port
 
-    @Slot(bool)
     def set_connected(self, value: bool):
         self.__connected = value
 
-    @Slot()
     def is_connected(self) -> bool:
         return self.__connected
 
-    @Slot()
+    def set_rtt(self, value: float):
+        self.__rtt = value
+
+    def rtt(self):
+        """Last round trip time measured by heartbeat in milliseconds or None if not measured yet."""
+        return self.__rtt
+
+    def signals(self) -> ClientSignals:
+        """Get per-client signals. QObject is created on first call."""
+        if self.__signals is None:
+            self.__signals = ClientSignals()
+        return self.__signals
+
+    def has_signals(self) -> bool:
+        return self.__signals is not None
+
     def disconnect(self):
         self.server().disconnect(self)
 
-    @Slot(bytes)
     def write(self, message: bytes):
         self.server().write(self, message)
+
+    def write_stream(self, stream_id: int, message: bytes):
+        self.server().write_stream(self, stream_id, message)
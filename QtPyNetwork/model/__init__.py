@@ -1 +1,5 @@
-from .Client import Client
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".Client": ("Client", "ClientSignals"),
+})
@@ -0,0 +1,40 @@
+class AdmissionOptions:
+    """Connection admission and accept pacing settings for TCPServer.
+
+    Accepting is paused (new connections wait in the kernel listen backlog) while the server
+    is at max_connections, while accepted connections wait for pacing or while the server
+    thread event loop lags more than max_loop_lag. It is resumed automatically once load drops.
+
+    Args:
+        max_connections (int): Maximum number of connected clients. Zero means unlimited.
+        max_connections_per_ip (int): Maximum number of clients from one IP address.
+            Connections over the limit are closed right after accepting. Zero means unlimited.
+        accept_rate (float): Maximum number of connections set up per second. Connections accepted
+            above the rate are queued and passed to balancer when tokens refill. Zero means unlimited.
+        accept_burst (int): Number of connections which can be set up at once before pacing starts.
+        max_loop_lag (float): Pause accepting while server thread event loop lags more
+            than this many seconds. Zero disables lag check.
+        max_pending_connections (int): Passed to QTcpServer.setMaxPendingConnections.
+    """
+
+    __slots__ = ("max_connections", "max_connections_per_ip", "accept_rate", "accept_burst",
+                 "max_loop_lag", "max_pending_connections")
+
+    def __init__(self, max_connections: int = 0, max_connections_per_ip: int = 0, accept_rate: float = 0,
+                 accept_burst: int = 100, max_loop_lag: float = 0, max_pending_connections: int = 30):
+        if accept_rate < 0:
+            raise ValueError("Accept rate must not be negative")
+        if accept_burst < 1:
+            raise ValueError("Accept burst must be greater than 0")
+        self.max_connections = max_connections
+        self.max_connections_per_ip = max_connections_per_ip
+        self.accept_rate = accept_rate
+        self.accept_burst = accept_burst
+        self.max_loop_lag = max_loop_lag
+        self.max_pending_connections = max_pending_connections
+
+    def __repr__(self):
+        return (f"AdmissionOptions(max_connections={self.max_connections}, "
+                f"max_connections_per_ip={self.max_connections_per_ip}, accept_rate={self.accept_rate}, "
+                f"accept_burst={self.accept_burst}, max_loop_lag={self.max_loop_lag}, "
+                f"max_pending_connections={self.max_pending_connections})")
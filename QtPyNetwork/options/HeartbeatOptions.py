@@ -0,0 +1,31 @@
+class HeartbeatOptions:
+    """Liveness detection settings for a connection.
+
+    Every interval the connection is checked. Connection which has not received any frame
+    for longer than timeout is aborted. If ping is enabled, a ping frame is sent on every check
+    and the peer answers with a pong frame, which keeps the connection alive and is used
+    to measure round trip time.
+
+    Both peers must use QtPyNetwork 0.8.0 or newer when ping is enabled,
+    older versions do not understand control frames.
+
+    Args:
+        interval (float): Seconds between checks.
+        timeout (float): Seconds without incoming data after which connection is dropped.
+            Zero disables idle timeout.
+        ping (bool): Send ping frames.
+    """
+
+    __slots__ = ("interval", "timeout", "ping")
+
+    def __init__(self, interval: float = 5.0, timeout: float = 15.0, ping: bool = True):
+        if interval <= 0:
+            raise ValueError("Heartbeat interval must be greater than 0")
+        if timeout < 0:
+            raise ValueError("Heartbeat timeout must not be negative")
+        self.interval = interval
+        self.timeout = timeout
+        self.ping = ping
+
+    def __repr__(self):
+        return f"HeartbeatOptions(interval={self.interval}, timeout={self.timeout}, ping={self.ping})"
@@ -0,0 +1,55 @@
+OVERLOAD_REJECT = "reject"
+OVERLOAD_PAUSE_READING = "pause_reading"
+OVERLOAD_SHED = "shed"
+
+POLICIES = (OVERLOAD_REJECT, OVERLOAD_PAUSE_READING, OVERLOAD_SHED)
+
+
+class OverloadOptions:
+    """Event loop lag monitoring and overload policies of balancer worker threads.
+
+    Every worker thread measures its event loop lag with a probe timer: the time the probe fires
+    late is the time other events kept the loop busy. Worker is overloaded while its smoothed lag
+    is above max_lag and recovers once it drops below recover_lag. While overloaded, the worker
+    applies policies:
+
+        - OVERLOAD_REJECT: new connections placed on the worker are closed right after accepting.
+        - OVERLOAD_PAUSE_READING: sockets are not read, peers are slowed down by TCP flow control.
+        - OVERLOAD_SHED: incoming messages on shed_streams are dropped before they reach the server.
+
+    ThreadPoolBalancer places new connections on workers which are not overloaded,
+    so OVERLOAD_REJECT only takes effect when every worker is overloaded.
+
+    UDPBalancer applies policies to peer sessions: new peers are rejected by ignoring their datagrams,
+    paused reading leaves datagrams in the socket receive buffer and plain datagram messages are stream 0.
+
+    Args:
+        probe_interval (float): Seconds between lag probes.
+        max_lag (float): Seconds of smoothed lag above which worker is overloaded. Zero only measures lag.
+        recover_lag (float): Seconds of smoothed lag below which worker recovers. Defaults to half of max_lag.
+        policies (tuple): Policies applied while overloaded, OVERLOAD_* constants.
+        shed_streams (tuple): Stream IDs of low priority messages dropped by OVERLOAD_SHED,
+            stream 0 are plain messages.
+    """
+
+    __slots__ = ("probe_interval", "max_lag", "recover_lag", "policies", "shed_streams")
+
+    def __init__(self, probe_interval: float = 0.1, max_lag: float = 0, recover_lag: float = None,
+                 policies: tuple = (), shed_streams: tuple = ()):
+        if probe_interval <= 0:
+            raise ValueError("Probe interval must be greater than 0")
+        if max_lag < 0:
+            raise ValueError("Maximum lag must not be negative")
+        for policy in policies:
+            if policy not in POLICIES:
+                raise ValueError(f"Unknown overload policy {policy}")
+        self.probe_interval = probe_interval
+        self.max_lag = max_lag
+        self.recover_lag = recover_lag if recover_lag is not None else max_lag / 2
+        self.policies = tuple(policies)
+        self.shed_streams = frozenset(shed_streams)
+
+    def __repr__(self):
+        return (f"OverloadOptions(probe_interval={self.probe_interval}, max_lag={self.max_lag}, "
+                f"recover_lag={self.recover_lag}, policies={self.policies}, "
+                f"shed_streams={tuple(sorted(self.shed_streams))})")
@@ -0,0 +1,49 @@
+class ReconnectOptions:
+    """Automatic reconnection settings of a client.
+
+    Delay before n-th attempt is initial_delay * multiplier ** (n - 1), limited by max_delay.
+    With jitter, the delay is picked randomly from [delay * (1 - jitter), delay], so clients
+    disconnected at the same moment do not reconnect at the same moment.
+
+    Messages written while disconnected are queued and sent after reconnecting.
+
+    Args:
+        initial_delay (float): Seconds before the first reconnection attempt.
+        max_delay (float): Maximum delay between attempts in seconds.
+        multiplier (float): Delay growth factor.
+        jitter (float): Randomized fraction of delay, from 0 (no jitter) to 1 (full jitter).
+        max_attempts (int): Attempts after which client gives up. Zero retries forever.
+        queue_size (int): Maximum number of messages queued while disconnected. Zero disables queueing.
+    """
+
+    __slots__ = ("initial_delay", "max_delay", "multiplier", "jitter", "max_attempts", "queue_size")
+
+    def __init__(self, initial_delay: float = 0.5, max_delay: float = 30.0, multiplier: float = 2.0,
+                 jitter: float = 1.0, max_attempts: int = 0, queue_size: int = 1000):
+        if initial_delay < 0 or max_delay < initial_delay:
+            raise ValueError("Delays must not be negative and max_delay must not be less than initial_delay")
+        if not 0 <= jitter <= 1:
+            raise ValueError("Jitter must be between 0 and 1")
+        if multiplier < 1:
+            raise ValueError("Multiplier must be at least 1")
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+        self.multiplier = multiplier
+        self.jitter = jitter
+        self.max_attempts = max_attempts
+        self.queue_size = queue_size
+
+    def delay(self, attempt: int, rand: float) -> float:
+        """Delay before attempt in seconds.
+
+        Args:
+            attempt (int): Attempt number, starting from 1.
+            rand (float): Random number from [0, 1).
+        """
+        delay = min(self.max_delay, self.initial_delay * self.multiplier ** min(attempt - 1, 64))
+        return delay * (1 - self.jitter * rand)
+
+    def __repr__(self):
+        return (f"ReconnectOptions(initial_delay={self.initial_delay}, max_delay={self.max_delay}, "
+                f"multiplier={self.multiplier}, jitter={self.jitter}, max_attempts={self.max_attempts}, "
+                f"queue_size={self.queue_size})")
@@ -0,0 +1,49 @@
+CHANNEL_UNORDERED = 0
+CHANNEL_ORDERED = 1
+
+
+class ReliableOptions:
+    """Reliable UDP settings.
+
+    Every message is acknowledged by the peer and retransmitted until it is acknowledged
+    or max_retransmits is reached. Messages on the ordered channel are delivered in the order
+    they were written, messages on the unordered channel are delivered as soon as they arrive,
+    so a lost datagram never delays them.
+
+    Args:
+        channel (int): Channel used when write() is called without channel,
+            CHANNEL_ORDERED or CHANNEL_UNORDERED.
+        window (int): Maximum number of unacknowledged messages per channel. Further messages
+            are queued until acknowledgements arrive.
+        resend_timeout (float): Initial retransmit timeout in seconds, used until round trip time is measured.
+        min_resend_timeout (float): Lower bound of retransmit timeout in seconds.
+        max_resend_timeout (float): Upper bound of retransmit timeout in seconds.
+        max_retransmits (int): Number of retransmits after which peer is considered lost.
+        resolution (int): Resolution of retransmit timers in milliseconds.
+    """
+
+    __slots__ = ("channel", "window", "resend_timeout", "min_resend_timeout", "max_resend_timeout",
+                 "max_retransmits", "resolution")
+
+    def __init__(self, channel: int = CHANNEL_ORDERED, window: int = 256, resend_timeout: float = 0.2,
+                 min_resend_timeout: float = 0.02, max_resend_timeout: float = 2.0, max_retransmits: int = 10,
+                 resolution: int = 10):
+        if channel not in (CHANNEL_UNORDERED, CHANNEL_ORDERED):
+            raise ValueError(f"Unknown channel {channel}")
+        if window <= 0:
+            raise ValueError("Window must be greater than 0")
+        if not 0 < min_resend_timeout <= max_resend_timeout:
+            raise ValueError("Resend timeouts must be greater than 0 and min must not exceed max")
+        self.channel = channel
+        self.window = window
+        self.resend_timeout = resend_timeout
+        self.min_resend_timeout = min_resend_timeout
+        self.max_resend_timeout = max_resend_timeout
+        self.max_retransmits = max_retransmits
+        self.resolution = resolution
+
+    def __repr__(self):
+        return (f"ReliableOptions(channel={self.channel}, window={self.window}, "
+                f"resend_timeout={self.resend_timeout}, min_resend_timeout={self.min_resend_timeout}, "
+                f"max_resend_timeout={self.max_resend_timeout}, max_retransmits={self.max_retransmits}, "
+                f"resolution={self.resolution})")
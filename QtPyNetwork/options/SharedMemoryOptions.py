@@ -0,0 +1,31 @@
+class SharedMemoryOptions:
+    """Shared memory transport of connections between peers on the same host.
+
+    When connected, each side offers the peer a ring buffer of size bytes in shared memory.
+    Once the peer attaches to it, messages of at least threshold bytes are copied into the ring
+    and the socket only carries notifications of their size. Smaller messages, stream messages
+    and messages which do not fit into free space of the ring are sent through the socket,
+    so the order of messages is kept.
+
+    Rings are only offered to and accepted from peers connected over loopback or local sockets,
+    and only shared memory created by QtPyNetwork is attached to. Peer which does not enable
+    shared memory or uses older QtPyNetwork never attaches to the ring, then all messages
+    are sent through the socket.
+
+    Args:
+        size (int): Bytes of shared memory of the ring this side writes to.
+        threshold (int): Messages smaller than threshold bytes are sent through the socket.
+    """
+
+    __slots__ = ("size", "threshold")
+
+    def __init__(self, size: int = 16 * 1024 * 1024, threshold: int = 16 * 1024):
+        if size < 4096:
+            raise ValueError("Shared memory size must be at least 4096 bytes")
+        if threshold < 0:
+            raise ValueError("Shared memory threshold must not be negative")
+        self.size = size
+        self.threshold = threshold
+
+    def __repr__(self):
+        return f"SharedMemoryOptions(size={self.size}, threshold={self.threshold})"
@@ -0,0 +1,93 @@
+from typing import TYPE_CHECKING
+
+import socket
+import logging
+
+if TYPE_CHECKING:
+    from qtpy.QtNetwork import QAbstractSocket
+
+TCP_QUICKACK = getattr(socket, "TCP_QUICKACK", None)
+TCP_USER_TIMEOUT = getattr(socket, "TCP_USER_TIMEOUT", None)
+
+
+class SocketOptions:
+    """Options applied to every TCP socket when it is adopted by a balancer or connected by a client.
+
+    Subclass and override for_connection() to use different options for some peers.
+
+    Args:
+        no_delay (bool): Disable Nagle's algorithm (TCP_NODELAY). Frames are written in one call,
+            so Nagle only delays small request/response messages.
+        keep_alive (bool): Enable TCP keep-alive probes (SO_KEEPALIVE).
+        send_buffer_size (int): Kernel send buffer size in bytes (SO_SNDBUF). Zero keeps system default.
+        receive_buffer_size (int): Kernel receive buffer size in bytes (SO_RCVBUF). Zero keeps system default.
+        quick_ack (bool): Linux only. Send ACKs immediately (TCP_QUICKACK). Kernel may reset this flag,
+            so it only affects the start of the connection.
+        user_timeout (float): Linux only. Seconds unacknowledged data may stay in flight
+            before the connection is dropped (TCP_USER_TIMEOUT). Zero keeps system default.
+    """
+
+    __slots__ = ("no_delay", "keep_alive", "send_buffer_size", "receive_buffer_size", "quick_ack", "user_timeout")
+
+    def __init__(self, no_delay: bool = True, keep_alive: bool = False, send_buffer_size: int = 0,
+                 receive_buffer_size: int = 0, quick_ack: bool = False, user_timeout: float = 0):
+        self.no_delay = no_delay
+        self.keep_alive = keep_alive
+        self.send_buffer_size = send_buffer_size
+        self.receive_buffer_size = receive_buffer_size
+        self.quick_ack = quick_ack
+        self.user_timeout = user_timeout
+
+    def __repr__(self):
+        return (f"SocketOptions(no_delay={self.no_delay}, keep_alive={self.keep_alive}, "
+                f"send_buffer_size={self.send_buffer_size}, receive_buffer_size={self.receive_buffer_size}, "
+                f"quick_ack={self.quick_ack}, user_timeout={self.user_timeout})")
+
+    def for_connection(self, ip: str, port: int) -> "SocketOptions":
+        """Get options for single connection. Called from the thread the socket lives in.
+
+        Args:
+            ip (str): Peer IP address.
+            port (int): Peer port.
+
+        Returns:
+            SocketOptions: Options to apply or None to keep socket defaults.
+        """
+        return self
+
+    def apply(self, sock: "QAbstractSocket") -> None:
+        """Apply options to connected socket.
+
+        Args:
+            sock (QAbstractSocket): Connected socket. Local sockets have no options and are skipped.
+        """
+        # options are imported by Qt-free code, Qt is only needed once there is a socket
+        from qtpy.QtNetwork import QAbstractSocket
+        if not isinstance(sock, QAbstractSocket):
+            return
+        options = self.for_connection(sock.peerAddress().toString(), sock.peerPort())
+        if options is None:
+            return
+        sock.setSocketOption(QAbstractSocket.LowDelayOption, int(options.no_delay))
+        sock.setSocketOption(QAbstractSocket.KeepAliveOption, int(options.keep_alive))
+        if options.send_buffer_size:
+            sock.setSocketOption(QAbstractSocket.SendBufferSizeSocketOption, options.send_buffer_size)
+        if options.receive_buffer_size:
+            sock.setSocketOption(QAbstractSocket.ReceiveBufferSizeSocketOption, options.receive_buffer_size)
+        if options.quick_ack or options.user_timeout:
+            options.__apply_native(int(sock.socketDescriptor()))
+
+    def __apply_native(self, socket_descriptor: int) -> None:
+        try:
+            native = socket.socket(fileno=socket_descriptor)
+        except OSError:
+            return
+        try:
+            if self.quick_ack and TCP_QUICKACK is not None:
+                native.setsockopt(socket.IPPROTO_TCP, TCP_QUICKACK, 1)
+            if self.user_timeout and TCP_USER_TIMEOUT is not None:
+                native.setsockopt(socket.IPPROTO_TCP, TCP_USER_TIMEOUT, int(self.user_timeout * 1000))
+        except OSError as e:
+            logging.getLogger(self.__class__.__name__).debug(f"Failed to set native socket options: {e}")
+        finally:
+            native.detach()
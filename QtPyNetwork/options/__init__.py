@@ -0,0 +1,11 @@
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".HeartbeatOptions": ("HeartbeatOptions",),
+    ".AdmissionOptions": ("AdmissionOptions",),
+    ".SocketOptions": ("SocketOptions",),
+    ".ReliableOptions": ("ReliableOptions", "CHANNEL_ORDERED", "CHANNEL_UNORDERED"),
+    ".ReconnectOptions": ("ReconnectOptions",),
+    ".OverloadOptions": ("OverloadOptions", "OVERLOAD_REJECT", "OVERLOAD_PAUSE_READING", "OVERLOAD_SHED"),
+    ".SharedMemoryOptions": ("SharedMemoryOptions",),
+})
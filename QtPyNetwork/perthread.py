@@ -0,0 +1,41 @@
+"""Objects kept per Qt thread, like TimerWheel.instance() and LagMonitor.instance()."""
+from qtpy.QtCore import QThread, Qt
+
+import threading
+
+
+class PerThread:
+    """Registry of objects created once per Qt thread and key.
+
+    threading.local can not be used for this, it is reset between slot calls in QThreads.
+    Objects are dropped when their thread finishes.
+
+    Args:
+        release (callable): Called with object when its thread finishes, in that thread.
+    """
+
+    def __init__(self, release=None):
+        self.__objects = {}
+        self.__lock = threading.Lock()
+        self.__release = release
+
+    def get(self, key, create):
+        """Get object of the current thread stored under key.
+
+        Args:
+            key (hashable): Key within the current thread.
+            create (callable): Called without arguments to create object when there is none yet.
+        """
+        key = (int(QThread.currentThreadId()), key)
+        obj = self.__objects.get(key)
+        if obj is None:
+            obj = create()
+            with self.__lock:
+                self.__objects[key] = obj
+            QThread.currentThread().finished.connect(lambda: self.__forget(key), Qt.DirectConnection)
+        return obj
+
+    def __forget(self, key: tuple) -> None:
+        obj = self.__objects.pop(key, None)
+        if obj is not None and self.__release is not None:
+            self.__release(obj)
@@ -0,0 +1,105 @@
+from qtpy.QtCore import QObject, QTimer, Slot
+from qtpy.QtNetwork import QUdpSocket, QHostAddress
+
+import random
+import logging
+
+
+class LossyLink(QObject):
+    """UDP relay which drops, delays and reorders datagrams. Used to test reliable UDP over loopback.
+
+    Clients send datagrams to the link port instead of the server port. Every client gets its own
+    upstream socket, so the server sees a separate peer for every client. Datagrams are forwarded
+    in both directions.
+
+    Args:
+        target_ip (str): Server address.
+        target_port (int): Server port.
+        loss (float): Probability of dropping datagram, from 0 to 1.
+        latency (float): Delay added to every datagram in seconds.
+        jitter (float): Maximum random delay added on top of latency in seconds. Reorders datagrams.
+        seed (int): Seed of random generator, for reproducible runs.
+    """
+
+    def __init__(self, target_ip: str, target_port: int, loss: float = 0.0, latency: float = 0.0,
+                 jitter: float = 0.0, seed: int = None):
+        super(LossyLink, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__target = QHostAddress(target_ip)
+        self.__target_port = target_port
+        self.__loss = loss
+        self.__latency = latency
+        self.__jitter = jitter
+        self.__random = random.Random(seed)
+        self.__socket: QUdpSocket = None
+        self.__upstreams = {}
+        self.forwarded = 0
+        self.dropped = 0
+
+    @Slot(str, int)
+    def start(self, ip: str = "127.0.0.1", port: int = 0) -> int:
+        """Bind link socket.
+
+        Args:
+            ip (str): Address to bind to.
+            port (int): Port to bind to. Zero selects free port.
+
+        Returns:
+            int: Bound port.
+        """
+        self.__socket = QUdpSocket(self)
+        if not self.__socket.bind(QHostAddress(ip), port):
+            raise OSError(self.__socket.errorString())
+        self.__socket.readyRead.connect(self.__on_client_ready_read)
+        return int(self.__socket.localPort())
+
+    @Slot()
+    def __on_client_ready_read(self):
+        socket = self.__socket
+        while socket.hasPendingDatagrams():
+            data, host, port = socket.readDatagram(max(socket.pendingDatagramSize(), 0))
+            key = (host.toString(), port)
+            upstream = self.__upstreams.get(key)
+            if upstream is None:
+                upstream = self.__create_upstream(host, port)
+                self.__upstreams[key] = upstream
+            self.__forward(upstream, data, self.__target, self.__target_port)
+
+    def __create_upstream(self, host: QHostAddress, port: int) -> QUdpSocket:
+        upstream = QUdpSocket(self)
+        upstream.bind(self.__socket.localAddress(), 0)
+
+        def on_ready_read():
+            while upstream.hasPendingDatagrams():
+                data = upstream.readDatagram(max(upstream.pendingDatagramSize(), 0))[0]
+                self.__forward(self.__socket, data, host, port)
+
+        upstream.readyRead.connect(on_ready_read)
+        return upstream
+
+    def __forward(self, socket: QUdpSocket, data: bytes, host: QHostAddress, port: int):
+        if self.__loss and self.__random.random() < self.__loss:
+            self.dropped += 1
+            return
+        self.forwarded += 1
+        delay = self.__latency
+        if self.__jitter:
+            delay += self.__random.random() * self.__jitter
+        if delay <= 0:
+            socket.writeDatagram(data, host, port)
+        else:
+            QTimer.singleShot(int(delay * 1000), lambda: self.__write(socket, data, host, port))
+
+    def __write(self, socket: QUdpSocket, data: bytes, host: QHostAddress, port: int):
+        if self.__socket is not None:
+            socket.writeDatagram(data, host, port)
+
+    @Slot()
+    def close(self):
+        """Close link and upstream sockets. Delayed datagrams are dropped."""
+        for upstream in self.__upstreams.values():
+            upstream.close()
+        self.__upstreams.clear()
+        if self.__socket is not None:
+            self.__socket.close()
+            self.__socket = None
@@ -0,0 +1,278 @@
+from collections import deque
+from struct import pack, unpack_from, calcsize
+from time import monotonic
+
+from QtPyNetwork.options import ReliableOptions, CHANNEL_ORDERED
+from QtPyNetwork.timer import TimerWheel
+
+FRAME_DATA = 1
+FRAME_ACK = 2
+
+# kind, channel, sequence number
+DATA_HEADER = '!BBL'
+DATA_HEADER_SIZE = calcsize(DATA_HEADER)
+# kind, channel, next expected sequence number, bitmap of received frames following it
+ACK_FRAME = '!BBLQ'
+ACK_FRAME_SIZE = calcsize(ACK_FRAME)
+SACK_BITS = 64
+
+SEQ_MASK = 0xFFFFFFFF
+SEQ_HALF = 0x80000000
+
+# frame is retransmitted early when this many later frames were acknowledged
+FAST_RETRANSMIT = 3
+
+
+def _unwrap(seq: int, reference: int) -> int:
+    """Extend 32 bit sequence number to the value closest to reference."""
+    delta = (seq - reference) & SEQ_MASK
+    if delta >= SEQ_HALF:
+        delta -= SEQ_MASK + 1
+    return reference + delta
+
+
+class _Pending:
+    """Sent frame waiting for acknowledgement."""
+
+    __slots__ = ("frame", "sent", "last_sent", "retransmits", "handle", "fast")
+
+    def __init__(self, frame: bytes, sent: float):
+        self.frame = frame
+        self.sent = sent
+        self.last_sent = sent
+        self.retransmits = 0
+        self.handle = None
+        self.fast = False
+
+
+class _Sender:
+    __slots__ = ("next_seq", "unacked", "queue")
+
+    def __init__(self):
+        self.next_seq = 0
+        self.unacked = {}
+        self.queue = deque()
+
+
+class _Receiver:
+    __slots__ = ("expected", "received", "ack_needed")
+
+    def __init__(self):
+        self.expected = 0
+        # sequence number -> payload for ordered channel, None for unordered channel
+        self.received = {}
+        self.ack_needed = False
+
+
+class ReliableSession:
+    """Reliability state of one peer. Not a QObject, one session is created for every peer.
+
+    Frames produced by the session (data, retransmits and acknowledgements) are passed
+    to send callback, incoming frames are passed to receive(), which returns messages ready
+    to be delivered. Acknowledgements are collected and sent by flush_acks(), which should be
+    called once all pending datagrams were read.
+
+    Retransmit timeout is computed from measured round trip time like in TCP (RFC 6298)
+    and retransmit timers are driven by timer wheel of the current thread.
+
+    Args:
+        options (ReliableOptions): Reliability settings.
+        send (callable): Called with frame (bytes) which must be sent to peer.
+        lost (callable): Called without arguments when a frame was not acknowledged
+            after max_retransmits retransmits.
+    """
+
+    __slots__ = ("__options", "__send", "__lost", "__wheel", "__senders", "__receivers",
+                 "__srtt", "__rttvar", "__rto", "__closed")
+
+    def __init__(self, options: ReliableOptions, send, lost):
+        self.__options = options
+        self.__send = send
+        self.__lost = lost
+        self.__wheel = TimerWheel.instance(options.resolution)
+        self.__senders = (_Sender(), _Sender())
+        self.__receivers = (_Receiver(), _Receiver())
+        self.__srtt = None
+        self.__rttvar = 0.0
+        self.__rto = options.resend_timeout
+        self.__closed = False
+
+    def write(self, data: bytes, channel: int = None) -> None:
+        """Send message reliably.
+
+        Args:
+            data (bytes): Message.
+            channel (int): CHANNEL_ORDERED or CHANNEL_UNORDERED. Defaults to options channel.
+        """
+        if self.__closed:
+            return
+        if channel is None:
+            channel = self.__options.channel
+        sender = self.__senders[channel]
+        if len(sender.unacked) >= self.__options.window:
+            sender.queue.append(data)
+        else:
+            self.__transmit(channel, sender, data)
+
+    def __transmit(self, channel: int, sender: _Sender, data: bytes) -> None:
+        seq = sender.next_seq
+        sender.next_seq += 1
+        frame = pack(DATA_HEADER, FRAME_DATA, channel, seq & SEQ_MASK) + data
+        pending = _Pending(frame, monotonic())
+        sender.unacked[seq] = pending
+        pending.handle = self.__wheel.schedule(self.__rto, lambda: self.__on_resend_timeout(channel, seq))
+        self.__send(frame)
+
+    def receive(self, frame: bytes) -> list:
+        """Process frame received from peer.
+
+        Args:
+            frame (bytes): Frame.
+
+        Returns:
+            list: Messages (bytes) ready to be delivered, in delivery order.
+
+        Raises:
+            ValueError: Frame is malformed.
+        """
+        if len(frame) < DATA_HEADER_SIZE:
+            raise ValueError("Truncated reliable frame")
+        kind, channel, seq = unpack_from(DATA_HEADER, frame)
+        if channel > 1:
+            raise ValueError(f"Unknown channel {channel}")
+        if kind == FRAME_DATA:
+            return self.__on_data(channel, seq, frame[DATA_HEADER_SIZE:])
+        if kind == FRAME_ACK:
+            if len(frame) < ACK_FRAME_SIZE:
+                raise ValueError("Truncated acknowledgement frame")
+            self.__on_ack(channel, seq, unpack_from(ACK_FRAME, frame)[3])
+            return []
+        raise ValueError(f"Unknown frame kind {kind}")
+
+    def __on_data(self, channel: int, seq: int, payload: bytes) -> list:
+        receiver = self.__receivers[channel]
+        receiver.ack_needed = True
+        expected = receiver.expected
+        seq = _unwrap(seq, expected)
+        if seq < expected or seq in receiver.received or seq >= expected + self.__options.window:
+            # duplicate or outside of window, acknowledge again
+            return []
+        ordered = channel == CHANNEL_ORDERED
+        if seq != expected:
+            receiver.received[seq] = payload if ordered else None
+            return [] if ordered else [payload]
+
+        messages = [payload]
+        expected += 1
+        received = receiver.received
+        while expected in received:
+            buffered = received.pop(expected)
+            if ordered:
+                messages.append(buffered)
+            expected += 1
+        receiver.expected = expected
+        return messages
+
+    def __on_ack(self, channel: int, cumulative: int, bitmap: int) -> None:
+        sender = self.__senders[channel]
+        unacked = sender.unacked
+        if not unacked:
+            return
+        first = next(iter(unacked))
+        cumulative = _unwrap(cumulative, first)
+        now = monotonic()
+        while unacked:
+            seq = next(iter(unacked))
+            if seq >= cumulative:
+                break
+            self.__acknowledge(unacked.pop(seq), now)
+        highest = None
+        bit = 0
+        while bitmap:
+            if bitmap & 1:
+                seq = cumulative + 1 + bit
+                pending = unacked.pop(seq, None)
+                if pending is not None:
+                    self.__acknowledge(pending, now)
+                highest = seq
+            bitmap >>= 1
+            bit += 1
+
+        if highest is not None:
+            # frames followed by enough acknowledged frames were most likely lost,
+            # resend them at most once per retransmit timeout without waiting for their timers
+            for seq, pending in unacked.items():
+                if seq > highest - FAST_RETRANSMIT:
+                    break
+                if not pending.fast or now - pending.last_sent >= self.__rto:
+                    pending.fast = True
+                    pending.last_sent = now
+                    self.__send(pending.frame)
+
+        window = self.__options.window
+        while sender.queue and len(unacked) < window:
+            self.__transmit(channel, sender, sender.queue.popleft())
+
+    def __acknowledge(self, pending: _Pending, now: float) -> None:
+        self.__wheel.cancel(pending.handle)
+        if pending.retransmits == 0 and not pending.fast:
+            # Karn's algorithm, only frames sent once are used to measure round trip time
+            self.__update_rto(now - pending.sent)
+
+    def __update_rto(self, sample: float) -> None:
+        if self.__srtt is None:
+            self.__srtt = sample
+            self.__rttvar = sample / 2
+        else:
+            self.__rttvar = 0.75 * self.__rttvar + 0.25 * abs(self.__srtt - sample)
+            self.__srtt = 0.875 * self.__srtt + 0.125 * sample
+        options = self.__options
+        self.__rto = min(max(self.__srtt + 4 * self.__rttvar, options.min_resend_timeout),
+                         options.max_resend_timeout)
+
+    def __on_resend_timeout(self, channel: int, seq: int) -> None:
+        pending = self.__senders[channel].unacked.get(seq)
+        if pending is None or self.__closed:
+            return
+        pending.handle = None
+        if pending.retransmits >= self.__options.max_retransmits:
+            self.close()
+            self.__lost()
+            return
+        pending.retransmits += 1
+        delay = min(self.__rto * (1 << pending.retransmits), self.__options.max_resend_timeout)
+        pending.handle = self.__wheel.schedule(delay, lambda: self.__on_resend_timeout(channel, seq))
+        pending.last_sent = monotonic()
+        self.__send(pending.frame)
+
+    def flush_acks(self) -> None:
+        """Send acknowledgements for channels which received data since last call."""
+        for channel, receiver in enumerate(self.__receivers):
+            if not receiver.ack_needed:
+                continue
+            receiver.ack_needed = False
+            expected = receiver.expected
+            bitmap = 0
+            for seq in receiver.received:
+                bit = seq - expected - 1
+                if bit < SACK_BITS:
+                    bitmap |= 1 << bit
+            self.__send(pack(ACK_FRAME, FRAME_ACK, channel, expected & SEQ_MASK, bitmap))
+
+    def rtt(self):
+        """Smoothed round trip time in milliseconds or None if not measured yet."""
+        if self.__srtt is not None:
+            return self.__srtt * 1000
+
+    def pending(self) -> int:
+        """Number of messages which were not acknowledged yet, including queued messages."""
+        return sum(len(sender.unacked) + len(sender.queue) for sender in self.__senders)
+
+    def close(self) -> None:
+        """Cancel retransmit timers and drop unacknowledged messages."""
+        self.__closed = True
+        for sender in self.__senders:
+            for pending in sender.unacked.values():
+                self.__wheel.cancel(pending.handle)
+            sender.unacked.clear()
+            sender.queue.clear()
@@ -0,0 +1,184 @@
+"""Capture replay behind ``python -m QtPyNetwork replay``.
+
+Drives server with traffic captured by AbstractServer.set_capture(). Every captured client gets its own
+connection hosted by ClientManager, opened and closed when the captured one was, and sends captured
+incoming messages at their captured time divided by speed. Speed 0 sends everything as fast as possible
+and keeps connections open until replay ends, so replies are not lost.
+Messages of clients which are still connecting are sent once they connect. Captured outgoing messages
+are only counted, as the number of replies expected.
+
+Result is printed to stdout as a single JSON object.
+"""
+import sys
+import json
+import argparse
+from time import perf_counter
+
+from QtPyNetwork.bench import percentile
+
+# records handled per event loop iteration
+BATCH = 1000
+TICK = 0.001
+
+
+def run(args) -> dict:
+    from qtpy.QtCore import QCoreApplication, QTimer
+    from QtPyNetwork.client import ClientManager
+    from QtPyNetwork.capture import CaptureReader, CAPTURE_DISCONNECTED, CAPTURE_IN, CAPTURE_OUT
+
+    reader = CaptureReader(args.log)
+    records = reader.records(args.start, args.end)
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    manager = ClientManager(threads=args.client_threads)
+    # captured client ID -> managed client, backlog of messages written before it connected
+    clients = {}
+    backlog = {}
+    closing = set()
+    lags = []
+    state = {"next": None, "started": 0.0, "finished": 0.0, "last_sent": 0.0, "clients": 0, "connections": 0, "failed": 0,
+             "sent": 0, "bytes": 0, "received": 0, "expected": 0, "captured": args.start}
+
+    def client_for(client_id):
+        client = clients.get(client_id)
+        if client is None:
+            client = clients[client_id] = manager.add_client(args.host, args.port, timeout=args.connect_timeout)
+            backlog[client] = []
+            state["clients"] += 1
+        return client
+
+    def send(client, stream_id, payload):
+        if stream_id:
+            client.write_stream(stream_id, payload)
+        else:
+            client.write(payload)
+        state["sent"] += 1
+        state["bytes"] += len(payload)
+        state["last_sent"] = perf_counter()
+
+    def replay(record, now):
+        kind = record.kind
+        if kind == CAPTURE_OUT:
+            state["expected"] += 1
+            return
+        if kind == CAPTURE_DISCONNECTED:
+            if not args.speed:
+                return
+            client = clients.pop(record.client_id, None)
+            if client is None:
+                return
+            if backlog.get(client):
+                closing.add(client)
+            else:
+                backlog.pop(client, None)
+                client.close()
+            return
+        client = client_for(record.client_id)
+        if kind == CAPTURE_IN:
+            if args.speed:
+                lags.append(now - state["started"] - (record.time - args.start) / args.speed)
+            if client.is_connected() and not backlog[client]:
+                send(client, record.stream_id, record.payload)
+            else:
+                backlog[client].append((record.stream_id, record.payload))
+
+    def on_tick():
+        now = perf_counter()
+        # captured time reached by now
+        due = args.start + (now - state["started"]) * args.speed if args.speed else None
+        for _ in range(BATCH):
+            record = state["next"] if state["next"] is not None else next(records, None)
+            if record is None:
+                ticker.stop()
+                state["finished"] = perf_counter()
+                QTimer.singleShot(int(args.drain * 1000), app.quit)
+                return
+            if due is not None and record.time > due:
+                state["next"] = record
+                return
+            state["next"] = None
+            state["captured"] = record.time
+            replay(record, now)
+
+    def on_connected(client, ip, port):
+        state["connections"] += 1
+        for stream_id, payload in backlog.get(client, ()):
+            send(client, stream_id, payload)
+        if client in backlog:
+            backlog[client] = []
+        if client in closing:
+            closing.discard(client)
+            backlog.pop(client, None)
+            client.close()
+
+    def on_failed(client):
+        state["failed"] += 1
+        backlog.pop(client, None)
+        closing.discard(client)
+
+    def on_message(client, message):
+        state["received"] += 1
+
+    manager.connected.connect(on_connected)
+    manager.failed_to_connect.connect(on_failed)
+    manager.message.connect(on_message)
+    manager.stream_message.connect(lambda client, stream_id, message: on_message(client, message))
+    ticker = QTimer()
+    ticker.setInterval(0 if not args.speed else int(TICK * 1000))
+    ticker.timeout.connect(on_tick)
+    state["started"] = perf_counter()
+    ticker.start()
+    if args.timeout:
+        QTimer.singleShot(int(args.timeout * 1000), app.quit)
+    app.exec_()
+
+    elapsed = max(state["finished"] or perf_counter(), state["last_sent"]) - state["started"]
+    stats = manager.stats()
+    manager.close()
+    manager.wait()
+    reader.close()
+    lags.sort()
+    return {
+        "config": {"log": args.log, "host": args.host, "port": args.port, "speed": args.speed,
+                   "start": args.start, "end": args.end, "client_threads": args.client_threads},
+        "clients": state["clients"],
+        "connections": state["connections"],
+        "failed_connections": state["failed"],
+        "sent": state["sent"],
+        "sent_bytes": state["bytes"],
+        "received": state["received"],
+        "expected_replies": state["expected"],
+        "captured_s": round(state["captured"] - args.start, 4),
+        "elapsed_s": round(elapsed, 4),
+        "throughput_msg_per_s": round(state["sent"] / elapsed, 2) if elapsed > 0 else None,
+        "lag_ms": {name: None if value is None else round(value * 1000, 4) for name, value in (
+            ("p50", percentile(lags, 0.5)),
+            ("p99", percentile(lags, 0.99)),
+            ("max", lags[-1] if lags else None))},
+        "client": stats,
+    }
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument("log", help="capture log written by AbstractServer.set_capture()")
+    parser.add_argument("--host", default="127.0.0.1", help="server address")
+    parser.add_argument("--port", type=int, required=True, help="server port")
+    parser.add_argument("--speed", type=float, default=1.0,
+                        help="replay speed, 2 replays twice as fast as captured, 0 as fast as possible")
+    parser.add_argument("--start", type=float, default=0.0, help="skip first seconds of capture")
+    parser.add_argument("--end", type=float, help="stop at this second of capture")
+    parser.add_argument("--client-threads", type=int, default=2, help="ClientManager threads")
+    parser.add_argument("--connect-timeout", type=int, default=10, help="connection timeout in seconds")
+    parser.add_argument("--drain", type=float, default=1, help="seconds to wait for replies after replay")
+    parser.add_argument("--timeout", type=float, default=0, help="give up after seconds, 0 waits until done")
+    parser.add_argument("--output", help="write JSON result to file instead of stdout")
+
+
+def main(args) -> None:
+    if args.speed < 0 or args.client_threads <= 0:
+        raise SystemExit("speed must not be negative and client threads must be greater than 0")
+    result = json.dumps(run(args), indent=4)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(result + "\n")
+    else:
+        print(result)
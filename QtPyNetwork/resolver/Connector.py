@@ -0,0 +1,119 @@
+from qtpy.QtCore import QObject, QTimer, Signal, Slot
+from qtpy.QtNetwork import QTcpSocket, QHostAddress
+
+from collections import deque
+
+from QtPyNetwork.common import delete_later
+from .Resolver import Resolver
+
+import logging
+
+# delay before starting connection attempt to the next address, recommended by RFC 8305
+ATTEMPT_DELAY = 0.25
+
+
+class Connector(QObject):
+    """Connects TCP socket to hostname, trying its addresses in parallel (happy eyeballs, RFC 8305).
+
+    Hostname is resolved by Resolver of the current thread. Addresses are tried alternating IPv6
+    and IPv4, a new attempt is started every attempt_delay seconds or as soon as previous attempt
+    fails, without cancelling attempts in progress. The first connected socket wins and the other
+    attempts are aborted.
+
+    succeeded signal is emitted with connected socket, which is then owned by receiver.
+    failed signal is emitted with error string once all addresses failed.
+
+    Args:
+        host (str): Hostname or IP address.
+        port (int): Port.
+        attempt_delay (float): Seconds between starting connection attempts.
+    """
+
+    succeeded = Signal(object)
+    failed = Signal(str)
+
+    def __init__(self, host: str, port: int, attempt_delay: float = ATTEMPT_DELAY):
+        super(Connector, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__host = host
+        self.__port = port
+        self.__addresses = deque()
+        self.__attempts = {}
+        self.__error = None
+        self.__done = False
+        self.__timer = QTimer(self)
+        self.__timer.setSingleShot(True)
+        self.__timer.setInterval(int(attempt_delay * 1000))
+        self.__timer.timeout.connect(self.__next_attempt)
+
+    @Slot()
+    def start(self) -> None:
+        Resolver.instance().resolve(self.__host, self.__on_resolved)
+
+    def __on_resolved(self, addresses: tuple, error: str) -> None:
+        if self.__done:
+            return
+        if error:
+            self.__fail(f"Could not resolve {self.__host}: {error}")
+            return
+        self.__addresses.extend(Resolver.interleave(addresses))
+        self.__next_attempt()
+
+    @Slot()
+    def __next_attempt(self) -> None:
+        if self.__done or not self.__addresses:
+            return
+        address = self.__addresses.popleft()
+        socket = QTcpSocket()
+        self.__attempts[socket] = address
+        socket.connected.connect(lambda: self.__on_connected(socket))
+        socket.error.connect(lambda error: self.__on_error(socket))
+        self.logger.debug(f"Connecting to {address}:{self.__port}")
+        socket.connectToHost(QHostAddress(address), self.__port)
+        if self.__addresses and not self.__done:
+            self.__timer.start()
+
+    def __on_connected(self, socket: QTcpSocket) -> None:
+        if self.__done:
+            return
+        self.__attempts.pop(socket)
+        socket.connected.disconnect()
+        socket.error.disconnect()
+        self.__finish()
+        self.succeeded.emit(socket)
+
+    def __on_error(self, socket: QTcpSocket) -> None:
+        if self.__done or socket not in self.__attempts:
+            return
+        address = self.__attempts.pop(socket)
+        self.__error = f"{address}: {socket.errorString()}"
+        self.__drop(socket)
+        if self.__addresses:
+            # do not wait for attempt delay once an attempt failed
+            self.__timer.stop()
+            self.__next_attempt()
+        elif not self.__attempts:
+            self.__fail(self.__error)
+
+    def __fail(self, error: str) -> None:
+        self.__finish()
+        self.failed.emit(error)
+
+    def __finish(self) -> None:
+        self.__done = True
+        self.__timer.stop()
+        self.__addresses.clear()
+        for socket in self.__attempts:
+            self.__drop(socket)
+        self.__attempts.clear()
+
+    def __drop(self, socket: QTcpSocket) -> None:
+        socket.blockSignals(True)
+        socket.abort()
+        # socket may be dropped from one of its own signals
+        delete_later(socket)
+
+    @Slot()
+    def abort(self) -> None:
+        """Abort connection attempts. No signal is emitted afterwards."""
+        self.__finish()
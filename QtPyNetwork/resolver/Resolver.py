@@ -0,0 +1,185 @@
+from qtpy.QtCore import QObject, QThread, Qt
+from qtpy.QtNetwork import QHostInfo, QHostAddress, QAbstractSocket
+
+import socket
+import logging
+import threading
+from time import monotonic
+
+# hostname -> (addresses, error, expiration time), shared by resolvers of all threads
+_cache = {}
+_hosts = {}
+_lock = threading.Lock()
+_ttl = [60.0, 5.0]
+
+# resolvers are kept per Qt thread like timer wheels
+_resolvers = {}
+
+
+def _is_literal(host: str) -> bool:
+    return not QHostAddress(host).isNull()
+
+
+def _cached(host: str):
+    with _lock:
+        addresses = _hosts.get(host)
+        if addresses is not None:
+            return addresses, None
+        entry = _cache.get(host)
+        if entry is None:
+            return None
+        if entry[2] <= monotonic():
+            del _cache[host]
+            return None
+        return entry[0], entry[1]
+
+
+def _store(host: str, addresses: tuple, error: str) -> None:
+    ttl = _ttl[1] if error else _ttl[0]
+    if ttl > 0:
+        with _lock:
+            _cache[host] = (addresses, error, monotonic() + ttl)
+
+
+class Resolver(QObject):
+    """Hostname resolver with a cache shared by every client in the process.
+
+    Lookups are done by QHostInfo, so /etc/hosts and system resolver configuration are respected.
+    Resolved addresses are cached for ttl seconds and failed lookups for negative_ttl seconds,
+    see set_ttl(). Concurrent lookups of the same hostname in one thread share a single QHostInfo
+    lookup. QHostInfo does not expose record TTLs, so cache lifetime is configured instead.
+
+    Static entries added by add_host() take precedence over lookups and never expire,
+    like entries of /etc/hosts.
+
+    Resolver must be used only from the thread it was created in. Use Resolver.instance()
+    to get the resolver of the current thread.
+    """
+
+    def __init__(self):
+        super(Resolver, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__pending = {}
+
+    @staticmethod
+    def instance() -> "Resolver":
+        """Get resolver of the current thread. Resolver is created on first use."""
+        key = int(QThread.currentThreadId())
+        resolver = _resolvers.get(key)
+        if resolver is None:
+            resolver = Resolver()
+            with _lock:
+                _resolvers[key] = resolver
+            QThread.currentThread().finished.connect(lambda: _resolvers.pop(key, None), Qt.DirectConnection)
+        return resolver
+
+    def resolve(self, host: str, callback) -> None:
+        """Resolve hostname.
+
+        Callback is called with tuple of addresses (str) and error string, which is None on success.
+        Literal IP addresses and cached hostnames are passed to callback before resolve() returns.
+
+        Args:
+            host (str): Hostname or IP address.
+            callback (callable): Called with addresses and error.
+        """
+        if _is_literal(host):
+            callback((host,), None)
+            return
+        cached = _cached(host)
+        if cached is not None:
+            callback(*cached)
+            return
+        callbacks = self.__pending.get(host)
+        if callbacks is not None:
+            callbacks.append(callback)
+            return
+        self.__pending[host] = [callback]
+        self.logger.debug(f"Looking up {host}")
+        QHostInfo.lookupHost(host, lambda info: self.__on_lookup(host, info))
+
+    def __on_lookup(self, host: str, info: QHostInfo) -> None:
+        addresses = tuple(address.toString() for address in info.addresses())
+        error = None
+        if info.error() != QHostInfo.HostInfoError.NoError or not addresses:
+            error = info.errorString()
+            addresses = ()
+        _store(host, addresses, error)
+        for callback in self.__pending.pop(host, ()):
+            callback(addresses, error)
+
+    @staticmethod
+    def resolve_blocking(host: str) -> tuple:
+        """Resolve hostname in calling thread. Works without Qt application instance.
+
+        Returns:
+            tuple: Addresses (str).
+
+        Raises:
+            OSError: Hostname could not be resolved.
+        """
+        if _is_literal(host):
+            return host,
+        cached = _cached(host)
+        if cached is None:
+            try:
+                infos = socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+            except OSError as e:
+                _store(host, (), str(e))
+                raise
+            addresses = tuple(dict.fromkeys(info[4][0] for info in infos))
+            _store(host, addresses, None)
+            return addresses
+        addresses, error = cached
+        if error:
+            raise OSError(error)
+        return addresses
+
+    @staticmethod
+    def add_host(host: str, addresses: list) -> None:
+        """Add static entry, which overrides lookups of hostname.
+
+        Args:
+            host (str): Hostname.
+            addresses (list): IP addresses (str) in preference order.
+        """
+        with _lock:
+            _hosts[host] = tuple(addresses)
+
+    @staticmethod
+    def remove_host(host: str) -> None:
+        with _lock:
+            _hosts.pop(host, None)
+
+    @staticmethod
+    def set_ttl(ttl: float, negative_ttl: float = 5.0) -> None:
+        """Set cache lifetime of lookup results.
+
+        Args:
+            ttl (float): Seconds resolved addresses are cached for. Zero disables caching.
+            negative_ttl (float): Seconds failed lookups are cached for. Zero disables caching.
+        """
+        _ttl[:] = [ttl, negative_ttl]
+
+    @staticmethod
+    def clear_cache() -> None:
+        """Forget cached lookup results. Static entries are kept."""
+        with _lock:
+            _cache.clear()
+
+    @staticmethod
+    def interleave(addresses: tuple) -> list:
+        """Order addresses for connection attempts alternating IPv6 and IPv4 (RFC 8305),
+        starting with family of the first address.
+        """
+        families = ([], [])
+        first = None
+        for address in addresses:
+            ipv6 = QHostAddress(address).protocol() == QAbstractSocket.NetworkLayerProtocol.IPv6Protocol
+            if first is None:
+                first = ipv6
+            families[ipv6 != first].append(address)
+        ordered = []
+        for i in range(max(len(families[0]), len(families[1]))):
+            ordered.extend(family[i] for family in families if i < len(family))
+        return ordered
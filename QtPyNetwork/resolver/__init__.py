@@ -0,0 +1,6 @@
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".Resolver": ("Resolver",),
+    ".Connector": ("Connector",),
+})
@@ -0,0 +1,144 @@
+from qtpy.QtCore import QObject, Slot
+
+import logging
+import itertools
+
+from QtPyNetwork.client.AbstractClient import AbstractClient
+from QtPyNetwork.exception import NotConnectedError, RPCError, RPCTimeoutError
+from QtPyNetwork.timer import TimerWheel
+from .RPCFuture import RPCFuture
+from .envelope import (KIND_RESPONSE, KIND_ERROR, KIND_CANCEL, NOTIFICATION_ID, MAX_ID,
+                       pack_request, pack_reply, unpack_message)
+
+DEADLINE_RESOLUTION = 10
+
+
+class RPCClient(QObject):
+    """Request/response layer on top of a connected client.
+
+    Every request gets correlation ID, so any number of requests can be outstanding
+    on one connection and responses may arrive in any order. All messages received
+    by the client must be RPC messages, use separate connection for plain messages.
+
+    Must be used from the thread the client emits its signals in, which is the caller's thread
+    for both TCPClient and ThreadedTCPClient.
+
+    Args:
+        client (AbstractClient): Client used to send requests.
+        timeout (float): Default deadline of calls in seconds. None disables deadlines.
+    """
+
+    def __init__(self, client: AbstractClient, timeout: float = None):
+        super(RPCClient, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.client = client
+        self.timeout = timeout
+        self.__ids = itertools.count(1)
+        self.__pending = {}
+        self.__wheel = TimerWheel.instance(DEADLINE_RESOLUTION)
+
+        self.client.message.connect(self.__on_client_message)
+        self.client.disconnected.connect(self.__on_client_closed)
+        self.client.closed.connect(self.__on_client_closed)
+
+    def call(self, method: str, payload: bytes = b"", timeout: float = None, callback=None) -> RPCFuture:
+        """Call remote method.
+
+        Args:
+            method (str): Method name.
+            payload (bytes): Request payload.
+            timeout (float): Deadline in seconds, defaults to client timeout. Future fails with
+                RPCTimeoutError when response does not arrive in time and server is asked to cancel the call.
+            callback (callable): Called with the future when it is done.
+
+        Returns:
+            RPCFuture: Future resolved with response payload (bytes) or RPCError. Future of call made
+                while client is not connected fails with NotConnectedError right away.
+
+        Raises:
+            ValueError: Method name is longer than 255 bytes.
+        """
+        if timeout is None:
+            timeout = self.timeout
+        request_id = self.__next_id()
+        request = pack_request(request_id, method.encode(), payload, timeout)
+        future = RPCFuture(request_id, method, self.__on_future_cancelled)
+        if callback is not None:
+            future.add_done_callback(callback)
+        if not self.client.is_running():
+            # nothing would fail the future without deadline
+            future.set_exception(NotConnectedError(f"Call {method} made while not connected"))
+            return future
+        self.__pending[request_id] = future
+        if timeout:
+            future.handle = self.__wheel.schedule(timeout, lambda: self.__on_deadline(request_id))
+        self.client.write(request)
+        return future
+
+    def notify(self, method: str, payload: bytes = b"") -> None:
+        """Call remote method without waiting for response.
+
+        Args:
+            method (str): Method name.
+            payload (bytes): Request payload.
+
+        Raises:
+            ValueError: Method name is longer than 255 bytes.
+        """
+        self.client.write(pack_request(NOTIFICATION_ID, method.encode(), payload))
+
+    def pending(self) -> int:
+        """Number of calls waiting for response."""
+        return len(self.__pending)
+
+    def __next_id(self) -> int:
+        request_id = next(self.__ids)
+        if request_id > MAX_ID:
+            self.__ids = itertools.count(1)
+            request_id = next(self.__ids)
+        return request_id
+
+    @Slot(bytes)
+    def __on_client_message(self, message: bytes):
+        try:
+            kind, request_id, method, timeout, payload = unpack_message(message)
+        except ValueError as e:
+            self.logger.error(f"Invalid RPC message: {e}")
+            return
+        future = self.__pending.pop(request_id, None)
+        if future is None:
+            # late response of cancelled or timed out call
+            return
+        self.__wheel.cancel(future.handle)
+        if kind == KIND_RESPONSE:
+            future.set_result(payload)
+        elif kind == KIND_ERROR:
+            future.set_exception(RPCError(payload.decode(errors="replace")))
+        else:
+            future.set_exception(RPCError(f"Unexpected RPC message kind {kind}"))
+
+    def __on_deadline(self, request_id: int):
+        future = self.__pending.pop(request_id, None)
+        if future is None:
+            return
+        future.handle = None
+        future.set_exception(RPCTimeoutError(f"Call {future.method} timed out"))
+        self.__send_cancel(request_id)
+
+    def __on_future_cancelled(self, future: RPCFuture):
+        if self.__pending.pop(future.request_id, None) is not None:
+            self.__wheel.cancel(future.handle)
+            self.__send_cancel(future.request_id)
+
+    def __send_cancel(self, request_id: int):
+        if self.client.is_running():
+            self.client.write(pack_reply(KIND_CANCEL, request_id))
+
+    @Slot()
+    def __on_client_closed(self):
+        """Fail all pending calls."""
+        pending = self.__pending
+        self.__pending = {}
+        for future in pending.values():
+            self.__wheel.cancel(future.handle)
+            future.set_exception(NotConnectedError("Connection closed before response was received"))
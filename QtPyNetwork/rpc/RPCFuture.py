@@ -0,0 +1,33 @@
+from concurrent.futures import Future
+
+import asyncio
+
+
+class RPCFuture(Future):
+    """Result of a remote call.
+
+    Standard concurrent.futures.Future, callbacks added by add_done_callback() are called
+    in the thread the RPCClient lives in. It can be awaited in asyncio code running in that thread,
+    result() must not be called from that thread before the future is done, as it would block
+    the event loop which delivers the response.
+
+    Cancelling a pending future sends cancel message to server.
+    """
+
+    def __init__(self, request_id: int, method: str, canceller=None):
+        super(RPCFuture, self).__init__()
+        self.request_id = request_id
+        self.method = method
+        self.handle = None
+        self.__canceller = canceller
+
+    def cancel(self) -> bool:
+        cancelled = super(RPCFuture, self).cancel()
+        if cancelled and self.__canceller is not None:
+            canceller = self.__canceller
+            self.__canceller = None
+            canceller(self)
+        return cancelled
+
+    def __await__(self):
+        return asyncio.wrap_future(self).__await__()
@@ -0,0 +1,115 @@
+from qtpy.QtCore import QObject, Slot
+
+import logging
+from concurrent.futures import Future
+
+from QtPyNetwork.model import Client
+from QtPyNetwork.server.AbstractServer import AbstractServer
+from QtPyNetwork.timer import TimerWheel
+from .envelope import (KIND_REQUEST, KIND_RESPONSE, KIND_ERROR, KIND_CANCEL, NOTIFICATION_ID,
+                       pack_reply, unpack_message)
+from .registry import rpc_method, rpc_methods  # noqa: F401
+
+DEADLINE_RESOLUTION = 10
+
+
+class RPCServer(QObject):
+    """Dispatches requests received by server to handlers.
+
+    Handlers are methods decorated with rpc_method or callables passed to register().
+    Handler table is built once, when RPCServer is created, so dispatching a request
+    is a single dictionary lookup. All messages received by the server must be RPC messages.
+
+    Handler which returns Future must resolve it in the server thread. Such future is cancelled
+    when caller cancels the call, when its deadline passes or when caller disconnects.
+
+    Args:
+        server (AbstractServer): Server which receives requests.
+    """
+
+    def __init__(self, server: AbstractServer):
+        super(RPCServer, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.server = server
+        self.__handlers = rpc_methods(self)
+        self.__running = {}
+        self.__wheel = TimerWheel.instance(DEADLINE_RESOLUTION)
+
+        self.server.message.connect(self.__on_server_message)
+        self.server.disconnected.connect(self.__on_server_disconnected)
+
+    def register(self, method: str, handler) -> None:
+        """Register handler.
+
+        Args:
+            method (str): Method name.
+            handler (callable): Called with Client and request payload.
+        """
+        self.__handlers[method.encode()] = handler
+
+    def methods(self) -> list:
+        """Names of registered methods."""
+        return [name.decode() for name in self.__handlers]
+
+    @Slot(Client, bytes)
+    def __on_server_message(self, client: Client, message: bytes):
+        try:
+            kind, request_id, method, timeout, payload = unpack_message(message)
+        except ValueError as e:
+            self.logger.error(f"Invalid RPC message from client {client.id()}: {e}")
+            return
+        if kind == KIND_REQUEST:
+            self.__dispatch(client, request_id, method, timeout, payload)
+        elif kind == KIND_CANCEL:
+            self.__cancel((client.id(), request_id))
+
+    def __dispatch(self, client: Client, request_id: int, method: bytes, timeout, payload: bytes):
+        handler = self.__handlers.get(method)
+        if handler is None:
+            self.__reply(client, request_id, KIND_ERROR, f"Unknown method {method.decode(errors='replace')}".encode())
+            return
+        try:
+            result = handler(client, payload)
+        except Exception as e:
+            self.logger.debug(f"Method {method} failed: {e!r}")
+            self.__reply(client, request_id, KIND_ERROR, f"{e.__class__.__name__}: {e}".encode())
+            return
+        if not isinstance(result, Future):
+            self.__reply(client, request_id, KIND_RESPONSE, result if result is not None else b"")
+            return
+
+        key = (client.id(), request_id)
+        handle = None
+        if timeout:
+            handle = self.__wheel.schedule(timeout, lambda: self.__cancel(key))
+        self.__running[key] = (result, handle)
+        result.add_done_callback(lambda future: self.__on_future_done(client, request_id, key, future))
+
+    def __on_future_done(self, client: Client, request_id: int, key: tuple, future: Future):
+        running = self.__running.pop(key, None)
+        if running is None or future.cancelled():
+            return
+        self.__wheel.cancel(running[1])
+        error = future.exception()
+        if error is not None:
+            self.__reply(client, request_id, KIND_ERROR, f"{error.__class__.__name__}: {error}".encode())
+        else:
+            result = future.result()
+            self.__reply(client, request_id, KIND_RESPONSE, result if result is not None else b"")
+
+    def __reply(self, client: Client, request_id: int, kind: int, payload: bytes):
+        if request_id != NOTIFICATION_ID and client.is_connected():
+            client.write(pack_reply(kind, request_id, payload))
+
+    def __cancel(self, key: tuple):
+        running = self.__running.pop(key, None)
+        if running is not None:
+            future, handle = running
+            self.__wheel.cancel(handle)
+            future.cancel()
+
+    @Slot(Client)
+    def __on_server_disconnected(self, client: Client):
+        client_id = client.id()
+        for key in [key for key in self.__running if key[0] == client_id]:
+            self.__cancel(key)
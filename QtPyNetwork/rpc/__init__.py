@@ -0,0 +1,8 @@
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".RPCFuture": ("RPCFuture",),
+    ".RPCClient": ("RPCClient",),
+    ".RPCServer": ("RPCServer",),
+    ".registry": ("rpc_method", "rpc_methods"),
+})
@@ -0,0 +1,67 @@
+from struct import pack, unpack_from, calcsize
+
+# every RPC message starts with kind and correlation ID
+KIND_REQUEST = 1
+KIND_RESPONSE = 2
+KIND_ERROR = 3
+KIND_CANCEL = 4
+
+ENVELOPE = '!BL'
+ENVELOPE_SIZE = calcsize(ENVELOPE)
+# request additionally carries timeout in milliseconds (0 means no deadline) and method name length
+REQUEST = '!BLLB'
+REQUEST_SIZE = calcsize(REQUEST)
+MAX_METHOD_SIZE = 0xFF
+
+# requests with correlation ID 0 are notifications, no response is sent
+NOTIFICATION_ID = 0
+MAX_ID = 0xFFFFFFFF
+
+
+def pack_request(request_id: int, method: bytes, payload: bytes, timeout: float = None) -> bytes:
+    """Build request message.
+
+    Args:
+        request_id (int): Correlation ID, NOTIFICATION_ID for requests without response.
+        method (bytes): Method name, at most 255 bytes.
+        payload (bytes): Request payload.
+        timeout (float): Seconds after which caller gives up. None means no deadline.
+
+    Raises:
+        ValueError: Method name is longer than MAX_METHOD_SIZE bytes.
+    """
+    if len(method) > MAX_METHOD_SIZE:
+        raise ValueError(f"RPC method name is longer than {MAX_METHOD_SIZE} bytes")
+    timeout_ms = min(int(timeout * 1000), MAX_ID) if timeout else 0
+    return pack(REQUEST, KIND_REQUEST, request_id, timeout_ms, len(method)) + method + payload
+
+
+def pack_reply(kind: int, request_id: int, payload: bytes = b"") -> bytes:
+    """Build response, error or cancel message."""
+    return pack(ENVELOPE, kind, request_id) + payload
+
+
+def unpack_message(message: bytes) -> tuple:
+    """Parse RPC message.
+
+    Returns:
+        tuple: (kind, request_id, method, timeout, payload). Method and timeout
+            are None for messages other than requests, timeout is None when request has no deadline.
+
+    Raises:
+        ValueError: Message is not a valid RPC message.
+    """
+    if len(message) < ENVELOPE_SIZE:
+        raise ValueError("Truncated RPC envelope")
+    kind, request_id = unpack_from(ENVELOPE, message)
+    if kind != KIND_REQUEST:
+        if kind not in (KIND_RESPONSE, KIND_ERROR, KIND_CANCEL):
+            raise ValueError(f"Unknown RPC message kind {kind}")
+        return kind, request_id, None, None, message[ENVELOPE_SIZE:]
+    if len(message) < REQUEST_SIZE:
+        raise ValueError("Truncated RPC request")
+    timeout_ms, method_size = unpack_from(REQUEST, message)[2:]
+    end = REQUEST_SIZE + method_size
+    if len(message) < end:
+        raise ValueError("Truncated RPC method name")
+    return kind, request_id, message[REQUEST_SIZE:end], timeout_ms / 1000 if timeout_ms else None, message[end:]
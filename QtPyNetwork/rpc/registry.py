@@ -0,0 +1,26 @@
+def rpc_method(name: str = None):
+    """Mark RPCServer method as remotely callable.
+
+    Method is called with Client and request payload and returns response payload (bytes),
+    or a concurrent.futures.Future resolved with response payload. Raised exceptions
+    are sent to caller as RPCError.
+
+    Args:
+        name (str): Name used by callers. Defaults to method name.
+    """
+    def decorator(function):
+        function._rpc_method = name or function.__name__
+        return function
+    return decorator
+
+
+def rpc_methods(obj) -> dict:
+    """Methods of object marked with rpc_method, by name encoded to bytes.
+    Methods of subclasses override methods of base classes with the same name."""
+    methods = {}
+    for cls in reversed(type(obj).__mro__):
+        for attribute, value in vars(cls).items():
+            name = getattr(value, "_rpc_method", None)
+            if name is not None:
+                methods[name.encode()] = getattr(obj, attribute)
+    return methods
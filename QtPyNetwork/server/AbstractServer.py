@@ -1,10 +1,14 @@
-from qtpy.QtCore import Slot, Signal, QObject, QThread
+from qtpy.QtCore import Slot, Signal, QObject, QThread, QTimer
 from qtpy.QtNetwork import QTcpServer, QHostAddress
 
 from QtPyNetwork.model import Client
 from QtPyNetwork.exception import NotConnectedError, ServerNotRunning
+from QtPyNetwork.metrics import Tracer
+from QtPyNetwork.capture import (CaptureWriter, CAPTURE_CONNECTED, CAPTURE_DISCONNECTED, CAPTURE_IN,
+                                 CAPTURE_OUT)
 
 import logging
+from time import monotonic
 
 from QtPyNetwork.balancer import AbstractBalancer
 
@@ -12,17 +16,22 @@ from QtPyNetwork.balancer import AbstractBalancer
 class AbstractServer(QObject):
     started = Signal(str, int)
     closed = Signal()
+    drained = Signal(dict)
+    stats_updated = Signal(dict)
 
     connected = Signal(Client, str, int)
     disconnected = Signal(Client)
     message = Signal(Client, bytes)
+    stream_message = Signal(Client, int, bytes)
 
     client_error = Signal(Client, Exception)
     server_error = Signal(Exception)
 
     def __init__(self, balancer: AbstractBalancer):
         super(AbstractServer, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
         self.clients: list[Client] = []
+        self.__clients_by_id = {}
         self.server: QObject = None
         self.__client_model = Client
 
@@ -30,32 +39,88 @@ class AbstractServer(QObject):
         self.balancer.connected.connect(self.__on_balancer_client_connected)
         self.balancer.disconnected.connect(self.__on_balancer_client_disconnected)
         self.balancer.message.connect(self.__on_balancer_client_message)
+        self.balancer.stream_message.connect(self.__on_balancer_client_stream_message)
+        self.balancer.message_batch.connect(self.__on_balancer_message_batch)
         self.balancer.client_error.connect(self.__on_balancer_client_error)
+        self.balancer.rtt_measured.connect(self.__on_balancer_client_rtt_measured)
+        self.balancer.drained.connect(self.__on_balancer_drained)
         self.balancer.closed.connect(self.on_closed)
+        self.__accept_stopped = 0.0
+        self.__stats_timer = None
+        self.__tracer = None
+        self.__capture = None
 
     @Slot(int, str, int)
     def __on_balancer_client_connected(self, client_id: int, ip: str, port: int):
+        if self.__capture is not None:
+            self.__capture.record(CAPTURE_CONNECTED, client_id, 0, f"{ip}:{port}".encode())
         client = self.__client_model(self, client_id, ip, port)
         self.clients.append(client)
+        self.__clients_by_id[client_id] = client
         self.on_connected(client, ip, port)
 
     @Slot(int, bytes)
     def __on_balancer_client_message(self, client_id: int, message: bytes):
         """When server receives message from client."""
-        self.on_message(self.get_client_by_id(client_id), message)
+        if self.__capture is not None:
+            self.__capture.record(CAPTURE_IN, client_id, 0, message)
+        client = self.get_client_by_id(client_id)
+        if client is not None and client.has_signals():
+            client.signals().message.emit(message)
+        self.on_message(client, message)
+
+    @Slot(int, bytes)
+    def __on_balancer_client_message_traced(self, client_id: int, message: bytes):
+        trace = self.__tracer.dispatched(client_id)
+        self.__on_balancer_client_message(client_id, message)
+        if trace is not None:
+            self.__tracer.handled(trace)
+
+    @Slot(int, int, bytes)
+    def __on_balancer_client_stream_message(self, client_id: int, stream_id: int, message: bytes):
+        """When server receives message on logical stream."""
+        if self.__capture is not None:
+            self.__capture.record(CAPTURE_IN, client_id, stream_id, message)
+        client = self.get_client_by_id(client_id)
+        if client is not None and client.has_signals():
+            client.signals().stream_message.emit(stream_id, message)
+        self.on_stream_message(client, stream_id, message)
+
+    @Slot(list)
+    def __on_balancer_message_batch(self, batch: list):
+        """When server receives batch of messages from balancer."""
+        if self.__capture is not None:
+            for client_id, message in batch:
+                self.__capture.record(CAPTURE_IN, client_id, 0, message)
+        clients = self.__clients_by_id
+        self.on_message_batch([(clients.get(client_id), message) for client_id, message in batch])
 
     @Slot(int)
     def __on_balancer_client_disconnected(self, client_id: int):
         """When client disconnects from server."""
+        if self.__capture is not None:
+            self.__capture.record(CAPTURE_DISCONNECTED, client_id)
         client = self.get_client_by_id(client_id)
         if client:
             client.set_connected(False)
             self.clients.remove(client)
+            del self.__clients_by_id[client_id]
+            if client.has_signals():
+                client.signals().disconnected.emit()
             self.on_disconnected(client)
 
+    @Slot(int, float)
+    def __on_balancer_client_rtt_measured(self, client_id: int, rtt: float):
+        client = self.get_client_by_id(client_id)
+        if client:
+            client.set_rtt(rtt)
+
     @Slot(int, Exception)
     def __on_balancer_client_error(self, client_id: int, error: Exception):
-        self.on_client_error(self.get_client_by_id(client_id), error)
+        client = self.get_client_by_id(client_id)
+        if client is not None and client.has_signals():
+            client.signals().error.emit(error)
+        self.on_client_error(client, error)
 
     @Slot(str, int)
     def start(self, ip: str, port: int):
@@ -88,6 +153,31 @@ class AbstractServer(QObject):
         """
         self.message.emit(client, message)
 
+    @Slot(Client, int, bytes)
+    def on_stream_message(self, client: Client, stream_id: int, message: bytes):
+        """Called when server receives message on logical stream other than 0.
+        Emits stream_message signal.
+
+        Args:
+            client (Client): Message sender.
+            stream_id (int): Stream ID.
+            message (bytes): Message.
+        """
+        self.stream_message.emit(client, stream_id, message)
+
+    @Slot(list)
+    def on_message_batch(self, batch: list):
+        """Called when server receives batch of messages, for example all datagrams
+        read in one event loop iteration. Calls on_message for every message.
+
+        Args:
+            batch (list): List of (Client, bytes) tuples.
+        """
+        for client, message in batch:
+            if client is not None and client.has_signals():
+                client.signals().message.emit(message)
+            self.on_message(client, message)
+
     @Slot(Client)
     def on_disconnected(self, client: Client):
         """Called when client disconnects from server.
@@ -123,6 +213,36 @@ class AbstractServer(QObject):
     def on_closed(self):
         self.closed.emit()
 
+    @Slot(dict)
+    def on_drained(self, report: dict):
+        """Called when server finished draining.
+        Emits drained signal.
+
+        Args:
+            report (dict): Duration of drain phases in seconds (accept, read, flush, join),
+                number of dropped bytes (dropped_bytes) and aborted connections (aborted).
+        """
+        self.drained.emit(report)
+
+    @Slot(dict)
+    def __on_balancer_drained(self, report: dict):
+        report = dict(report, accept=self.__accept_stopped)
+        self.on_drained(report)
+
+    @Slot(float)
+    def drain(self, timeout: float = 5.0):
+        """Gracefully shut down server. Stops accepting connections and reading,
+        flushes queued data up to deadline, closes connections and stops worker threads.
+        Emits drained and closed signals when done.
+
+        Args:
+            timeout (float): Seconds to wait for queued data to be written.
+        """
+        started = monotonic()
+        self.close()
+        self.__accept_stopped = monotonic() - started
+        self.balancer.drain(timeout)
+
     @Slot(Client)
     def disconnect(self, client: Client):
         """Disconnects client from server.
@@ -140,8 +260,23 @@ class AbstractServer(QObject):
             client (Client): Client object.
             message (bytes): Message.
         """
+        if self.__capture is not None:
+            self.__capture.record(CAPTURE_OUT, client.id(), 0, message)
         self.balancer.write(client.id(), message)
 
+    @Slot(Client, int, bytes)
+    def write_stream(self, client: Client, stream_id: int, message: bytes):
+        """Sends message to logical stream of client connection.
+
+        Args:
+            client (Client): Client object.
+            stream_id (int): Stream ID. Stream 0 is the plain message stream.
+            message (bytes): Message.
+        """
+        if self.__capture is not None:
+            self.__capture.record(CAPTURE_OUT, client.id(), stream_id, message)
+        self.balancer.write_stream(client.id(), stream_id, message)
+
     @Slot(bytes)
     def write_all(self, message: bytes):
         """Sends message to all clients.
@@ -149,13 +284,88 @@ class AbstractServer(QObject):
         Args:
             message (bytes): Message.
         """
+        if self.__capture is not None:
+            for client in self.clients:
+                self.__capture.record(CAPTURE_OUT, client.id(), 0, message)
         self.balancer.write_all(message)
 
+    @Slot()
+    def stats(self, per_client: bool = False) -> dict:
+        """Traffic statistics of all connections and of every balancer worker,
+        see AbstractBalancer.stats().
+
+        Args:
+            per_client (bool): Include counters of every open connection as clients (client ID -> counters).
+                With tracer, latency histograms of Tracer.stats() are added to totals and workers.
+        """
+        stats = self.balancer.stats(per_client)
+        if self.__tracer is not None:
+            tracing = self.__tracer.stats()
+            workers = {worker["worker"]: worker for worker in stats.get("workers", ())}
+            for worker in tracing.pop("workers"):
+                if worker["worker"] in workers:
+                    workers[worker["worker"]].update(worker)
+            stats.update(tracing)
+        return stats
+
+    @Slot(object)
+    def set_tracer(self, tracer: Tracer) -> None:
+        """Trace latency of sampled messages of connections accepted from now on,
+        see Tracer. Balancers other than NoBalancer and ThreadPoolBalancer only trace
+        dispatch to on_message.
+
+        Args:
+            tracer (Tracer): Tracer. None stops tracing.
+        """
+        if self.__tracer is not None:
+            self.balancer.message.disconnect(self.__on_balancer_client_message_traced)
+            self.balancer.message.connect(self.__on_balancer_client_message)
+            self.balancer.disconnected.disconnect(self.__tracer.forget)
+        self.__tracer = tracer
+        self.balancer.set_tracer(tracer)
+        if tracer is not None:
+            self.balancer.message.disconnect(self.__on_balancer_client_message)
+            self.balancer.message.connect(self.__on_balancer_client_message_traced)
+            self.balancer.disconnected.connect(tracer.forget)
+
+    @Slot()
+    def tracer(self) -> Tracer:
+        return self.__tracer
+
+    @Slot(object)
+    def set_capture(self, capture: CaptureWriter) -> None:
+        """Write connections, disconnections and messages of all clients to capture log.
+        Messages are captured in the server's thread, received ones when they are dispatched
+        to on_message and written ones when write methods are called. Captured traffic
+        can be replayed with python -m QtPyNetwork replay.
+
+        Args:
+            capture (CaptureWriter): Open log. None stops capturing, log is not closed.
+        """
+        self.__capture = capture
+
+    @Slot()
+    def capture(self) -> CaptureWriter:
+        return self.__capture
+
+    @Slot(float)
+    def set_stats_interval(self, interval: float) -> None:
+        """Emit stats_updated signal with stats() every interval seconds.
+
+        Args:
+            interval (float): Seconds between signals. Zero stops emitting.
+        """
+        if self.__stats_timer is None:
+            self.__stats_timer = QTimer(self)
+            self.__stats_timer.timeout.connect(lambda: self.stats_updated.emit(self.stats()))
+        if interval > 0:
+            self.__stats_timer.start(int(interval * 1000))
+        else:
+            self.__stats_timer.stop()
+
     @Slot(int)
     def get_client_by_id(self, client_id: int):
-        for client in self.clients:
-            if client.id() == client_id:
-                return client
+        return self.__clients_by_id.get(client_id)
 
     @Slot(Client)
     def set_client_model(self, model: Client):
@@ -0,0 +1,74 @@
+from qtpy.QtCore import Slot, Signal
+from qtpy.QtNetwork import QLocalServer
+
+from QtPyNetwork.common import LocalSocket
+from QtPyNetwork.options import HeartbeatOptions
+from .AbstractServer import AbstractServer
+
+
+class _LocalServer(QLocalServer):
+    """Listens for incoming local connections."""
+    incomming_connection = Signal(int)
+
+    def __init__(self, parent=None):
+        super(_LocalServer, self).__init__(parent)
+
+    @Slot(int)
+    def incomingConnection(self, socket_descriptor):
+        self.incomming_connection.emit(int(socket_descriptor))
+
+
+class LocalServer(AbstractServer):
+    """Local socket server (Unix domain socket or Windows named pipe) for processes on the same host.
+
+    Uses the same framing as TCPServer and passes accepted connections to balancer,
+    clients are reported with IP address 127.0.0.1 and port 0.
+
+    Args:
+        balancer (AbstractBalancer): Balancer which handles client sockets.
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings for new connections.
+            Overrides settings passed to balancer.
+    """
+
+    def __init__(self, balancer, heartbeat: HeartbeatOptions = None):
+        super(LocalServer, self).__init__(balancer)
+        if heartbeat is not None:
+            self.balancer.set_heartbeat(heartbeat)
+        self.server = _LocalServer()
+        self.server.incomming_connection.connect(self.on_incomming_connection)
+
+    @Slot(int)
+    def on_incomming_connection(self, socket_descriptor: int):
+        self.balancer.balance(LocalSocket, socket_descriptor)
+
+    @Slot(str)
+    def start(self, name: str, port: int = 0):
+        """Start listening.
+
+        Args:
+            name (str): Server name or path of socket file. Stale socket file left
+                by crashed server with the same name is removed.
+            port (int): Unused, kept for compatibility with AbstractServer.
+        """
+        QLocalServer.removeServer(name)
+        if not self.server.listen(name):
+            self.on_server_error(Exception(self.server.errorString()))
+            return
+        self.on_started(self.server.fullServerName(), 0)
+
+    @Slot()
+    def full_server_name(self) -> str:
+        """Full path of the socket file or pipe name."""
+        return self.server.fullServerName()
+
+    @Slot()
+    def close(self):
+        self.server.close()
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.server.isListening() and self.balancer.is_running()
+
+    @Slot()
+    def wait(self):
+        return self.balancer.wait()
@@ -1,8 +1,16 @@
-from qtpy.QtCore import Slot, Signal
+from qtpy.QtCore import Slot, Signal, QTimer
 from qtpy.QtNetwork import QTcpServer, QHostAddress, QTcpSocket
 
+import socket
+from collections import deque
+from time import monotonic
+
+from QtPyNetwork.common import close_descriptor
+from QtPyNetwork.options import HeartbeatOptions, AdmissionOptions, SocketOptions
 from .AbstractServer import AbstractServer
 
+ADMISSION_INTERVAL = 50
+
 
 class _TCPServer(QTcpServer):
     """Listens for incoming connections."""
@@ -17,22 +25,207 @@ class _TCPServer(QTcpServer):
 
 
 class TCPServer(AbstractServer):
-    def __init__(self, balancer):
+    """TCP server. Accepted connections are passed to balancer.
+
+    Args:
+        balancer (AbstractBalancer): Balancer which handles client sockets.
+        heartbeat (HeartbeatOptions): Idle timeout and ping settings for new connections.
+            Overrides settings passed to balancer.
+        admission (AdmissionOptions): Connection limits and accept pacing.
+        socket_options (SocketOptions): Options applied to client sockets. Overrides options passed to balancer.
+    """
+    rejected = Signal(str)
+
+    def __init__(self, balancer, heartbeat: HeartbeatOptions = None, admission: AdmissionOptions = None,
+                 socket_options: SocketOptions = None):
         super(TCPServer, self).__init__(balancer)
+        if heartbeat is not None:
+            self.balancer.set_heartbeat(heartbeat)
+        if socket_options is not None:
+            self.balancer.set_socket_options(socket_options)
+        self.admission = admission if admission is not None else AdmissionOptions()
         self.server = _TCPServer()
         self.server.incomming_connection.connect(self.on_incomming_connection)
+        self.server.setMaxPendingConnections(self.admission.max_pending_connections)
+        self.balancer.disconnected.connect(self.__on_balancer_connection_closed)
+
+        self.__connections = {}
+        self.__connections_per_ip = {}
+        self.__queue = deque()
+        self.__tokens = float(self.admission.accept_burst)
+        self.__last_tick = monotonic()
+        self.__loop_lag = 0.0
+        self.__paused = False
+        self.__paused_manually = False
+        self.__rejected = 0
+
+        self.__admission_timer = QTimer(self)
+        self.__admission_timer.setInterval(ADMISSION_INTERVAL)
+        self.__admission_timer.timeout.connect(self.__on_admission_timer_timeout)
 
     @Slot(int)
     def on_incomming_connection(self, socket_descriptor: int):
-        self.balancer.balance(QTcpSocket, socket_descriptor)
+        admission = self.admission
+        ip = None
+        if admission.max_connections or admission.max_connections_per_ip:
+            ip = self.__get_peer_ip(socket_descriptor)
+            if not self.__admit(ip):
+                self.__reject(socket_descriptor, ip)
+                return
+        if admission.accept_rate:
+            if self.__queue or self.__tokens < 1:
+                self.__queue.append((socket_descriptor, ip))
+                self.__update_accepting()
+                return
+            self.__tokens -= 1
+        self.__balance(socket_descriptor, ip)
+
+    def __admit(self, ip) -> bool:
+        admission = self.admission
+        if admission.max_connections and self.connection_count() >= admission.max_connections:
+            return False
+        if ip is not None:
+            count = self.__connections_per_ip.get(ip, 0)
+            if admission.max_connections_per_ip and count >= admission.max_connections_per_ip:
+                return False
+            self.__connections_per_ip[ip] = count + 1
+        return True
+
+    def __reject(self, socket_descriptor: int, ip):
+        self.logger.debug(f"Rejecting connection from {ip}")
+        self.__rejected += 1
+        close_descriptor(socket_descriptor)
+        self.rejected.emit(str(ip))
+
+    def __balance(self, socket_descriptor: int, ip):
+        client_id = self.balancer.balance(QTcpSocket, socket_descriptor)
+        self.__connections[client_id] = ip
+        self.__update_accepting()
+
+    @staticmethod
+    def __get_peer_ip(socket_descriptor: int):
+        try:
+            sock = socket.socket(fileno=socket_descriptor)
+        except OSError:
+            return None
+        try:
+            return sock.getpeername()[0]
+        except OSError:
+            return None
+        finally:
+            sock.detach()
+
+    @Slot(int)
+    def __on_balancer_connection_closed(self, client_id: int):
+        if client_id not in self.__connections:
+            return
+        self.__release(self.__connections.pop(client_id))
+        self.__update_accepting()
+
+    def __release(self, ip):
+        """Free per IP slot taken by __admit()."""
+        if ip is not None:
+            count = self.__connections_per_ip.get(ip, 0) - 1
+            if count > 0:
+                self.__connections_per_ip[ip] = count
+            else:
+                self.__connections_per_ip.pop(ip, None)
+
+    @Slot()
+    def __on_admission_timer_timeout(self):
+        now = monotonic()
+        elapsed = now - self.__last_tick
+        self.__last_tick = now
+        self.__loop_lag = max(0.0, elapsed - ADMISSION_INTERVAL / 1000)
+
+        admission = self.admission
+        if admission.accept_rate:
+            self.__tokens = min(float(admission.accept_burst), self.__tokens + elapsed * admission.accept_rate)
+            while self.__queue and self.__tokens >= 1:
+                self.__tokens -= 1
+                self.__balance(*self.__queue.popleft())
+        self.__update_accepting()
+
+    def __update_accepting(self):
+        admission = self.admission
+        pause = (self.__paused_manually
+                 or bool(self.__queue)
+                 or bool(admission.max_connections and self.connection_count() >= admission.max_connections)
+                 or bool(admission.max_loop_lag and self.__loop_lag > admission.max_loop_lag))
+        if pause == self.__paused:
+            return
+        self.__paused = pause
+        if pause:
+            self.logger.debug(f"Pausing accepting connections, {self.connection_count()} connections")
+            self.server.pauseAccepting()
+        else:
+            self.logger.debug(f"Resuming accepting connections, {self.connection_count()} connections")
+            self.server.resumeAccepting()
+
+    @Slot()
+    def pause_accepting(self):
+        """Stop accepting new connections until resume_accepting() is called.
+        New connections wait in the kernel listen backlog."""
+        self.__paused_manually = True
+        self.__update_accepting()
+
+    @Slot()
+    def resume_accepting(self):
+        """Resume accepting paused by pause_accepting(). Accepting stays paused while server is overloaded."""
+        self.__paused_manually = False
+        self.__update_accepting()
+
+    @Slot()
+    def is_accepting(self) -> bool:
+        return self.server.isListening() and not self.__paused
+
+    @Slot(int)
+    def set_max_pending_connections(self, count: int):
+        """Set maximum number of pending accepted connections in QTcpServer.
+
+        Args:
+            count (int): Maximum number of pending connections.
+        """
+        self.admission.max_pending_connections = count
+        self.server.setMaxPendingConnections(count)
+
+    @Slot()
+    def connection_count(self) -> int:
+        """Number of connections handled by balancer or waiting for accept pacing."""
+        return len(self.__connections) + len(self.__queue)
+
+    @Slot()
+    def loop_lag(self) -> float:
+        """Last measured server thread event loop lag in seconds."""
+        return self.__loop_lag
+
+    @Slot()
+    def stats(self, per_client: bool = False) -> dict:
+        """Statistics of AbstractServer.stats() with number of rejected connections (rejected),
+        connections waiting for accept pacing (accept_queue) and event loop lag measured by accept pacing
+        in seconds (admission_lag)."""
+        stats = super(TCPServer, self).stats(per_client)
+        # balancer counts connections rejected by overloaded workers
+        stats["rejected"] = stats.get("rejected", 0) + self.__rejected
+        stats["accept_queue"] = len(self.__queue)
+        stats["admission_lag"] = self.__loop_lag
+        return stats
 
     @Slot(str, int)
     def start(self, ip: str, port: int):
         ip = QHostAddress(ip)
         self.server.listen(ip, port)
+        if self.admission.accept_rate or self.admission.max_loop_lag:
+            self.__last_tick = monotonic()
+            self.__admission_timer.start()
 
     @Slot()
     def close(self):
+        self.__admission_timer.stop()
+        while self.__queue:
+            socket_descriptor, ip = self.__queue.popleft()
+            self.__release(ip)
+            self.__reject(socket_descriptor, ip)
         self.server.close()
 
     @Slot()
@@ -0,0 +1,61 @@
+from qtpy.QtCore import Slot
+
+from QtPyNetwork.balancer import UDPBalancer
+from QtPyNetwork.model import Client
+from .AbstractServer import AbstractServer
+
+
+class UDPServer(AbstractServer):
+    """UDP server. Every datagram is one message, peers are represented by Client objects
+    which are disconnected after session timeout.
+
+    All pending datagrams are read at once and delivered via on_message_batch,
+    which calls on_message for every datagram by default. Packing and reliable delivery
+    are configured on the balancer.
+
+    Args:
+        balancer (UDPBalancer): Balancer which owns datagram sockets and peer sessions.
+            Defaults to UDPBalancer handling datagrams in the caller's thread.
+    """
+
+    def __init__(self, balancer: UDPBalancer = None):
+        super(UDPServer, self).__init__(balancer if balancer is not None else UDPBalancer())
+        self.__port = 0
+
+    @Slot(str, int)
+    def start(self, ip: str, port: int):
+        try:
+            self.__port = self.balancer.bind(ip, port)
+        except (OSError, ValueError) as e:
+            self.on_server_error(e)
+            return
+        self.on_started(ip, self.__port)
+
+    @Slot(Client, bytes)
+    def write(self, client: Client, message: bytes, channel: int = None):
+        """Sends message to client.
+
+        Args:
+            client (Client): Client object.
+            message (bytes): Message.
+            channel (int): Reliable channel, CHANNEL_ORDERED or CHANNEL_UNORDERED.
+                Defaults to channel from balancer's reliable options.
+        """
+        self.balancer.write(client.id(), message, channel)
+
+    @Slot()
+    def port(self) -> int:
+        """Bound port."""
+        return self.__port
+
+    @Slot()
+    def close(self):
+        self.balancer.close()
+
+    @Slot()
+    def is_running(self) -> bool:
+        return self.balancer.is_running()
+
+    @Slot()
+    def wait(self):
+        return self.balancer.wait()
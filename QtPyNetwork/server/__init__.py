@@ -1 +1,7 @@
-from .TCPServer import TCPServer
+from QtPyNetwork.lazy import attach
+
+__all__ = attach(__name__, {
+    ".TCPServer": ("TCPServer",),
+    ".UDPServer": ("UDPServer",),
+    ".LocalServer": ("LocalServer",),
+})
@@ -0,0 +1,172 @@
+"""Byte ring in shared memory, carrying large messages between processes on one host.
+Does not depend on Qt."""
+from multiprocessing import shared_memory
+from struct import pack_into, unpack_from
+
+import os
+import secrets
+
+# write position of the producer and read position of the consumer, each in its own cache line
+# so that updating one does not bounce the other
+POSITION = 'Q'
+WRITE_POSITION_OFFSET = 0
+READ_POSITION_OFFSET = 64
+RING_HEADER_SIZE = 128
+# only shared memory named like this is attached to, so peers can not make us map other segments
+NAME_PREFIX = "qpn-"
+
+
+def _untrack(memory: shared_memory.SharedMemory) -> None:
+    # before Python 3.13 attached memory is registered with resource tracker too,
+    # which unlinks it when this process exits, while its owner still uses it
+    if os.name == "posix":
+        from multiprocessing import resource_tracker
+        resource_tracker.unregister(memory._name, "shared_memory")
+
+
+class SharedRing:
+    """Single producer, single consumer byte ring in shared memory.
+
+    Producer puts messages, consumer gets them in the same order. Message sizes are not stored
+    in the ring, producer passes size of every message it put to consumer by other means,
+    DataBuffer sends them in notification frames. Both sides publish their positions in the ring
+    header, so producer knows how much space was freed and consumer can check announced sizes
+    against available(). Positions published by the other side are never trusted further than
+    the ring's capacity.
+
+    Owner creates the ring with create(), peer attaches to it by name with attach().
+    Owner should unlink() the name once peer attached, mapped memory stays valid until
+    both sides close() it.
+
+    Args:
+        memory (SharedMemory): Mapped shared memory.
+        owner (bool): Ring was created by this process.
+    """
+
+    __slots__ = ("__memory", "__buffer", "__capacity", "__position", "__linked")
+
+    def __init__(self, memory: shared_memory.SharedMemory, owner: bool):
+        self.__memory = memory
+        self.__buffer = memory.buf
+        self.__capacity = memory.size - RING_HEADER_SIZE
+        self.__position = 0
+        self.__linked = owner
+
+    @staticmethod
+    def create(size: int) -> "SharedRing":
+        """Create ring with size bytes of shared memory, including header.
+
+        Raises:
+            OSError: Shared memory could not be created.
+        """
+        if size <= RING_HEADER_SIZE:
+            raise ValueError(f"Ring size must be greater than {RING_HEADER_SIZE} bytes")
+        memory = shared_memory.SharedMemory(NAME_PREFIX + secrets.token_hex(8), create=True, size=size)
+        pack_into(POSITION, memory.buf, WRITE_POSITION_OFFSET, 0)
+        pack_into(POSITION, memory.buf, READ_POSITION_OFFSET, 0)
+        return SharedRing(memory, True)
+
+    @staticmethod
+    def attach(name: str, size: int) -> "SharedRing":
+        """Attach to ring created by other process.
+
+        Args:
+            name (str): Ring name.
+            size (int): Size the ring was created with.
+
+        Raises:
+            OSError: Shared memory does not exist, for example because owner runs on another host.
+            ValueError: Name was not created by create() or shared memory is smaller than size.
+        """
+        if not name.startswith(NAME_PREFIX) or not name[len(NAME_PREFIX):].isalnum():
+            raise ValueError(f"{name!r} is not a shared memory ring name")
+        if size <= RING_HEADER_SIZE:
+            raise ValueError(f"Ring size must be greater than {RING_HEADER_SIZE} bytes")
+        try:
+            memory = shared_memory.SharedMemory(name, track=False)
+        except TypeError:
+            memory = shared_memory.SharedMemory(name)
+            _untrack(memory)
+        if memory.size < size:
+            memory.close()
+            raise ValueError(f"Shared memory {name} is smaller than {size} bytes")
+        return SharedRing(memory, False)
+
+    def name(self) -> str:
+        return self.__memory.name
+
+    def size(self) -> int:
+        """Size of shared memory including header."""
+        return self.__capacity + RING_HEADER_SIZE
+
+    def capacity(self) -> int:
+        """Largest message the ring holds."""
+        return self.__capacity
+
+    def free(self) -> int:
+        """Bytes producer can put."""
+        return self.__capacity - (self.__position - unpack_from(POSITION, self.__buffer, READ_POSITION_OFFSET)[0])
+
+    def available(self) -> int:
+        """Bytes producer put which consumer did not get yet."""
+        return unpack_from(POSITION, self.__buffer, WRITE_POSITION_OFFSET)[0] - self.__position
+
+    def put(self, data: bytes) -> bool:
+        """Copy message into ring. Returns False if there is not enough free space."""
+        size = len(data)
+        if size > self.__capacity or size > self.free():
+            return False
+        buffer = self.__buffer
+        capacity = self.__capacity
+        start = self.__position % capacity
+        first = min(size, capacity - start)
+        start += RING_HEADER_SIZE
+        if first == size:
+            buffer[start:start + size] = data
+        else:
+            view = memoryview(data)
+            buffer[start:start + first] = view[:first]
+            buffer[RING_HEADER_SIZE:RING_HEADER_SIZE + size - first] = view[first:]
+        self.__position += size
+        pack_into(POSITION, buffer, WRITE_POSITION_OFFSET, self.__position)
+        return True
+
+    def get(self, size: int) -> bytes:
+        """Copy next message of size bytes out of ring and free its space.
+
+        Raises:
+            ValueError: Size is larger than the ring or than the bytes producer put.
+        """
+        capacity = self.__capacity
+        if size > capacity or size > self.available():
+            raise ValueError(f"Ring of {capacity} bytes does not hold message of {size} bytes")
+        buffer = self.__buffer
+        start = self.__position % capacity
+        first = min(size, capacity - start)
+        start += RING_HEADER_SIZE
+        if first == size:
+            data = bytes(buffer[start:start + size])
+        else:
+            data = bytes(buffer[start:start + first]) + bytes(buffer[RING_HEADER_SIZE:RING_HEADER_SIZE + size - first])
+        self.__position += size
+        pack_into(POSITION, buffer, READ_POSITION_OFFSET, self.__position)
+        return data
+
+    def unlink(self) -> None:
+        """Remove name of ring created by this process, so it is freed once both sides close it."""
+        if self.__linked:
+            self.__linked = False
+            self.__memory.unlink()
+
+    def close(self) -> None:
+        """Unmap ring, unlinking its name if it was created by this process."""
+        if self.__buffer is None:
+            return
+        self.unlink()
+        self.__buffer.release()
+        self.__buffer = None
+        self.__memory.close()
+
+    def __del__(self):
+        # DataBuffer may be dropped without its socket emitting disconnected
+        self.close()
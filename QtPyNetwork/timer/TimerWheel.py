@@ -0,0 +1,147 @@
+from qtpy.QtCore import QObject, QTimer, Slot
+
+import logging
+from math import ceil
+from time import monotonic
+
+from QtPyNetwork.perthread import PerThread
+
+SLOT_BITS = 6
+SLOTS = 1 << SLOT_BITS
+SLOT_MASK = SLOTS - 1
+LEVELS = 4
+MAX_TICKS = (1 << (SLOT_BITS * LEVELS)) - 1
+
+_wheels = PerThread()
+
+
+class TimerHandle:
+    """Scheduled wheel entry. Returned by TimerWheel.schedule()."""
+
+    __slots__ = ("expires", "callback", "cancelled")
+
+    def __init__(self, expires: int, callback):
+        self.expires = expires
+        self.callback = callback
+        self.cancelled = False
+
+
+class TimerWheel(QObject):
+    """Hierarchical timing wheel driven by a single QTimer.
+
+    Thousands of timeouts can be scheduled without creating a QTimer for each of them.
+    Scheduling and cancelling are O(1), every tick only visits one slot of the lowest level
+    and occasionally cascades one slot of the upper levels. The QTimer is stopped while the
+    wheel is empty, so idle threads are not woken up.
+
+    Wheel must be used only from the thread it was created in. Use TimerWheel.instance()
+    to get the wheel of the current thread.
+
+    Args:
+        resolution (int): Tick length in milliseconds.
+    """
+
+    def __init__(self, resolution: int = 100):
+        super(TimerWheel, self).__init__()
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.__resolution = resolution
+        self.__levels = [[[] for _ in range(SLOTS)] for _ in range(LEVELS)]
+        self.__tick = 0
+        self.__origin = monotonic()
+        self.__count = 0
+
+        self.__timer = QTimer(self)
+        self.__timer.setInterval(resolution)
+        self.__timer.timeout.connect(self.__on_timer_timeout)
+
+    @staticmethod
+    def instance(resolution: int = 100) -> "TimerWheel":
+        """Get timer wheel of the current thread. Wheel is created on first use.
+
+        Args:
+            resolution (int): Tick length in milliseconds. Every resolution has its own wheel.
+        """
+        return _wheels.get(resolution, lambda: TimerWheel(resolution))
+
+    def resolution(self) -> int:
+        return self.__resolution
+
+    def __len__(self) -> int:
+        return self.__count
+
+    def schedule(self, delay: float, callback) -> TimerHandle:
+        """Call callback after delay seconds.
+
+        Args:
+            delay (float): Delay in seconds. Rounded up to the wheel resolution.
+            callback (callable): Function called without arguments.
+
+        Returns:
+            TimerHandle: Handle which can be passed to cancel().
+        """
+        if not self.__timer.isActive():
+            # wheel was idle, rebase clock so no ticks are replayed
+            self.__origin = monotonic() - self.__tick * self.__resolution / 1000
+            self.__timer.start()
+        ticks = min(max(1, ceil(delay * 1000 / self.__resolution)), MAX_TICKS)
+        handle = TimerHandle(self.__tick + ticks, callback)
+        self.__insert(handle)
+        self.__count += 1
+        return handle
+
+    def cancel(self, handle: TimerHandle) -> None:
+        """Cancel scheduled callback. Cancelling fired or cancelled handle does nothing."""
+        if handle is not None and not handle.cancelled:
+            handle.cancelled = True
+            handle.callback = None
+            self.__count -= 1
+            if self.__count == 0:
+                try:
+                    self.__timer.stop()
+                except RuntimeError:
+                    # wheel is being destroyed with its thread
+                    pass
+
+    def __insert(self, handle: TimerHandle) -> None:
+        delta = handle.expires - self.__tick
+        level = 0
+        while delta >= (1 << (SLOT_BITS * (level + 1))) and level < LEVELS - 1:
+            level += 1
+        index = (handle.expires >> (SLOT_BITS * level)) & SLOT_MASK
+        self.__levels[level][index].append(handle)
+
+    def __cascade(self, level: int) -> None:
+        index = (self.__tick >> (SLOT_BITS * level)) & SLOT_MASK
+        slot = self.__levels[level][index]
+        self.__levels[level][index] = []
+        for handle in slot:
+            if not handle.cancelled:
+                self.__insert(handle)
+        if index == 0 and level < LEVELS - 1:
+            self.__cascade(level + 1)
+
+    @Slot()
+    def __on_timer_timeout(self):
+        target = int((monotonic() - self.__origin) * 1000 / self.__resolution)
+        while self.__tick < target and self.__count > 0:
+            self.__tick += 1
+            index = self.__tick & SLOT_MASK
+            if index == 0:
+                self.__cascade(1)
+            slot = self.__levels[0][index]
+            if not slot:
+                continue
+            self.__levels[0][index] = []
+            for handle in slot:
+                if handle.cancelled:
+                    continue
+                callback = handle.callback
+                handle.cancelled = True
+                handle.callback = None
+                self.__count -= 1
+                try:
+                    callback()
+                except Exception as e:
+                    self.logger.exception(f"Timer callback failed: {e}")
+        if self.__count == 0:
+            self.__timer.stop()
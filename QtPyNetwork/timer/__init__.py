@@ -0,0 +1 @@
+from .TimerWheel import TimerWheel, TimerHandle
@@ -0,0 +1,110 @@
+"""Measure memory and construction time of Client model per connection.
+
+Compares current Client with a QObject based model which validates the IP address
+in constructor, as Client did before 0.8.0.
+
+Usage:
+    python -m benchmarks.client_model [--count 10000]
+"""
+from qtpy.QtCore import QCoreApplication, QObject
+
+import gc
+import os
+import sys
+import json
+import argparse
+import ipaddress
+import subprocess
+import tracemalloc
+from time import perf_counter
+
+from QtPyNetwork.model import Client
+
+
+class LegacyClient(QObject):
+    """QObject based client model with eager validation."""
+
+    def __init__(self, server, device_id: int, ip: str, port: int):
+        super(LegacyClient, self).__init__(None)
+        ipaddress.ip_address(ip)
+        if not 1 <= port <= 65535:
+            raise ValueError("Port must be in range 1, 65535")
+        self.__ip = ip
+        self.__port = port
+        self.__id = device_id
+        self.__connected = True
+        self.__server = server
+
+
+def rss() -> int:
+    """Resident set size in bytes. Returns 0 on platforms without /proc."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return 0
+
+
+def measure(model, count: int, signals: bool = False) -> dict:
+    gc.collect()
+    rss_before = rss()
+    started = perf_counter()
+    clients = [model(None, i, "192.168.1.{}".format(i % 250 + 1), 1024 + i % 60000) for i in range(count)]
+    if signals:
+        for client in clients:
+            client.signals()
+    elapsed = perf_counter() - started
+    rss_after = rss()
+
+    # second pass for Python heap, tracemalloc slows down allocations and adds its own memory
+    del clients
+    gc.collect()
+    tracemalloc.start()
+    clients = [model(None, i, "192.168.1.{}".format(i % 250 + 1), 1024 + i % 60000) for i in range(count)]
+    if signals:
+        for client in clients:
+            client.signals()
+    heap = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del clients
+    return {
+        "model": model.__name__ + (" + signals" if signals else ""),
+        "count": count,
+        "heap_bytes_per_client": heap / count,
+        "rss_bytes_per_client": (rss_after - rss_before) / count,
+        "us_per_client": elapsed / count * 1e6,
+    }
+
+
+CASES = {
+    "client": (Client, False),
+    "client-signals": (Client, True),
+    "legacy": (LegacyClient, False),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Client model memory benchmark")
+    parser.add_argument("--count", type=int, default=10000, help="number of clients")
+    parser.add_argument("--case", choices=CASES.keys(), help="run single case in this process")
+    args = parser.parse_args()
+
+    if args.case:
+        app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+        model, signals = CASES[args.case]
+        print(json.dumps(measure(model, args.count, signals)))
+        # run deferred deletions of measured clients before exiting
+        app.processEvents()
+        return
+
+    # every case runs in fresh interpreter so freed memory of one case does not hide RSS growth of another
+    results = []
+    for case in CASES:
+        output = subprocess.check_output([sys.executable, "-m", "benchmarks.client_model",
+                                          "--count", str(args.count), "--case", case])
+        results.append(json.loads(output))
+    print(json.dumps(results, indent=4))
+
+
+if __name__ == '__main__':
+    main()
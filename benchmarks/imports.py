@@ -0,0 +1,68 @@
+"""Measure import time of QtPyNetwork modules.
+
+Every import runs in a fresh interpreter started repeat times and is timed inside it, so interpreter
+startup is not included. The median is reported together with the number of modules the import
+loaded and whether it loaded Qt.
+
+Usage:
+    python -m benchmarks.imports [--repeat 9] [--module QtPyNetwork.server]
+"""
+import sys
+import json
+import argparse
+import statistics
+import subprocess
+
+CASES = (
+    "QtPyNetwork.framing",
+    "QtPyNetwork.options",
+    "QtPyNetwork.metrics.Counters",
+    "QtPyNetwork.rpc.envelope",
+    "QtPyNetwork.server",
+    "QtPyNetwork.balancer",
+    "QtPyNetwork.client",
+    "QtPyNetwork.common",
+    "QtPyNetwork.server.TCPServer",
+    "QtPyNetwork.balancer.ThreadPoolBalancer",
+    "QtPyNetwork.client.TCPClient",
+    "qtpy.QtNetwork",
+)
+
+PROBE = """
+import sys
+from time import perf_counter
+before = set(sys.modules)
+started = perf_counter()
+{statement}
+elapsed = perf_counter() - started
+print(elapsed, len(set(sys.modules) - before), "qtpy" in sys.modules)
+"""
+
+
+def measure(statement: str, repeat: int) -> dict:
+    times = []
+    modules = 0
+    qt = False
+    for _ in range(repeat):
+        output = subprocess.check_output([sys.executable, "-c", PROBE.format(statement=statement)], text=True)
+        elapsed, modules, qt = output.split()
+        times.append(float(elapsed))
+    return {"ms": statistics.median(times) * 1000, "modules": int(modules), "qt": qt == "True"}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time benchmark")
+    parser.add_argument("--repeat", type=int, default=9, help="interpreters started per module")
+    parser.add_argument("--module", action="append", help="module to import, may be repeated")
+    args = parser.parse_args()
+
+    results = []
+    for module in args.module or CASES:
+        result = measure(f"import {module}", args.repeat)
+        result["module"] = module
+        results.append(result)
+    print(json.dumps({"python": sys.version.split()[0], "imports": results}, indent=4))
+
+
+if __name__ == '__main__':
+    main()
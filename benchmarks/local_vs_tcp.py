@@ -0,0 +1,137 @@
+"""Compare round trip latency and throughput of LocalServer and TCPServer on one host,
+with and without shared memory transport.
+
+Echo server runs in a separate process with NoBalancer. Client first sends messages one by one,
+waiting for every echo (latency), then sends all messages at once (throughput). Shared memory
+transports (tcp-shm, local-shm) start sending once both sides attached to the rings.
+Messages which do not fit into the free space of a ring are sent through the socket.
+
+Usage:
+    python -m benchmarks.local_vs_tcp [--count 10000] [--size 64] [--ring-size 67108864]
+"""
+from qtpy.QtCore import QCoreApplication, QTimer
+
+import os
+import sys
+import json
+import argparse
+import subprocess
+from time import perf_counter, process_time
+
+from QtPyNetwork.balancer import NoBalancer
+from QtPyNetwork.client import TCPClient, LocalClient
+from QtPyNetwork.server import TCPServer, LocalServer
+from QtPyNetwork.options import SharedMemoryOptions
+
+TRANSPORTS = ("tcp", "local", "tcp-shm", "local-shm")
+LOCAL_NAME = "qtpynetwork-benchmark-{}"
+
+
+def shared_memory_options(transport: str, ring_size: int):
+    # every message is large enough in this benchmark
+    return SharedMemoryOptions(ring_size, threshold=0) if transport.endswith("-shm") else None
+
+
+def serve(transport: str, ring_size: int):
+    """Run echo server until the first client disconnects. Prints address to stdout."""
+    app = QCoreApplication(sys.argv)
+    balancer = NoBalancer(shared_memory=shared_memory_options(transport, ring_size))
+    if transport.startswith("tcp"):
+        server = TCPServer(balancer)
+        server.start("127.0.0.1", 0)
+        address = str(server.server.serverPort())
+    else:
+        server = LocalServer(balancer)
+        address = LOCAL_NAME.format(os.getpid())
+        server.start(address)
+    server.message.connect(lambda client, message: client.write(message))
+    server.disconnected.connect(lambda client: app.quit())
+    print(address, flush=True)
+    app.exec_()
+    server.close()
+
+
+def percentile(values: list, fraction: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def run(transport: str, count: int, size: int, ring_size: int) -> dict:
+    process = subprocess.Popen([sys.executable, "-m", "benchmarks.local_vs_tcp", "--serve", transport,
+                                "--ring-size", str(ring_size)], stdout=subprocess.PIPE, text=True)
+    address = process.stdout.readline().strip()
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    shared_memory = shared_memory_options(transport, ring_size)
+    if transport.startswith("tcp"):
+        client = TCPClient(shared_memory=shared_memory)
+    else:
+        client = LocalClient(shared_memory=shared_memory)
+    payload = b"x" * size
+    latencies = []
+    result = {"transport": transport, "count": count, "size": size}
+    state = {"sent": 0.0, "received": 0, "cpu": 0.0}
+
+    def on_connected(ip, port):
+        # server offers its ring right after accepting, client answers it, wait for the answer to client's offer
+        if shared_memory is not None and not client.is_shared_memory_active():
+            QTimer.singleShot(10, lambda: on_connected(ip, port))
+            return
+        state["cpu"] = process_time()
+        state["sent"] = perf_counter()
+        client.write(payload)
+
+    def on_message(message):
+        now = perf_counter()
+        if len(latencies) < count:
+            latencies.append(now - state["sent"])
+            if len(latencies) < count:
+                state["sent"] = now
+                client.write(payload)
+                return
+            # latency phase done, send everything at once
+            state["sent"] = perf_counter()
+            for _ in range(count):
+                client.write(payload)
+            return
+        state["received"] += 1
+        if state["received"] == count:
+            elapsed = perf_counter() - state["sent"]
+            result.update({
+                "latency_p50_us": percentile(latencies, 0.5) * 1e6,
+                "latency_p99_us": percentile(latencies, 0.99) * 1e6,
+                "throughput_msg_per_s": count / elapsed,
+                "client_cpu_s": process_time() - state["cpu"],
+            })
+            app.quit()
+
+    client.connected.connect(on_connected)
+    client.message.connect(on_message)
+    client.failed_to_connect.connect(app.quit)
+    if transport.startswith("tcp"):
+        client.start("127.0.0.1", int(address))
+    else:
+        client.start(address)
+    QTimer.singleShot(60000, app.quit)
+    app.exec_()
+    client.close()
+    process.wait()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local socket and TCP loopback benchmark")
+    parser.add_argument("--count", type=int, default=10000, help="number of messages")
+    parser.add_argument("--size", type=int, default=64, help="message size in bytes")
+    parser.add_argument("--ring-size", type=int, default=64 * 1024 * 1024, help="shared memory ring size in bytes")
+    parser.add_argument("--serve", choices=TRANSPORTS, help="run echo server in this process")
+    args = parser.parse_args()
+
+    if args.serve:
+        serve(args.serve, args.ring_size)
+        return
+    print(json.dumps([run(transport, args.count, args.size, args.ring_size) for transport in TRANSPORTS], indent=4))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,289 @@
+"""Microbenchmarks of hot paths, isolated from the network.
+
+DataBuffer reads from and writes to an in-memory socket, servers and balancers are fed directly
+through their methods and signals. Every case runs repeat times and the fastest run is reported
+as nanoseconds per operation.
+
+Results can be saved as baseline and later runs compared against it, comparison exits with
+status 1 when a case got slower than baseline by more than tolerance.
+
+Usage:
+    python -m benchmarks.micro [--filter databuffer] [--repeat 5]
+    python -m benchmarks.micro --save baseline.json
+    python -m benchmarks.micro --compare baseline.json [--tolerance 0.1]
+"""
+from qtpy.QtCore import QCoreApplication, QObject, QThread, QEventLoop, QTimer, Signal, Slot
+
+import sys
+import json
+import argparse
+import platform
+from struct import pack
+from time import perf_counter
+
+from QtPyNetwork import __version__
+from QtPyNetwork.balancer import NoBalancer, ThreadPoolBalancer
+from QtPyNetwork.common import DataBuffer, HEADER
+from QtPyNetwork.server import TCPServer
+
+
+class FakeSocket(QObject):
+    """In-memory replacement of QAbstractSocket with the part of its interface used by DataBuffer.
+
+    Data passed to feed() is read by DataBuffer, written data is only counted.
+    """
+
+    readyRead = Signal()
+    disconnected = Signal()
+
+    def __init__(self):
+        super(FakeSocket, self).__init__()
+        self.__data = b""
+        self.__offset = 0
+        self.written = 0
+
+    def feed(self, data: bytes) -> None:
+        self.__data = self.__data[self.__offset:] + data
+        self.__offset = 0
+        self.readyRead.emit()
+
+    def bytesAvailable(self) -> int:
+        return len(self.__data) - self.__offset
+
+    def read(self, size: int) -> bytes:
+        data = self.__data[self.__offset:self.__offset + size]
+        self.__offset += len(data)
+        return data
+
+    def write(self, data: bytes) -> int:
+        self.written += len(data)
+        return len(data)
+
+    def flush(self) -> bool:
+        return True
+
+
+def frames(count: int, size: int) -> bytes:
+    message = b"x" * size
+    return (pack(HEADER, size) + message) * count
+
+
+def chunked(data: bytes, chunk: int) -> list:
+    return [data[i:i + chunk] for i in range(0, len(data), chunk)]
+
+
+def bench_read(count: int, size: int, chunk: int):
+    """DataBuffer.on_socket_ready_read with stream delivered in chunks of given size,
+    zero delivers every frame in its own chunk."""
+    data = frames(count, size)
+    chunks = chunked(data, chunk) if chunk else chunked(data, size + 4)
+    socket = FakeSocket()
+    buffer = DataBuffer(socket)
+    # socket keeps buffer alive
+    buffer.setParent(socket)
+    received = []
+    buffer.data.connect(received.append)
+
+    def run():
+        received.clear()
+        for part in chunks:
+            socket.feed(part)
+        assert len(received) == count
+    return run, count
+
+
+def bench_write(count: int, size: int):
+    """DataBuffer.write, header pack and concatenation."""
+    socket = FakeSocket()
+    buffer = DataBuffer(socket)
+    message = b"x" * size
+
+    def run():
+        write = buffer.write
+        for _ in range(count):
+            write(message)
+    return run, count
+
+
+def bench_get_client(clients: int, lookups: int):
+    """AbstractServer.get_client_by_id with given number of connected clients."""
+    server = TCPServer(NoBalancer())
+    for client_id in range(clients):
+        server.balancer.connected.emit(client_id, "127.0.0.1", 1024 + client_id % 60000)
+    ids = [i * 7919 % clients for i in range(lookups)]
+
+    def run():
+        get = server.get_client_by_id
+        for client_id in ids:
+            get(client_id)
+    return run, lookups
+
+
+class _NoSocket(QObject):
+    """Socket type whose descriptor is never accepted, workers drop it right away."""
+
+    def setSocketDescriptor(self, descriptor: int) -> bool:
+        return False
+
+
+def bench_balance(threads: int, count: int):
+    """ThreadPoolBalancer.balance, worker selection and queued connection signal."""
+    balancer = ThreadPoolBalancer(threads=threads)
+
+    def run():
+        balance = balancer.balance
+        for _ in range(count):
+            balance(_NoSocket, -1)
+    return run, count, lambda: (balancer.close(), balancer.wait())
+
+
+class _Echo(QObject):
+    """Lives in worker thread, sends received values back or emits burst of them."""
+
+    back = Signal(int)
+    ping = Signal(int)
+    burst = Signal(int)
+
+    def __init__(self):
+        super(_Echo, self).__init__()
+        self.ping.connect(self.__on_ping)
+        self.burst.connect(self.__on_burst)
+
+    @Slot(int)
+    def __on_ping(self, value: int):
+        self.back.emit(value)
+
+    @Slot(int)
+    def __on_burst(self, count: int):
+        for i in range(count):
+            self.back.emit(i)
+
+
+class _Receiver(QObject):
+    """Lives in main thread, quits event loop after expected number of signals."""
+
+    def __init__(self, loop: QEventLoop, echo: _Echo):
+        super(_Receiver, self).__init__()
+        self.loop = loop
+        self.echo = echo
+        self.remaining = 0
+        self.pong = False
+
+    @Slot(int)
+    def on_back(self, value: int):
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.loop.quit()
+        elif self.pong:
+            self.echo.ping.emit(value)
+
+
+def bench_hop(count: int, round_trip: bool):
+    """Queued signal from worker thread to main thread. Burst measures throughput of hops,
+    round trip sends every value to worker and back before sending the next one."""
+    thread = QThread()
+    echo = _Echo()
+    echo.moveToThread(thread)
+    thread.start()
+    loop = QEventLoop()
+    receiver = _Receiver(loop, echo)
+    echo.back.connect(receiver.on_back)
+    hops = count * 2 if round_trip else count
+
+    def run():
+        receiver.remaining = count
+        receiver.pong = round_trip
+        if round_trip:
+            echo.ping.emit(0)
+        else:
+            echo.burst.emit(count)
+        QTimer.singleShot(60000, loop.quit)
+        loop.exec_()
+
+    def stop():
+        thread.quit()
+        thread.wait()
+    return run, hops, stop
+
+
+CASES = {
+    "databuffer_read_whole_64": lambda: bench_read(10000, 64, 10 ** 9),
+    "databuffer_read_frames_64": lambda: bench_read(10000, 64, 0),
+    "databuffer_read_mtu_64": lambda: bench_read(10000, 64, 1460),
+    "databuffer_read_split_64": lambda: bench_read(10000, 64, 7),
+    "databuffer_read_mtu_16k": lambda: bench_read(500, 16384, 1460),
+    "databuffer_read_64k_16k": lambda: bench_read(500, 16384, 65536),
+    "databuffer_write_64": lambda: bench_write(20000, 64),
+    "databuffer_write_16k": lambda: bench_write(5000, 16384),
+    "get_client_by_id_10": lambda: bench_get_client(10, 20000),
+    "get_client_by_id_1k": lambda: bench_get_client(1000, 20000),
+    "get_client_by_id_100k": lambda: bench_get_client(100000, 20000),
+    "balance_2_threads": lambda: bench_balance(2, 5000),
+    "balance_16_threads": lambda: bench_balance(16, 5000),
+    "signal_hop_burst": lambda: bench_hop(20000, False),
+    "signal_hop_round_trip": lambda: bench_hop(2000, True),
+}
+
+
+def measure(name: str, repeat: int) -> dict:
+    case = CASES[name]()
+    run, operations = case[:2]
+    try:
+        run()  # warm up
+        best = min(timed(run) for _ in range(repeat))
+    finally:
+        if len(case) > 2:
+            case[2]()
+    return {"ns_per_op": round(best / operations * 1e9, 1), "ops_per_s": round(operations / best)}
+
+
+def timed(run) -> float:
+    started = perf_counter()
+    run()
+    return perf_counter() - started
+
+
+def compare(results: dict, baseline: dict, tolerance: float) -> bool:
+    """Print change against baseline. Returns False if any case regressed beyond tolerance."""
+    ok = True
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:32} {result['ns_per_op']:>12.1f} ns/op  (no baseline)")
+            continue
+        ratio = result["ns_per_op"] / base["ns_per_op"]
+        regressed = ratio > 1 + tolerance
+        ok = ok and not regressed
+        print(f"{name:32} {result['ns_per_op']:>12.1f} ns/op  {ratio - 1:+7.1%}{'  REGRESSED' if regressed else ''}")
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks of framing, registries and signal hops")
+    parser.add_argument("--filter", default="", help="run only cases containing this text")
+    parser.add_argument("--repeat", type=int, default=5, help="runs of every case, the fastest is reported")
+    parser.add_argument("--save", help="save results as baseline JSON")
+    parser.add_argument("--compare", help="compare results with baseline JSON")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed slowdown against baseline")
+    args = parser.parse_args()
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv)
+    results = {name: measure(name, args.repeat) for name in CASES if args.filter in name}
+    # deliver events queued by signal hop cases before reporting
+    app.processEvents()
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"version": __version__, "python": platform.python_version(),
+                       "machine": platform.machine(), "results": results}, f, indent=4)
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)["results"]
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+    elif not args.save:
+        print(json.dumps(results, indent=4))
+
+
+if __name__ == '__main__':
+    main()